@@ -23,6 +23,7 @@ import eventlet
 import netaddr
 
 from quantum.agent.common import config
+from quantum.agent.linux import command_stats
 from quantum.agent.linux import dhcp
 from quantum.agent.linux import interface
 from quantum.agent.linux import ip_lib
@@ -34,11 +35,25 @@ from quantum.openstack.common import cfg
 from quantum.openstack.common import importutils
 from quantum.openstack.common import jsonutils
 from quantum.openstack.common import log as logging
+from quantum.openstack.common.rpc import common as rpc_common
 from quantum.openstack.common.rpc import proxy
 from quantum.openstack.common import uuidutils
 
 LOG = logging.getLogger(__name__)
 NS_PREFIX = 'qdhcp-'
+# Remote errors of a plugin not serving an RPC call or version
+UNSUPPORTED_RPC_ERRORS = ('UnsupportedRpcVersion', 'AttributeError')
+
+
+def rpc_not_supported(error):
+    """Whether error shows the plugin does not serve the call made.
+
+    AttributeError comes back as itself when its module is among the
+    allowed_rpc_exception_modules, as a RemoteError otherwise.
+    """
+    if isinstance(error, rpc_common.RemoteError):
+        return error.exc_type in UNSUPPORTED_RPC_ERRORS
+    return isinstance(error, AttributeError)
 
 
 class DhcpAgent(object):
@@ -49,11 +64,28 @@ class DhcpAgent(object):
                    default='quantum.agent.linux.dhcp.Dnsmasq',
                    help=_("The driver used to manage the DHCP server.")),
         cfg.BoolOpt('use_namespaces', default=True,
-                    help=_("Allow overlapping IP."))
+                    help=_("Allow overlapping IP.")),
+        cfg.IntOpt('num_sync_threads', default=4,
+                   help=_('Number of networks synchronized concurrently.')),
+        cfg.FloatOpt('reload_allocations_delay', default=0.5,
+                     help=_('Seconds during which port events are '
+                            'collected before reloading the DHCP '
+                            'allocations of their networks, 0 to reload '
+                            'on each event.'))
     ]
 
     def __init__(self, conf):
-        self.needs_resync = False
+        # Networks whose last refresh failed, and whether the list of
+        # active networks itself could not be fetched.
+        self.needs_resync_networks = set()
+        self.needs_full_resync = False
+        # Networks whose allocations are to be reloaded once the current
+        # reload delay expires.
+        self.dirty_networks = set()
+        self._reload_timer = None
+        # Cleared when the plugin turns out to predate the batched lease
+        # updates of version 1.1 of the DHCP RPC API.
+        self.batch_lease_updates = True
         self.conf = conf
         self.cache = NetworkCache()
 
@@ -63,7 +95,7 @@ class DhcpAgent(object):
 
         self.device_manager = DeviceManager(self.conf, self.plugin_rpc)
         self.notifications = agent_rpc.NotificationDispatcher()
-        self.lease_relay = DhcpLeaseRelay(self.update_lease)
+        self.lease_relay = DhcpLeaseRelay(self.update_leases)
 
     def run(self):
         """Activate the DHCP agent."""
@@ -90,53 +122,140 @@ class DhcpAgent(object):
             return True
 
         except Exception, e:
-            self.needs_resync = True
+            self.schedule_resync(network.id)
             LOG.exception(_('Unable to %s dhcp.'), action)
 
-    def update_lease(self, network_id, ip_address, time_remaining):
+    def update_leases(self, leases):
+        """Send a batch of lease updates from the lease relay.
+
+        The leases are sent one by one when the relay does not batch them
+        or the plugin does not support batches.
+        """
         try:
-            self.plugin_rpc.update_lease_expiration(network_id, ip_address,
-                                                    time_remaining)
+            if (self.batch_lease_updates and
+                    self.conf.dhcp_lease_relay_interval):
+                try:
+                    self.plugin_rpc.update_lease_expirations(leases)
+                    return
+                except (rpc_common.RemoteError, AttributeError) as e:
+                    # Other errors resync the networks of the leases
+                    if not rpc_not_supported(e):
+                        raise
+                    LOG.warning(_('Batched lease updates are not supported '
+                                  'by the plugin, sending them one by one: '
+                                  '%s'), e)
+                    self.batch_lease_updates = False
+            for lease in leases:
+                self.plugin_rpc.update_lease_expiration(
+                    lease['network_id'], lease['ip_address'],
+                    lease['lease_remaining'])
         except:
-            self.needs_resync = True
-            LOG.exception(_('Unable to update lease'))
+            for lease in leases:
+                self.schedule_resync(lease['network_id'])
+            LOG.exception(_('Unable to update leases'))
+
+    def schedule_resync(self, network_id=None):
+        """Resync network_id, or every network if None, at the next pass."""
+        if network_id is None:
+            self.needs_full_resync = True
+        else:
+            self.needs_resync_networks.add(network_id)
 
-    def sync_state(self):
-        """Sync the local DHCP state with Quantum."""
+    def sync_state(self, network_ids=None):
+        """Sync the local DHCP state with Quantum.
+
+        Only the networks in network_ids are synced if given. They are
+        refreshed even if unchanged, whereas a full sync skips the
+        networks whose state matches the cache.
+        """
         LOG.info(_('Synchronizing state'))
         known_networks = set(self.cache.get_network_ids())
 
         try:
             active_networks = set(self.plugin_rpc.get_active_networks())
-            for deleted_id in known_networks - active_networks:
-                self.disable_dhcp_helper(deleted_id)
-
-            for network_id in active_networks:
-                self.refresh_dhcp_helper(network_id)
+            if network_ids is not None:
+                active_networks &= network_ids
+            networks = {}
+            if active_networks:
+                for network in self.get_networks_info(list(active_networks)):
+                    networks[network.id] = network
         except:
-            self.needs_resync = True
+            if network_ids is None:
+                self.schedule_resync()
+            else:
+                for network_id in network_ids:
+                    self.schedule_resync(network_id)
             LOG.exception(_('Unable to sync network state.'))
+            return
+
+        # Networks missing from the info were deleted in the meantime
+        deleted_networks = known_networks - set(networks)
+        if network_ids is not None:
+            deleted_networks &= network_ids
+
+        pool = eventlet.GreenPool(self.conf.num_sync_threads)
+        for deleted_id in deleted_networks:
+            pool.spawn_n(self._sync_network, self.disable_dhcp_helper,
+                         deleted_id)
+        for network_id, network in networks.iteritems():
+            pool.spawn_n(self._sync_network, self.refresh_dhcp_helper,
+                         network_id, skip_unchanged=network_ids is None,
+                         network=network)
+        pool.waitall()
+
+    def get_networks_info(self, network_ids):
+        """Fetch the info of the networks in network_ids.
+
+        Plugins older than version 1.1 of the DHCP RPC API are asked for
+        each network in turn.
+        """
+        try:
+            return self.plugin_rpc.get_networks_info(network_ids)
+        except (rpc_common.RemoteError, AttributeError) as e:
+            if not rpc_not_supported(e):
+                raise
+            LOG.warning(_('Unable to fetch the info of all networks at '
+                          'once, fetching them one by one: %s'), e)
+        return [self.plugin_rpc.get_network_info(network_id)
+                for network_id in network_ids]
+
+    def _sync_network(self, helper, network_id, **kwargs):
+        # A failure only affects the network it happened on
+        try:
+            helper(network_id, **kwargs)
+        except:
+            self.schedule_resync(network_id)
+            LOG.exception(_('Unable to sync network %s state.'), network_id)
 
     def _periodic_resync_helper(self):
         """Resync the dhcp state at the configured interval."""
         while True:
             eventlet.sleep(self.conf.resync_interval)
-            if self.needs_resync:
-                self.needs_resync = False
+            if self.needs_resync_networks:
+                network_ids = self.needs_resync_networks
+                self.needs_resync_networks = set()
+                self.sync_state(network_ids)
+            if self.needs_full_resync:
+                self.needs_full_resync = False
                 self.sync_state()
 
     def periodic_resync(self):
         """Spawn a thread to periodically resync the dhcp state."""
         eventlet.spawn(self._periodic_resync_helper)
 
-    def enable_dhcp_helper(self, network_id):
-        """Enable DHCP for a network that meets enabling criteria."""
-        try:
-            network = self.plugin_rpc.get_network_info(network_id)
-        except:
-            self.needs_resync = True
-            LOG.exception(_('Network %s RPC info call failed.'), network_id)
-            return
+    def enable_dhcp_helper(self, network_id, network=None):
+        """Enable DHCP for a network that meets enabling criteria.
+
+        The network info is fetched from the plugin unless given.
+        """
+        if network is None:
+            try:
+                network = self.plugin_rpc.get_network_info(network_id)
+            except:
+                self.schedule_resync(network_id)
+                LOG.exception(_('Network %s RPC info call failed.'),
+                              network_id)
+                return
 
         if not network.admin_state_up:
             return
@@ -154,21 +273,31 @@ class DhcpAgent(object):
             if self.call_driver('disable', network):
                 self.cache.remove(network)
 
-    def refresh_dhcp_helper(self, network_id):
+    def refresh_dhcp_helper(self, network_id, skip_unchanged=False,
+                            network=None):
         """Refresh or disable DHCP for a network depending on the current state
         of the network.
 
+        With skip_unchanged set, nothing is done if the state of the network
+        matches the cached one. The network info is fetched from the plugin
+        unless given.
         """
         old_network = self.cache.get_network_by_id(network_id)
         if not old_network:
             # DHCP current not running for network.
-            return self.enable_dhcp_helper(network_id)
+            return self.enable_dhcp_helper(network_id, network)
 
-        try:
-            network = self.plugin_rpc.get_network_info(network_id)
-        except:
-            self.needs_resync = True
-            LOG.exception(_('Network %s RPC info call failed.'), network_id)
+        if network is None:
+            try:
+                network = self.plugin_rpc.get_network_info(network_id)
+            except:
+                self.schedule_resync(network_id)
+                LOG.exception(_('Network %s RPC info call failed.'),
+                              network_id)
+                return
+
+        if skip_unchanged and NetworkRecord(network) == old_network:
+            LOG.debug(_('Network %s is unchanged.'), network_id)
             return
 
         old_cidrs = set(s.cidr for s in old_network.subnets if s.enable_dhcp)
@@ -215,13 +344,49 @@ class DhcpAgent(object):
         if network:
             self.refresh_dhcp_helper(network.id)
 
+    def schedule_reload_allocations(self, network_id):
+        """Reload the allocations of a network once the reload delay
+        expires, so that a burst of port events causes a single reload.
+        """
+        if not self.conf.reload_allocations_delay:
+            self.call_driver('reload_allocations',
+                             self.cache.get_network_by_id(network_id))
+            return
+
+        self.dirty_networks.add(network_id)
+        if self._reload_timer is None:
+            self._reload_timer = eventlet.spawn_after(
+                self.conf.reload_allocations_delay,
+                self._reload_dirty_networks)
+
+    def _reload_dirty_networks(self):
+        self._reload_timer = None
+        network_ids = self.dirty_networks
+        self.dirty_networks = set()
+        # The commands of the reloads are bounded by the executor the
+        # driver runs them with
+        pool = eventlet.GreenPool(self.conf.num_sync_threads)
+        for network_id in network_ids:
+            pool.spawn_n(self._reload_network, network_id)
+        pool.waitall()
+
+    def _reload_network(self, network_id):
+        network = self.cache.get_network_by_id(network_id)
+        # DHCP may have been disabled or refreshed meanwhile
+        if network and network.revision != network.served_revision:
+            # Changes made while the driver runs are left to the next
+            # reload
+            revision = network.revision
+            if self.call_driver('reload_allocations', network):
+                network.served_revision = revision
+
     def port_update_end(self, payload):
         """Handle the port.update.end notification event."""
         port = DictModel(payload['port'])
         network = self.cache.get_network_by_id(port.network_id)
         if network:
             self.cache.put_port(port)
-            self.call_driver('reload_allocations', network)
+            self.schedule_reload_allocations(network.id)
 
     # Use the update handler for the port create event.
     port_create_end = port_update_end
@@ -230,9 +395,8 @@ class DhcpAgent(object):
         """Handle the port.delete.end notification event."""
         port = self.cache.get_port_by_id(payload['port_id'])
         if port:
-            network = self.cache.get_network_by_id(port.network_id)
             self.cache.remove_port(port)
-            self.call_driver('reload_allocations', network)
+            self.schedule_reload_allocations(port.network_id)
 
 
 class DhcpPluginApi(proxy.RpcProxy):
@@ -240,6 +404,7 @@ class DhcpPluginApi(proxy.RpcProxy):
 
     API version history:
         1.0 - Initial version.
+        1.1 - get_networks_info and update_lease_expirations.
 
     """
 
@@ -265,6 +430,16 @@ class DhcpPluginApi(proxy.RpcProxy):
                                                  host=self.host),
                                    topic=self.topic))
 
+    def get_networks_info(self, network_ids):
+        """Make a remote process call to retrieve the info of networks."""
+        return [DictModel(network) for network in
+                self.call(self.context,
+                          self.make_msg('get_networks_info',
+                                        network_ids=network_ids,
+                                        host=self.host),
+                          topic=self.topic,
+                          version='1.1')]
+
     def get_dhcp_port(self, network_id, device_id):
         """Make a remote process call to create the dhcp port."""
         return DictModel(self.call(self.context,
@@ -293,6 +468,19 @@ class DhcpPluginApi(proxy.RpcProxy):
                                        host=self.host),
                          topic=self.topic)
 
+    def update_lease_expirations(self, leases):
+        """Make a remote process call to update many ip lease expirations.
+
+        Unlike update_lease_expiration, this is a call so that plugins not
+        supporting it are noticed.
+        """
+        self.call(self.context,
+                  self.make_msg('update_lease_expirations',
+                                leases=leases,
+                                host=self.host),
+                  topic=self.topic,
+                  version='1.1')
+
     def update_lease_expiration(self, network_id, ip_address, lease_remaining):
         """Make a remote process call to update the ip lease expiration."""
         self.cast(self.context,
@@ -304,8 +492,88 @@ class DhcpPluginApi(proxy.RpcProxy):
                   topic=self.topic)
 
 
+class _Record(object):
+    """Compact copy of the attributes of a model the DHCP driver uses."""
+    __slots__ = []
+    fields = []
+
+    def __init__(self, model):
+        for name in self.fields:
+            setattr(self, name, getattr(model, name, None))
+
+    def __eq__(self, other):
+        return (type(self) is type(other) and
+                all(getattr(self, name) == getattr(other, name)
+                    for name in self.fields))
+
+    def __ne__(self, other):
+        return not self == other
+
+
+class HostRouteRecord(_Record):
+    __slots__ = fields = ['destination', 'nexthop']
+
+
+class FixedIpRecord(_Record):
+    __slots__ = fields = ['subnet_id', 'ip_address']
+
+
+class SubnetRecord(_Record):
+    __slots__ = fields = ['id', 'network_id', 'ip_version', 'cidr',
+                          'gateway_ip', 'enable_dhcp', 'dns_nameservers',
+                          'host_routes']
+
+    def __init__(self, model):
+        super(SubnetRecord, self).__init__(model)
+        self.dns_nameservers = list(self.dns_nameservers or [])
+        self.host_routes = [HostRouteRecord(route)
+                            for route in self.host_routes or []]
+
+
+class PortRecord(_Record):
+    __slots__ = fields = ['id', 'network_id', 'mac_address', 'fixed_ips']
+
+    def __init__(self, model):
+        super(PortRecord, self).__init__(model)
+        self.fixed_ips = [FixedIpRecord(fixed_ip)
+                          for fixed_ip in self.fixed_ips or []]
+
+
+class NetworkRecord(_Record):
+    """Cached state of a network, with its ports indexed by id.
+
+    revision is bumped on each change made through the cache, and
+    served_revision is the revision the DHCP driver was last given.
+    The driver keeps the config entries of the ports, by port id, in
+    host_entries, and the digests of its config files in conf_digests.
+    """
+    fields = ['id', 'tenant_id', 'admin_state_up', 'subnets', 'port_map']
+    __slots__ = fields + ['revision', 'served_revision', 'host_entries',
+                          'conf_digests']
+
+    def __init__(self, model):
+        super(NetworkRecord, self).__init__(model)
+        self.subnets = [SubnetRecord(subnet) for subnet in self.subnets or []]
+        self.port_map = dict((port.id, PortRecord(port))
+                             for port in model.ports)
+        self.revision = 0
+        self.served_revision = 0
+        self.host_entries = {}
+        self.conf_digests = {}
+
+    @property
+    def ports(self):
+        # In a stable order, so that the driver output only changes with
+        # the ports themselves
+        return sorted(self.port_map.itervalues(), key=lambda port: port.id)
+
+
 class NetworkCache(object):
-    """Agent cache of the current network state."""
+    """Agent cache of the current network state.
+
+    Networks are stored as NetworkRecords, which only hold what the DHCP
+    driver uses, and are put in the cache once the driver serves them.
+    """
     def __init__(self):
         self.cache = {}
         self.subnet_lookup = {}
@@ -324,16 +592,22 @@ class NetworkCache(object):
         return self.cache.get(self.port_lookup.get(port_id))
 
     def put(self, network):
-        if network.id in self.cache:
-            self.remove(self.cache[network.id])
+        """Cache network and return its NetworkRecord."""
+        record = NetworkRecord(network)
+        old_record = self.cache.get(network.id)
+        if old_record:
+            self.remove(old_record)
+            record.revision = old_record.revision + 1
+            record.served_revision = record.revision
 
-        self.cache[network.id] = network
+        self.cache[network.id] = record
 
-        for subnet in network.subnets:
+        for subnet in record.subnets:
             self.subnet_lookup[subnet.id] = network.id
 
-        for port in network.ports:
-            self.port_lookup[port.id] = network.id
+        for port_id in record.port_map:
+            self.port_lookup[port_id] = network.id
+        return record
 
     def remove(self, network):
         del self.cache[network.id]
@@ -346,30 +620,24 @@ class NetworkCache(object):
 
     def put_port(self, port):
         network = self.get_network_by_id(port.network_id)
-        for index in range(len(network.ports)):
-            if network.ports[index].id == port.id:
-                network.ports[index] = port
-                break
-        else:
-            network.ports.append(port)
+        network.port_map[port.id] = PortRecord(port)
+        network.host_entries.pop(port.id, None)
+        network.revision += 1
 
         self.port_lookup[port.id] = network.id
 
     def remove_port(self, port):
         network = self.get_network_by_port_id(port.id)
-
-        for index in range(len(network.ports)):
-            if network.ports[index] == port:
-                del network.ports[index]
-                del self.port_lookup[port.id]
-                break
+        if network:
+            del network.port_map[port.id]
+            del self.port_lookup[port.id]
+            network.host_entries.pop(port.id, None)
+            network.revision += 1
 
     def get_port_by_id(self, port_id):
         network = self.get_network_by_port_id(port_id)
         if network:
-            for port in network.ports:
-                if port.id == port_id:
-                    return port
+            return network.port_map.get(port_id)
 
 
 class DeviceManager(object):
@@ -482,17 +750,25 @@ class DhcpLeaseRelay(object):
     Network namespace isolation prevents the DHCP process from notifying
     Quantum directly.  This class works around the limitation by using the
     domain socket to pass the information.  This class handles message.
-    receiving and then calls the callback method.
+    receiving and then calls the callback method with the list of the
+    leases updated during the last dhcp_lease_relay_interval seconds.
     """
 
     OPTS = [
         cfg.StrOpt('dhcp_lease_relay_socket',
                    default='$state_path/dhcp/lease_relay',
-                   help=_('Location to DHCP lease relay UNIX domain socket'))
+                   help=_('Location to DHCP lease relay UNIX domain socket')),
+        cfg.FloatOpt('dhcp_lease_relay_interval', default=1.0,
+                     help=_('Seconds during which lease updates are '
+                            'collected before being sent to Quantum in a '
+                            'single call, 0 to send each update at once'))
     ]
 
     def __init__(self, lease_update_callback):
         self.callback = lease_update_callback
+        # Latest update of each lease, by (network_id, ip_address)
+        self.pending_leases = {}
+        self._flush_timer = None
 
         dirname = os.path.dirname(cfg.CONF.dhcp_lease_relay_socket)
         if os.path.isdir(dirname):
@@ -522,7 +798,7 @@ class DhcpLeaseRelay(object):
                                  network_id)
             ip_address = str(netaddr.IPAddress(data['ip_address']))
             lease_remaining = int(data['lease_remaining'])
-            self.callback(network_id, ip_address, lease_remaining)
+            self.queue_lease(network_id, ip_address, lease_remaining)
         except ValueError, e:
             LOG.warn(_('Unable to parse lease relay msg to dict.'))
             LOG.warn(_('Exception value: %s'), e)
@@ -530,6 +806,27 @@ class DhcpLeaseRelay(object):
         except Exception, e:
             LOG.exception(_('Unable update lease. Exception'))
 
+    def queue_lease(self, network_id, ip_address, lease_remaining):
+        """Queue a lease update until the relay interval expires."""
+        lease = dict(network_id=network_id, ip_address=ip_address,
+                     lease_remaining=lease_remaining)
+        if not cfg.CONF.dhcp_lease_relay_interval:
+            self.callback([lease])
+            return
+
+        self.pending_leases[(network_id, ip_address)] = lease
+        if self._flush_timer is None:
+            self._flush_timer = eventlet.spawn_after(
+                cfg.CONF.dhcp_lease_relay_interval, self.flush)
+
+    def flush(self):
+        """Send the queued lease updates."""
+        self._flush_timer = None
+        leases = self.pending_leases.values()
+        self.pending_leases = {}
+        if leases:
+            self.callback(leases)
+
     def start(self):
         """Spawn a green thread to run the lease relay unix socket server."""
         listener = eventlet.listen(cfg.CONF.dhcp_lease_relay_socket,
@@ -546,6 +843,7 @@ def main():
     cfg.CONF.register_opts(interface.OPTS)
     cfg.CONF(project='quantum')
     config.setup_logging(cfg.CONF)
+    command_stats.setup(cfg.CONF)
 
     mgr = DhcpAgent(cfg.CONF)
     mgr.run()
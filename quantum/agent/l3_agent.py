@@ -26,6 +26,7 @@ from eventlet import semaphore
 import netaddr
 
 from quantum.agent.common import config
+from quantum.agent.linux import command_stats
 from quantum.agent.linux import external_process
 from quantum.agent.linux import interface
 from quantum.agent.linux import ip_lib
@@ -66,9 +67,8 @@ class L3PluginApi(proxy.RpcProxy):
             topic=topic, default_version=self.BASE_RPC_API_VERSION)
         self.host = host
 
-    def get_routers(self, context, fullsync=True, router_id=None):
+    def get_routers(self, context, fullsync=True, router_ids=None):
         """Make a remote process call to retrieve the sync data for routers."""
-        router_ids = [router_id] if router_id else None
         return self.call(context,
                          self.make_msg('sync_routers', host=self.host,
                                        fullsync=fullsync,
@@ -109,6 +109,13 @@ class RouterInfo(object):
 
 
 class L3NATAgent(manager.Manager):
+    """Manager for L3 routers.
+
+    API version history:
+        1.0 - Initial version.
+        1.1 - Added routers_changed.
+    """
+    RPC_API_VERSION = '1.1'
 
     OPTS = [
         cfg.StrOpt('root_helper', default='sudo'),
@@ -141,6 +148,11 @@ class L3NATAgent(manager.Manager):
                           "by the agents.")),
         cfg.StrOpt('l3_agent_manager',
                    default='quantum.agent.l3_agent.L3NATAgent'),
+        cfg.FloatOpt('router_update_delay', default=0.5,
+                     help=_('Seconds during which router change '
+                            'notifications are collected before fetching '
+                            'the changed routers, 0 to fetch on each '
+                            'notification.')),
     ]
 
     def __init__(self, host, conf=None):
@@ -163,6 +175,8 @@ class L3NATAgent(manager.Manager):
         self.plugin_rpc = L3PluginApi(topics.PLUGIN, host)
         self.fullsync = True
         self.sync_sem = semaphore.Semaphore(1)
+        self.changed_routers = set()
+        self._changed_routers_timer = None
         if self.conf.use_namespaces:
             self._destroy_all_router_namespaces()
         super(L3NATAgent, self).__init__(host=self.conf.host)
@@ -554,6 +568,42 @@ class L3NATAgent(manager.Manager):
                 LOG.debug(msg)
                 self.fullsync = True
 
+    def routers_changed(self, context, router_ids, operation=None):
+        """Deal with the routers changed RPC message.
+
+        The routers are fetched once the update delay expires, so that a
+        burst of changes causes a single fetch.
+        """
+        # If namespaces are disabled, only the configured router matters
+        if not self.conf.use_namespaces:
+            router_ids = [router_id for router_id in router_ids
+                          if router_id == self.conf.router_id]
+        if not router_ids:
+            return
+
+        self.changed_routers.update(router_ids)
+        if not self.conf.router_update_delay:
+            self._process_changed_routers()
+        elif self._changed_routers_timer is None:
+            self._changed_routers_timer = eventlet.spawn_after(
+                self.conf.router_update_delay,
+                self._process_changed_routers)
+
+    def _process_changed_routers(self):
+        self._changed_routers_timer = None
+        router_ids = list(self.changed_routers)
+        self.changed_routers = set()
+        with self.sync_sem:
+            try:
+                routers = self.plugin_rpc.get_routers(
+                    context.get_admin_context_without_session(),
+                    router_ids=router_ids)
+                self._process_routers(routers)
+            except Exception:
+                LOG.exception(_("Failed processing changed routers %s"),
+                              router_ids)
+                self.fullsync = True
+
     def _process_routers(self, routers):
         if (self.conf.external_network_bridge and
             not ip_lib.device_exists(self.conf.external_network_bridge)):
@@ -594,11 +644,11 @@ class L3NATAgent(manager.Manager):
             if self.fullsync:
                 try:
                     if not self.conf.use_namespaces:
-                        router_id = self.conf.router_id
+                        router_ids = [self.conf.router_id]
                     else:
-                        router_id = None
+                        router_ids = None
                     routers = self.plugin_rpc.get_routers(
-                        context, router_id)
+                        context, router_ids=router_ids)
                     self.router_info = {}
                     self._process_routers(routers)
                     self.fullsync = False
@@ -618,6 +668,7 @@ def main():
     conf.register_opts(external_process.OPTS)
     conf()
     config.setup_logging(conf)
+    command_stats.setup(conf)
     server = quantum_service.Service.create(binary='quantum-l3-agent',
                                             topic=topics.L3_AGENT)
     service.launch(server).wait()
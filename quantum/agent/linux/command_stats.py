@@ -0,0 +1,189 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2013 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Timing and counting of the commands run by an agent.
+
+Commands are grouped by verb, e.g. 'ip link', 'ovs-vsctl',
+'iptables-restore' or 'kill -HUP', so that the command families
+dominating an agent's loops stand out. Commands run in a namespace are
+grouped by the verb of the command run there, e.g. 'ip netns exec: ip
+addr'.
+"""
+
+import os
+import socket
+
+import eventlet
+
+from quantum.agent.linux import utils
+from quantum.openstack.common import cfg
+from quantum.openstack.common import jsonutils
+from quantum.openstack.common import log as logging
+from quantum.openstack.common import loopingcall
+
+
+LOG = logging.getLogger(__name__)
+
+OPTS = [
+    cfg.IntOpt('command_stats_interval', default=0,
+               help=_('Seconds between logs of the statistics of the '
+                      'commands run by the agent, 0 to disable')),
+    cfg.StrOpt('command_stats_socket',
+               help=_('Unix socket serving the statistics of the commands '
+                      'run by the agent as JSON')),
+]
+cfg.CONF.register_opts(OPTS)
+
+# Upper bounds, in seconds, of the duration histogram buckets
+BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 60)
+
+
+def command_verb(cmd):
+    """Returns the normalised verb of cmd, without its varying arguments."""
+    args = list(cmd)
+    # Environment variables set through rootwrap
+    while args and '=' in args[0]:
+        args.pop(0)
+    if not args:
+        return ''
+
+    verb = os.path.basename(args[0])
+    options = [arg for arg in args[1:] if arg.startswith('-')]
+    words = [arg for arg in args[1:] if not arg.startswith('-')]
+    if verb == 'ip':
+        if words[:2] == ['netns', 'exec']:
+            # Skip the namespace name, none is given with -all
+            start = args.index('exec') + ('-all' in options and 1 or 2)
+            inner = command_verb(args[start:])
+            return inner and 'ip netns exec: %s' % inner or 'ip netns exec'
+        if '-batch' in options:
+            return 'ip -batch'
+        if words:
+            return 'ip %s' % words[0]
+    elif verb == 'kill':
+        if options:
+            return 'kill %s' % options[0]
+    return verb
+
+
+class VerbStats(object):
+    __slots__ = ['count', 'failures', 'total_time', 'max_time',
+                 'output_bytes', 'histogram']
+
+    def __init__(self):
+        self.count = 0
+        self.failures = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.output_bytes = 0
+        self.histogram = [0] * (len(BUCKETS) + 1)
+
+    def add(self, result, duration):
+        self.count += 1
+        if result is None or result.returncode:
+            self.failures += 1
+        if result is not None:
+            self.output_bytes += len(result.stdout) + len(result.stderr)
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+        for i, bound in enumerate(BUCKETS):
+            if duration <= bound:
+                self.histogram[i] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+    def to_dict(self):
+        return {'count': self.count,
+                'failures': self.failures,
+                'total_time': self.total_time,
+                'max_time': self.max_time,
+                'output_bytes': self.output_bytes,
+                'histogram': self.histogram}
+
+
+class CommandStats(object):
+    """Aggregates, per verb, the commands seen by utils.run()."""
+
+    def __init__(self):
+        self.verbs = {}
+
+    def record(self, cmd, result, duration):
+        verb = command_verb(cmd)
+        stats = self.verbs.get(verb)
+        if stats is None:
+            stats = self.verbs[verb] = VerbStats()
+        stats.add(result, duration)
+
+    def to_dict(self):
+        return {'buckets': BUCKETS,
+                'verbs': dict((verb, stats.to_dict())
+                              for verb, stats in self.verbs.iteritems())}
+
+    def log_summary(self):
+        if not self.verbs:
+            return
+        lines = []
+        # Verbs taking the most time overall first
+        for verb, stats in sorted(self.verbs.iteritems(),
+                                  key=lambda item: -item[1].total_time):
+            lines.append(_("%(verb)s: %(count)d runs, %(failures)d failed, "
+                           "%(total).3fs total, %(avg).3fs avg, "
+                           "%(max).3fs max, %(bytes)d bytes output") %
+                         {'verb': verb, 'count': stats.count,
+                          'failures': stats.failures,
+                          'total': stats.total_time,
+                          'avg': stats.total_time / stats.count,
+                          'max': stats.max_time,
+                          'bytes': stats.output_bytes})
+        LOG.info(_("Command statistics:\n%s"), '\n'.join(lines))
+
+    def serve(self, socket_path):
+        """Send the statistics as JSON to each client of socket_path."""
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = eventlet.listen(socket_path, family=socket.AF_UNIX)
+
+        def send_stats():
+            while True:
+                sock, address = server.accept()
+                try:
+                    sock.sendall(jsonutils.dumps(self.to_dict()))
+                except socket.error:
+                    pass
+                finally:
+                    sock.close()
+
+        return eventlet.spawn(send_stats)
+
+
+def setup(conf=cfg.CONF):
+    """Start collecting command statistics if the agent asks for them.
+
+    Returns the CommandStats in use, or None if disabled.
+    """
+    if not (conf.command_stats_interval or conf.command_stats_socket):
+        return None
+
+    stats = CommandStats()
+    utils.register_execute_hook(stats.record)
+    if conf.command_stats_interval:
+        reporter = loopingcall.LoopingCall(stats.log_summary)
+        reporter.start(interval=conf.command_stats_interval)
+    if conf.command_stats_socket:
+        stats.serve(conf.command_stats_socket)
+    return stats
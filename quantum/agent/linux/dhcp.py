@@ -16,6 +16,7 @@
 #    under the License.
 
 import abc
+import hashlib
 import os
 import re
 import socket
@@ -25,6 +26,7 @@ import tempfile
 
 import netaddr
 
+from quantum.agent.linux import executor
 from quantum.agent.linux import ip_lib
 from quantum.agent.linux import utils
 from quantum.openstack.common import cfg
@@ -58,6 +60,7 @@ TCP = 'tcp'
 DNS_PORT = 53
 DHCPV4_PORT = 67
 DHCPV6_PORT = 467
+_HOST_NAME_RE = re.compile('[:.]')
 
 
 class DhcpBase(object):
@@ -206,6 +209,11 @@ class Dnsmasq(DhcpLocalProcess):
     QUANTUM_NETWORK_ID_KEY = 'QUANTUM_NETWORK_ID'
     QUANTUM_RELAY_SOCKET_PATH_KEY = 'QUANTUM_RELAY_SOCKET_PATH'
 
+    def disable(self, retain_port=False):
+        """Disable DHCP for this network and forget its config files."""
+        super(Dnsmasq, self).disable(retain_port)
+        self._forget_conf_files()
+
     def spawn_process(self):
         """Spawns a Dnsmasq process for the network."""
         env = {
@@ -270,35 +278,90 @@ class Dnsmasq(DhcpLocalProcess):
             return
 
         """Rebuilds the dnsmasq config and signal the dnsmasq to reload."""
-        self._output_hosts_file()
-        self._output_opts_file()
-        cmd = ['kill', '-HUP', self.pid]
+        conf_files = [(self.get_conf_file_name('host'), self._hosts_data()),
+                      (self.get_conf_file_name('opts'), self._opts_data())]
+        changed = [self._replace_conf_file(name, data)
+                   for name, data in conf_files]
+        if not any(changed):
+            LOG.debug(_('Allocations for network %s are unchanged.'),
+                      self.network.id)
+            return
 
-        if self.namespace:
-            ip_wrapper = ip_lib.IPWrapper(self.root_helper, self.namespace)
-            ip_wrapper.netns.execute(cmd)
-        else:
-            utils.execute(cmd, self.root_helper)
+        cmd = ['kill', '-HUP', self.pid]
+        try:
+            # Through the executor shared by the agent, which reloads
+            # several networks at once
+            executor.get_executor(self.root_helper).submit(
+                cmd, namespace=self.namespace).result()
+        except Exception:
+            # dnsmasq did not get the new files, make the next reload
+            # signal it again
+            self._forget_conf_files()
+            raise
         LOG.debug(_('Reloading allocations for network: %s'), self.network.id)
 
-    def _output_hosts_file(self):
-        """Writes a dnsmasq compatible hosts file."""
-        r = re.compile('[:.]')
-        buf = StringIO.StringIO()
+    def _replace_conf_file(self, name, data):
+        """Write data to the config file name unless it already holds it.
+
+        The digests of the files written are kept by the networks cached
+        by the agent, as conf_digests; the files of other networks are
+        always written. Returns whether the file was written.
+        """
+        digests = getattr(self.network, 'conf_digests', None)
+        digest = hashlib.sha1(data).hexdigest()
+        if (digests is not None and digests.get(name) == digest and
+                os.path.exists(name)):
+            return False
+        replace_file(name, data)
+        if digests is not None:
+            digests[name] = digest
+        return True
 
-        for port in self.network.ports:
-            for alloc in port.fixed_ips:
-                name = '%s.%s' % (r.sub('-', alloc.ip_address),
-                                  self.conf.dhcp_domain)
-                buf.write('%s,%s,%s\n' %
-                          (port.mac_address, name, alloc.ip_address))
+    def _forget_conf_files(self):
+        digests = getattr(self.network, 'conf_digests', None)
+        if digests:
+            digests.clear()
 
+    def _output_hosts_file(self):
+        """Writes a dnsmasq compatible hosts file."""
         name = self.get_conf_file_name('host')
-        replace_file(name, buf.getvalue())
+        self._replace_conf_file(name, self._hosts_data())
         return name
 
+    def _hosts_data(self):
+        # The networks cached by the agent keep the entries of their ports
+        # by port id, as host_entries, and drop those of the ports that
+        # change, so that only these are formatted again
+        entries = getattr(self.network, 'host_entries', None)
+        if entries is None:
+            entries = {}
+        buf = StringIO.StringIO()
+
+        # Sorted so that the data only changes with the ports
+        for port in sorted(self.network.ports, key=lambda port: port.id):
+            entry = entries.get(port.id)
+            if entry is None:
+                entry = entries[port.id] = self._host_entry(port)
+            buf.write(entry)
+        return buf.getvalue()
+
+    def _host_entry(self, port):
+        """Return the hosts file lines of port, one per fixed IP."""
+        lines = []
+        for alloc in port.fixed_ips:
+            name = '%s.%s' % (_HOST_NAME_RE.sub('-', alloc.ip_address),
+                              self.conf.dhcp_domain)
+            lines.append('%s,%s,%s\n' %
+                         (port.mac_address, name, alloc.ip_address))
+        return ''.join(lines)
+
     def _output_opts_file(self):
         """Write a dnsmasq compatible options file."""
+        name = self.get_conf_file_name('opts')
+        self._replace_conf_file(name, self._opts_data())
+        return name
+
+    def _opts_data(self):
         options = []
         for i, subnet in enumerate(self.network.subnets):
             if not subnet.enable_dhcp:
@@ -321,10 +384,7 @@ class Dnsmasq(DhcpLocalProcess):
                                                        subnet.gateway_ip))
                 else:
                     options.append(self._format_option(i, 'router'))
-
-        name = self.get_conf_file_name('opts')
-        replace_file(name, '\n'.join(options))
-        return name
+        return '\n'.join(options)
 
     def _lease_relay_script_path(self):
         return os.path.join(os.path.dirname(sys.argv[0]),
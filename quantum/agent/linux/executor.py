@@ -0,0 +1,178 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2013 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+
+import eventlet
+from eventlet import event
+from eventlet import greenpool
+
+from quantum.agent.linux import utils
+from quantum.openstack.common import cfg
+from quantum.openstack.common import log as logging
+
+
+LOG = logging.getLogger(__name__)
+
+OPTS = [
+    cfg.IntOpt('execute_pool_size', default=8,
+               help=_('Maximum number of commands an agent runs '
+                      'concurrently when fanning work out')),
+    cfg.IntOpt('execute_timeout', default=0,
+               help=_('Seconds after which a command run concurrently is '
+                      'killed, 0 for no timeout')),
+]
+cfg.CONF.register_opts(OPTS)
+
+
+class CommandFuture(object):
+    """Pending result of a command submitted to an Executor."""
+
+    def __init__(self, cmd, namespace=None):
+        self.cmd = cmd
+        self.namespace = namespace
+        self._event = event.Event()
+
+    def done(self):
+        return self._event.ready()
+
+    def result(self, timeout=None):
+        """Wait for the command and return its utils.CommandResult.
+
+        Raises the error the command failed with, or eventlet.Timeout if
+        it did not complete within timeout seconds.
+        """
+        with eventlet.Timeout(timeout):
+            return self._event.wait()
+
+    def _set_result(self, result):
+        self._event.send(result)
+
+    def _set_exception(self, exc):
+        self._event.send_exception(exc)
+
+
+class Executor(object):
+    """Runs commands concurrently in green threads.
+
+    At most pool_size commands run at the same time; submit() blocks
+    while the pool is full. Commands submitted for the same namespace
+    run one at a time, in submission order, so that dependent
+    operations on a namespace keep working as they did when run
+    sequentially.
+    """
+
+    def __init__(self, root_helper=None, pool_size=None, timeout=None):
+        self.root_helper = root_helper
+        self.pool = greenpool.GreenPool(pool_size or
+                                        cfg.CONF.execute_pool_size)
+        if timeout is None:
+            timeout = cfg.CONF.execute_timeout or None
+        self.timeout = timeout
+        self._namespace_queues = {}
+
+    def submit(self, cmd, namespace=None, process_input=None, addl_env=None,
+               check_exit_code=True, timeout=None):
+        """Run cmd, inside namespace if given, and return a CommandFuture.
+
+        If check_exit_code is set, a non-zero exit code makes the future
+        raise RuntimeError like utils.execute does.
+        """
+        if namespace:
+            cmd = ['ip', 'netns', 'exec', namespace] + list(cmd)
+            if addl_env:
+                cmd = ['%s=%s' % pair for pair in addl_env.items()] + cmd
+                addl_env = None
+        future = CommandFuture(cmd, namespace)
+        job = (future, process_input, addl_env, check_exit_code,
+               timeout or self.timeout)
+
+        if not namespace:
+            self.pool.spawn_n(self._run_job, job)
+        elif namespace in self._namespace_queues:
+            # The namespace worker picks it up when done with the others
+            self._namespace_queues[namespace].append(job)
+        else:
+            self._namespace_queues[namespace] = collections.deque([job])
+            self.pool.spawn_n(self._run_namespace_jobs, namespace)
+        return future
+
+    def map(self, cmds, namespace=None, **kwargs):
+        """Submit each command in cmds and return the list of futures."""
+        return [self.submit(cmd, namespace, **kwargs) for cmd in cmds]
+
+    def waitall(self):
+        """Wait until all submitted commands are done."""
+        self.pool.waitall()
+
+    def _run_namespace_jobs(self, namespace):
+        jobs = self._namespace_queues[namespace]
+        try:
+            while jobs:
+                self._run_job(jobs.popleft())
+        finally:
+            del self._namespace_queues[namespace]
+
+    def _run_job(self, job):
+        future, process_input, addl_env, check_exit_code, timeout = job
+        try:
+            result = utils.run(future.cmd, self.root_helper, process_input,
+                               addl_env, timeout)
+        except Exception as e:
+            LOG.debug(_("Command %(cmd)s failed: %(error)s"),
+                      {'cmd': future.cmd, 'error': e})
+            future._set_exception(e)
+            return
+
+        m = str(result)
+        LOG.debug(m)
+        if result.returncode and check_exit_code:
+            future._set_exception(RuntimeError(m))
+        else:
+            future._set_result(result)
+
+
+def wait_all(futures, raise_on_error=True):
+    """Wait for futures and return their results in the same order.
+
+    With raise_on_error unset, failed commands give their exception
+    instead of a result.
+    """
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            if raise_on_error:
+                raise
+            results.append(e)
+    return results
+
+
+_executors = {}
+
+
+def get_executor(root_helper=None):
+    """Return the Executor shared by the commands run with root_helper.
+
+    Sharing it bounds the number of commands the agent runs at once, and
+    keeps those of a namespace in order, whatever code submits them.
+    """
+    executor = _executors.get(root_helper)
+    if executor is None:
+        executor = _executors[root_helper] = Executor(root_helper)
+    return executor
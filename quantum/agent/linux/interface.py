@@ -65,19 +65,23 @@ class LinuxInterfaceDriver(object):
         for address in device.addr.list(scope='global', filters=['permanent']):
             previous[address['cidr']] = address['ip_version']
 
-        # add new addresses
-        for ip_cidr in ip_cidrs:
+        ip = ip_lib.IPWrapper(self.conf.root_helper, namespace=namespace)
+        with ip.batch() as batch:
+            device = batch.device(device_name)
 
-            net = netaddr.IPNetwork(ip_cidr)
-            if ip_cidr in previous:
-                del previous[ip_cidr]
-                continue
+            # add new addresses
+            for ip_cidr in ip_cidrs:
 
-            device.addr.add(net.version, ip_cidr, str(net.broadcast))
+                net = netaddr.IPNetwork(ip_cidr)
+                if ip_cidr in previous:
+                    del previous[ip_cidr]
+                    continue
 
-        # clean up any old addresses
-        for ip_cidr, ip_version in previous.items():
-            device.addr.delete(ip_version, ip_cidr)
+                device.addr.add(net.version, ip_cidr, str(net.broadcast))
+
+            # clean up any old addresses
+            for ip_cidr, ip_version in previous.items():
+                device.addr.delete(ip_version, ip_cidr)
 
     def check_bridge_exists(self, bridge):
         if not ip_lib.device_exists(bridge):
@@ -150,27 +154,32 @@ class OVSInterfaceDriver(LinuxInterfaceDriver):
             tap_name = self._get_tap_name(device_name, prefix)
 
             if self.conf.ovs_use_veth:
-                root_dev, ns_dev = ip.add_veth(tap_name, device_name)
+                ip.add_veth(tap_name, device_name)
 
             internal = not self.conf.ovs_use_veth
             self._ovs_add_port(bridge, tap_name, port_id, mac_address,
                                internal=internal)
 
-            ns_dev = ip.device(device_name)
-            ns_dev.link.set_address(mac_address)
+            if namespace:
+                namespace_obj = ip.ensure_namespace(namespace)
+
+            with ip.batch() as batch:
+                ns_dev = batch.device(device_name)
+                ns_dev.link.set_address(mac_address)
 
-            if self.conf.network_device_mtu:
-                ns_dev.link.set_mtu(self.conf.network_device_mtu)
                 if self.conf.ovs_use_veth:
-                    root_dev.link.set_mtu(self.conf.network_device_mtu)
+                    root_dev = batch.device(tap_name)
+                    if self.conf.network_device_mtu:
+                        root_dev.link.set_mtu(self.conf.network_device_mtu)
+                    root_dev.link.set_up()
 
-            if namespace:
-                namespace_obj = ip.ensure_namespace(namespace)
-                namespace_obj.add_device_to_namespace(ns_dev)
+                if self.conf.network_device_mtu:
+                    ns_dev.link.set_mtu(self.conf.network_device_mtu)
+
+                if namespace:
+                    namespace_obj.add_device_to_namespace(ns_dev)
 
             ns_dev.link.set_up()
-            if self.conf.ovs_use_veth:
-                root_dev.link.set_up()
         else:
             LOG.warn(_("Device %s already exists"), device_name)
 
@@ -213,18 +222,22 @@ class BridgeInterfaceDriver(LinuxInterfaceDriver):
                 tap_name = device_name.replace(prefix, 'tap')
             else:
                 tap_name = device_name.replace(self.DEV_NAME_PREFIX, 'tap')
-            root_veth, ns_veth = ip.add_veth(tap_name, device_name)
-            ns_veth.link.set_address(mac_address)
-
-            if self.conf.network_device_mtu:
-                root_veth.link.set_mtu(self.conf.network_device_mtu)
-                ns_veth.link.set_mtu(self.conf.network_device_mtu)
-
             if namespace:
                 namespace_obj = ip.ensure_namespace(namespace)
-                namespace_obj.add_device_to_namespace(ns_veth)
 
-            root_veth.link.set_up()
+            with ip.batch() as batch:
+                root_veth, ns_veth = batch.add_veth(tap_name, device_name)
+                ns_veth.link.set_address(mac_address)
+
+                if self.conf.network_device_mtu:
+                    root_veth.link.set_mtu(self.conf.network_device_mtu)
+                    ns_veth.link.set_mtu(self.conf.network_device_mtu)
+
+                root_veth.link.set_up()
+
+                if namespace:
+                    namespace_obj.add_device_to_namespace(ns_veth)
+
             ns_veth.link.set_up()
 
         else:
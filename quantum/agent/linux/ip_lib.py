@@ -14,25 +14,57 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import re
+
 from quantum.agent.linux import utils
 from quantum.common import exceptions
 
 
 LOOPBACK_DEVNAME = 'lo'
 
+BATCH_FAILED_LINE_RE = re.compile(r'Command failed -:(\d+)')
+
+
+class IpBatchError(RuntimeError):
+    """A command in an 'ip -batch' run failed.
+
+    line is the 1-based number of the failing command in commands, or
+    None if ip failed before running any of them.  Commands after the
+    failing one were not run.
+    """
+
+    def __init__(self, message, commands, line=None):
+        super(IpBatchError, self).__init__(message)
+        self.commands = commands
+        self.line = line
+
+    @property
+    def failed_command(self):
+        if self.line:
+            return self.commands[self.line - 1]
+
 
 class SubProcessBase(object):
-    def __init__(self, root_helper=None, namespace=None):
+    def __init__(self, root_helper=None, namespace=None, batch=None):
         self.root_helper = root_helper
         self.namespace = namespace
+        self._batch = batch
 
     def _run(self, options, command, args):
         if self.namespace:
-            return self._as_root(options, command, args)
+            return self._execute_as_root(options, command, args)
         else:
             return self._execute(options, command, args)
 
     def _as_root(self, options, command, args, use_root_namespace=False):
+        if (self._batch is not None and self._batch.active and
+                not use_root_namespace):
+            return self._batch.add(options, command, args)
+        return self._execute_as_root(options, command, args,
+                                     use_root_namespace)
+
+    def _execute_as_root(self, options, command, args,
+                         use_root_namespace=False):
         if not self.root_helper:
             raise exceptions.SudoRequired()
 
@@ -57,14 +89,24 @@ class SubProcessBase(object):
 
 
 class IPWrapper(SubProcessBase):
-    def __init__(self, root_helper=None, namespace=None):
+    def __init__(self, root_helper=None, namespace=None, batch=None):
         super(IPWrapper, self).__init__(root_helper=root_helper,
-                                        namespace=namespace)
+                                        namespace=namespace,
+                                        batch=batch)
         self.netns = IpNetnsCommand(self)
 
     def device(self, name):
         return IPDevice(name, self.root_helper, self.namespace)
 
+    def batch(self):
+        """Return a batch collecting link, addr and route changes.
+
+        Used as a context manager, the changes made through the batch
+        and the devices it returns are run with a single 'ip -batch'
+        invocation when the block exits.
+        """
+        return IPBatch(self.root_helper, self.namespace)
+
     def get_devices(self, exclude_loopback=False):
         retval = []
         output = self._execute('o', 'link', ('list',),
@@ -86,14 +128,13 @@ class IPWrapper(SubProcessBase):
 
     def add_tuntap(self, name, mode='tap'):
         self._as_root('', 'tuntap', ('add', name, 'mode', mode))
-        return IPDevice(name, self.root_helper, self.namespace)
+        return self.device(name)
 
     def add_veth(self, name1, name2):
         self._as_root('', 'link',
                       ('add', name1, 'type', 'veth', 'peer', 'name', name2))
 
-        return (IPDevice(name1, self.root_helper, self.namespace),
-                IPDevice(name2, self.root_helper, self.namespace))
+        return (self.device(name1), self.device(name2))
 
     def ensure_namespace(self, name):
         if not self.netns.exists(name):
@@ -119,16 +160,123 @@ class IPWrapper(SubProcessBase):
         if self.namespace:
             device.link.set_netns(self.namespace)
 
+    def delete_devices(self, names):
+        """Delete devices with 'ip -batch', one run for all of them.
+
+        Devices ip fails to delete are skipped and the batch resumes with
+        the next ones. Returns the names of the devices not deleted.
+        """
+        failed = []
+        while names:
+            batch = self.batch()
+            for name in names:
+                batch.device(name).link.delete()
+            try:
+                batch.execute()
+                break
+            except IpBatchError as e:
+                if not e.line:
+                    raise
+                failed.append(names[e.line - 1])
+                names = names[e.line:]
+        return failed
+
     @classmethod
     def get_namespaces(cls, root_helper):
         output = cls._execute('', 'netns', ('list',), root_helper=root_helper)
         return [l.strip() for l in output.split('\n')]
 
+    @classmethod
+    def get_devices_by_namespace(cls, root_helper, exclude_loopback=False):
+        """Return the device names of all namespaces, keyed by namespace.
+
+        A single 'ip -all netns exec' lists them. With an ip not supporting
+        -all, the result is empty.
+        """
+        if not root_helper:
+            raise exceptions.SudoRequired()
+        output = utils.execute(['ip', '-all', 'netns', 'exec',
+                                'ip', '-o', 'link', 'list'],
+                               root_helper=root_helper,
+                               check_exit_code=False)
+        devices = {}
+        names = None
+        for line in output.split('\n'):
+            if line.startswith('netns: '):
+                names = devices.setdefault(line[len('netns: '):].strip(), [])
+                continue
+            if names is None or '<' not in line:
+                continue
+            tokens = line.split(':', 2)
+            if len(tokens) >= 3:
+                # Peer of a veth pair shown as name@peer
+                name = tokens[1].strip().split('@')[0]
+                if exclude_loopback and name == LOOPBACK_DEVNAME:
+                    continue
+                names.append(name)
+        return devices
+
+
+class IPBatch(IPWrapper):
+    """Collects ip commands and runs them with one 'ip -batch -'.
+
+    Changes made through the batch, or through the devices returned by
+    device() and add_veth(), are queued while the batch is active and
+    run in order by execute().  Queries are still run immediately.  A
+    device moved to another namespace with set_netns() must be changed
+    through a batch for that namespace, after this one has run.
+    """
+
+    def __init__(self, root_helper=None, namespace=None):
+        super(IPBatch, self).__init__(root_helper=root_helper,
+                                      namespace=namespace,
+                                      batch=self)
+        self.commands = []
+        self.active = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+        else:
+            self.active = False
+
+    def device(self, name):
+        return IPDevice(name, self.root_helper, self.namespace, batch=self)
+
+    def add(self, options, command, args):
+        # Lines of a batch cannot carry options; the address family of
+        # addr and route commands is taken from the address itself.
+        self.commands.append(' '.join([command] + [str(a) for a in args]))
+
+    def execute(self):
+        self.active = False
+        if not self.commands:
+            return
+        if not self.root_helper:
+            raise exceptions.SudoRequired()
+        commands, self.commands = self.commands, []
+        if self.namespace:
+            ip_cmd = ['ip', 'netns', 'exec', self.namespace, 'ip']
+        else:
+            ip_cmd = ['ip']
+        try:
+            return utils.execute(ip_cmd + ['-batch', '-'],
+                                 root_helper=self.root_helper,
+                                 process_input='\n'.join(commands) + '\n')
+        except RuntimeError as e:
+            match = BATCH_FAILED_LINE_RE.search(str(e))
+            line = match and int(match.group(1)) or None
+            raise IpBatchError(str(e), commands, line)
+
 
 class IPDevice(SubProcessBase):
-    def __init__(self, name, root_helper=None, namespace=None):
+    def __init__(self, name, root_helper=None, namespace=None, batch=None):
         super(IPDevice, self).__init__(root_helper=root_helper,
-                                       namespace=namespace)
+                                       namespace=namespace,
+                                       batch=batch)
         self.name = name
         self.link = IpLinkCommand(self)
         self.addr = IpAddrCommand(self)
@@ -24,6 +24,7 @@
 import inspect
 import os
 
+from quantum.agent.linux import executor
 from quantum.agent.linux import utils
 from quantum.openstack.common import lockutils
 from quantum.openstack.common import log as logging
@@ -290,8 +291,17 @@ class IptablesManager(object):
 
         self._apply()
 
-    @lockutils.synchronized('iptables', 'quantum-', external=True)
     def _apply(self):
+        # Namespaces have tables of their own, so only managers of the
+        # same namespace need to wait for each other
+        lock_name = 'iptables'
+        if self.namespace:
+            lock_name += '-' + self.namespace
+        synchronized = lockutils.synchronized(lock_name, 'quantum-',
+                                              external=True)
+        synchronized(self._apply_synchronized)()
+
+    def _apply_synchronized(self):
         """Apply the current in-memory set of iptables rules.
 
         This will blow away any rules left over from previous runs of the
@@ -306,21 +316,30 @@ class IptablesManager(object):
         for cmd, tables in s:
             for table in tables:
                 args = ['%s-save' % cmd, '-t', table]
-                if self.namespace:
-                    args = ['ip', 'netns', 'exec', self.namespace] + args
-                current_table = (self.execute(args,
-                                 root_helper=self.root_helper))
+                current_table = self._execute(args)
                 current_lines = current_table.split('\n')
                 new_filter = self._modify_rules(current_lines,
                                                 tables[table])
                 args = ['%s-restore' % (cmd)]
-                if self.namespace:
-                    args = ['ip', 'netns', 'exec', self.namespace] + args
-                self.execute(args,
-                             process_input='\n'.join(new_filter),
-                             root_helper=self.root_helper)
+                self._execute(args, process_input='\n'.join(new_filter))
         LOG.debug(_("IPTablesManager.apply completed with success"))
 
+    def _execute(self, args, process_input=None):
+        """Run an iptables command in the namespace and return its output."""
+        if self.execute is utils.execute:
+            # Through the executor shared by the agent, which keeps the
+            # commands of a namespace in order
+            future = executor.get_executor(self.root_helper).submit(
+                args, namespace=self.namespace, process_input=process_input)
+            return future.result().stdout
+
+        if self.namespace:
+            args = ['ip', 'netns', 'exec', self.namespace] + args
+        if process_input is None:
+            return self.execute(args, root_helper=self.root_helper)
+        return self.execute(args, process_input=process_input,
+                            root_helper=self.root_helper)
+
     def _modify_rules(self, current_lines, table, binary=None):
         unwrapped_chains = table.unwrapped_chains
         chains = table.chains
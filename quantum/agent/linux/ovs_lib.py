@@ -21,12 +21,15 @@
 import re
 
 from quantum.agent.linux import utils
+from quantum.openstack.common import jsonutils
 from quantum.openstack.common import log as logging
 
 LOG = logging.getLogger(__name__)
 
 
-class VifPort:
+class VifPort(object):
+    __slots__ = ('port_name', 'ofport', 'vif_id', 'vif_mac', 'switch')
+
     def __init__(self, port_name, ofport, vif_id, vif_mac, switch):
         self.port_name = port_name
         self.ofport = ofport
@@ -78,6 +81,15 @@ class OVSBridge:
         self.run_vsctl(["--", "--if-exists", "del-port", self.br_name,
                         port_name])
 
+    def delete_port_list(self, port_names):
+        """Delete ports with a single ovs-vsctl transaction."""
+        args = []
+        for port_name in port_names:
+            args += ["--", "--if-exists", "del-port", self.br_name,
+                     port_name]
+        if args:
+            self.run_vsctl(args)
+
     def set_db_attribute(self, table_name, record, column, value):
         args = ["set", table_name, record, "%s=%s" % (column, value)]
         self.run_vsctl(args)
@@ -272,13 +284,83 @@ class OVSBridge:
             return
 
     def delete_ports(self, all_ports=False):
-        if all_ports:
-            port_names = self.get_port_name_list()
-        else:
-            port_names = (port.port_name for port in self.get_vif_ports())
+        ports = get_bridge_ports(self.root_helper).get(self.br_name, {})
+        self.delete_port_list(sorted(
+            port_name for port_name, interface in ports.iteritems()
+            if all_ports or is_vif_interface(interface)))
+
+
+def _ovsdb_value(value):
+    """Convert a value of the OVSDB JSON format.
+
+    Maps become dicts, sets lists and UUIDs strings.
+    """
+    if isinstance(value, list) and len(value) == 2:
+        kind, data = value
+        if kind == 'set':
+            return [_ovsdb_value(v) for v in data]
+        elif kind == 'map':
+            return dict((_ovsdb_value(k), _ovsdb_value(v)) for k, v in data)
+        elif kind == 'uuid':
+            return data
+    return value
+
+
+def _ovsdb_set(value):
+    # Sets of one element are given as the element alone
+    return value if isinstance(value, list) else [value]
+
+
+def _ovsdb_rows(table):
+    return [dict(zip(table['headings'], [_ovsdb_value(v) for v in row]))
+            for row in table['data']]
+
+
+def is_vif_interface(interface):
+    """Whether an interface of get_bridge_ports() is a Quantum VIF."""
+    if not interface:
+        return False
+    external_ids = interface['external_ids']
+    return ("attached-mac" in external_ids and
+            ("iface-id" in external_ids or "xs-vif-uuid" in external_ids))
+
+
+def get_bridge_ports(root_helper):
+    """Return the ports of all bridges, read with a single ovs-vsctl call.
+
+    The result maps each bridge name to a dict of its ports, bridge local
+    port excluded. Each port name maps to the type, external_ids and
+    ofport (None if unset) of its interface, or None if it has no
+    interface of the same name.
+    """
+    args = ["ovs-vsctl", "--timeout=2", "--format=json",
+            "--", "--columns=name,ports", "list", "Bridge",
+            "--", "--columns=_uuid,name", "list", "Port",
+            "--", "--columns=name,type,external_ids,ofport", "list",
+            "Interface"]
+    try:
+        output = utils.execute(args, root_helper=root_helper)
+        bridges, ports, interfaces = [_ovsdb_rows(jsonutils.loads(line))
+                                      for line in output.splitlines()
+                                      if line.strip()]
+    except Exception, e:
+        LOG.exception(_("Unable to retrieve bridge ports. Exception: %s"), e)
+        return {}
 
-        for port_name in port_names:
-            self.delete_port(port_name)
+    port_names = dict((port['_uuid'], port['name']) for port in ports)
+    interfaces = dict((interface['name'],
+                       {'type': interface['type'],
+                        'external_ids': interface['external_ids'],
+                        'ofport': interface['ofport'] or None})
+                      for interface in interfaces)
+    bridge_ports = {}
+    for bridge in bridges:
+        names = [port_names[uuid] for uuid in _ovsdb_set(bridge['ports'])
+                 if uuid in port_names]
+        bridge_ports[bridge['name']] = dict(
+            (name, interfaces.get(name)) for name in names
+            if name != bridge['name'])
+    return bridge_ports
 
 
 def get_bridge_for_iface(root_helper, iface):
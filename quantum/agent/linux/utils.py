@@ -17,23 +17,193 @@
 #
 # @author: Juliano Martinez, Locaweb.
 
+import errno
 import fcntl
+import json
 import os
 import shlex
 import socket
 import struct
+import time
 
+import eventlet
+from eventlet.green import socket as green_socket
 from eventlet.green import subprocess
 
 from quantum.common import utils
+from quantum.openstack.common import cfg
 from quantum.openstack.common import log as logging
 
 
 LOG = logging.getLogger(__name__)
 
+OPTS = [
+    cfg.StrOpt('root_helper_daemon_socket',
+               help=_('Unix socket of a running quantum-rootwrap-daemon. '
+                      'When set, commands that would be run through '
+                      'root_helper are sent to the daemon instead.')),
+]
+cfg.CONF.register_opts(OPTS)
+
+
+# Callables notified of each command run, see register_execute_hook()
+_execute_hooks = []
+
+
+def register_execute_hook(hook):
+    """Have hook(cmd, result, duration) called after each command.
+
+    cmd is the command without root_helper, result its CommandResult (None
+    if it timed out or could not be run) and duration the wall time in
+    seconds it took.
+    """
+    if hook not in _execute_hooks:
+        _execute_hooks.append(hook)
+
+
+def unregister_execute_hook(hook):
+    if hook in _execute_hooks:
+        _execute_hooks.remove(hook)
+
+
+def _notify_execute_hooks(cmd, result, duration):
+    for hook in _execute_hooks:
+        try:
+            hook(cmd, result, duration)
+        except Exception:
+            LOG.exception(_("Execute hook %s failed"), hook)
+
+
+class CommandResult(object):
+    """Outcome of a command run by run()."""
+
+    __slots__ = ['cmd', 'returncode', 'stdout', 'stderr']
+
+    def __init__(self, cmd, returncode, stdout, stderr):
+        self.cmd = cmd
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+
+    def __str__(self):
+        return (_("\nCommand: %(cmd)s\nExit code: %(code)s\n"
+                  "Stdout: %(stdout)r\nStderr: %(stderr)r") %
+                {'cmd': self.cmd, 'code': self.returncode,
+                 'stdout': self.stdout, 'stderr': self.stderr})
+
+
+class ExecuteTimeout(RuntimeError):
+    """A command did not complete in time and was killed."""
+
+    def __init__(self, cmd, timeout):
+        super(ExecuteTimeout, self).__init__(
+            _("Command %(cmd)s timed out after %(timeout)s seconds") %
+            {'cmd': cmd, 'timeout': timeout})
+        self.cmd = cmd
+        self.timeout = timeout
+
+
+def _execute_in_daemon(socket_path, cmd, process_input=None, timeout=None):
+    """Run cmd through quantum-rootwrap-daemon.
+
+    Returns a (returncode, stdout, stderr) tuple, or None if the daemon
+    could not be reached, in which case cmd was not run. Raises
+    RuntimeError if the daemon did not reply, as cmd may have run.
+    """
+    request = {'cmd': cmd}
+    if process_input is not None:
+        request['process_input'] = process_input
+    sock = green_socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        try:
+            sock.connect(socket_path)
+        except socket.timeout:
+            raise ExecuteTimeout(cmd, timeout)
+        except socket.error as e:
+            LOG.warning(_("Unable to connect to rootwrap daemon at "
+                          "%(path)s: %(error)s"),
+                        {'path': socket_path, 'error': e})
+            return None
+        sockfile = sock.makefile('rw')
+        sockfile.write(json.dumps(request, encoding='latin-1') + '\n')
+        sockfile.flush()
+        line = sockfile.readline()
+        if not line:
+            raise ValueError(_('connection closed without a reply'))
+        reply = json.loads(line)
+        return (reply['returncode'], reply['stdout'].encode('latin-1'),
+                reply['stderr'].encode('latin-1'))
+    except socket.timeout:
+        raise ExecuteTimeout(cmd, timeout)
+    except (socket.error, ValueError, KeyError, TypeError,
+            AttributeError) as e:
+        raise RuntimeError(_("Command %(cmd)s failed in rootwrap daemon: "
+                             "%(error)s") % {'cmd': cmd, 'error': e})
+    finally:
+        sock.close()
+
+
+def _communicate(obj, process_input=None):
+    """Green version of Popen.communicate().
+
+    The one from eventlet.green.subprocess blocks in poll() with Python
+    2.7, stalling every other green thread until the command exits.
+    """
+    def write_input():
+        try:
+            if process_input:
+                obj.stdin.write(process_input)
+            obj.stdin.close()
+        except (IOError, OSError) as e:
+            # Like communicate(), ignore commands not reading their input
+            if e.errno != errno.EPIPE:
+                raise
+
+    writer = eventlet.spawn(write_input)
+    stderr_reader = eventlet.spawn(obj.stderr.read)
+    try:
+        _stdout = obj.stdout.read()
+        _stderr = stderr_reader.wait()
+        writer.wait()
+    finally:
+        writer.kill()
+        stderr_reader.kill()
+    obj.wait()
+    return _stdout, _stderr
+
+
+def run(cmd, root_helper=None, process_input=None, addl_env=None,
+        timeout=None):
+    """Run cmd and return a CommandResult, whatever its exit code.
+
+    If timeout is given, the command is killed and ExecuteTimeout raised
+    when it runs longer than timeout seconds.
+    """
+    if not _execute_hooks:
+        return _run(cmd, root_helper, process_input, addl_env, timeout)
+
+    result = None
+    start = time.time()
+    try:
+        result = _run(cmd, root_helper, process_input, addl_env, timeout)
+    finally:
+        _notify_execute_hooks(map(str, cmd), result, time.time() - start)
+    return result
+
+
+def _run(cmd, root_helper, process_input, addl_env, timeout):
+    daemon_socket = cfg.CONF.root_helper_daemon_socket
+    # The daemon runs commands with the environment of its filters only
+    if root_helper and daemon_socket and not addl_env:
+        cmd = map(str, cmd)
+        LOG.debug(_("Running command through rootwrap daemon: %s"), cmd)
+        reply = _execute_in_daemon(daemon_socket, cmd, process_input,
+                                   timeout)
+        if reply is not None:
+            return CommandResult(cmd, *reply)
+        # Not run by the daemon, run it through root_helper instead
 
-def execute(cmd, root_helper=None, process_input=None, addl_env=None,
-            check_exit_code=True, return_stderr=False):
     if root_helper:
         cmd = shlex.split(root_helper) + cmd
     cmd = map(str, cmd)
@@ -48,18 +218,34 @@ def execute(cmd, root_helper=None, process_input=None, addl_env=None,
                                  stderr=subprocess.PIPE,
                                  env=env)
 
-    _stdout, _stderr = (process_input and
-                        obj.communicate(process_input) or
-                        obj.communicate())
-    obj.stdin.close()
-    m = _("\nCommand: %(cmd)s\nExit code: %(code)s\nStdout: %(stdout)r\n"
-          "Stderr: %(stderr)r") % {'cmd': cmd, 'code': obj.returncode,
-                                   'stdout': _stdout, 'stderr': _stderr}
-    LOG.debug(m)
-    if obj.returncode and check_exit_code:
-        raise RuntimeError(m)
-
-    return return_stderr and (_stdout, _stderr) or _stdout
+    timer = eventlet.Timeout(timeout)
+    try:
+        _stdout, _stderr = _communicate(obj, process_input)
+    except eventlet.Timeout as e:
+        if e is not timer:
+            raise
+        try:
+            obj.kill()
+        except OSError:
+            # Already exited
+            pass
+        obj.wait()
+        raise ExecuteTimeout(cmd, timeout)
+    finally:
+        timer.cancel()
+    return CommandResult(cmd, obj.returncode, _stdout, _stderr)
+
+
+def execute(cmd, root_helper=None, process_input=None, addl_env=None,
+            check_exit_code=True, return_stderr=False, timeout=None):
+    result = run(cmd, root_helper, process_input, addl_env, timeout)
+    # Only rendered if logged
+    LOG.debug('%s', result)
+    if result.returncode and check_exit_code:
+        raise RuntimeError(str(result))
+
+    return (return_stderr and (result.stdout, result.stderr) or
+            result.stdout)
 
 
 def get_interface_mac(interface):
@@ -125,7 +125,7 @@ class MetadataProxyHandler(object):
         resp, content = h.request(url, headers=headers)
 
         if resp.status == 200:
-            LOG.debug(str(resp))
+            LOG.debug('%s', resp)
             return content
         elif resp.status == 403:
             msg = _(
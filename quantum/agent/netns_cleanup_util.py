@@ -16,6 +16,7 @@
 #    under the License.
 
 import re
+import time
 
 import eventlet
 
@@ -34,6 +35,8 @@ from quantum.openstack.common import log as logging
 LOG = logging.getLogger(__name__)
 NS_MANGLING_PATTERN = ('(%s|%s)' % (dhcp_agent.NS_PREFIX, l3_agent.NS_PREFIX) +
                        attributes.UUID_PATTERN)
+# Seconds between two progress reports
+PROGRESS_INTERVAL = 10
 
 
 class NullDelegate(object):
@@ -66,6 +69,9 @@ def setup_conf():
         cfg.BoolOpt('force',
                     default=False,
                     help=_('Delete the namespace by removing all devices.')),
+        cfg.IntOpt('workers',
+                   default=16,
+                   help=_('Number of namespaces cleaned up concurrently.')),
     ]
     conf = cfg.CommonConfigOpts()
     conf.register_opts(opts)
@@ -90,34 +96,68 @@ def kill_dhcp(conf, namespace):
         dhcp_driver.disable()
 
 
-def eligible_for_deletion(conf, namespace, force=False):
+def get_namespace_devices(conf):
+    """Return the non-loopback devices of every namespace by namespace."""
+    try:
+        return ip_lib.IPWrapper.get_devices_by_namespace(
+            conf.root_helper, exclude_loopback=True)
+    except RuntimeError:
+        LOG.debug(_('Unable to list the devices of all namespaces at once'))
+        return {}
+
+
+def eligible_for_deletion(conf, namespace, force=False, devices=None):
     """Determine whether a namespace is eligible for deletion.
 
     Eligibility is determined by having only the lo device or if force
-    is passed as a parameter.
+    is passed as a parameter. devices, as returned by
+    get_namespace_devices(), saves listing the namespace devices.
     """
 
     # filter out namespaces without UUID as the name
     if not re.match(NS_MANGLING_PATTERN, namespace):
         return False
 
+    if devices and namespace in devices:
+        return force or not devices[namespace]
+
     ip = ip_lib.IPWrapper(conf.root_helper, namespace)
     return force or ip.namespace_is_empty()
 
 
+def unplug_ovs_port(conf, device_name):
+    bridge_name = ovs_lib.get_bridge_for_iface(conf.root_helper, device_name)
+    if bridge_name:
+        bridge = ovs_lib.OVSBridge(bridge_name,
+                                   conf.root_helper)
+        bridge.delete_port(device_name)
+    else:
+        LOG.debug(_('Unable to find bridge for device: %s'), device_name)
+
+
 def unplug_device(conf, device):
     try:
         device.link.delete()
     except RuntimeError:
         # Maybe the device is OVS port, so try to delete
-        bridge_name = ovs_lib.get_bridge_for_iface(conf.root_helper,
-                                                   device.name)
-        if bridge_name:
-            bridge = ovs_lib.OVSBridge(bridge_name,
-                                       conf.root_helper)
-            bridge.delete_port(device.name)
-        else:
-            LOG.debug(_('Unable to find bridge for device: %s'), device.name)
+        unplug_ovs_port(conf, device.name)
+
+
+def unplug_devices(conf, ip, devices):
+    """Delete devices of the namespace of ip with 'ip -batch'.
+
+    Devices ip fails to delete, such as OVS ports, are removed from their
+    bridge.
+    """
+    try:
+        failed = ip.delete_devices([device.name for device in devices])
+    except ip_lib.IpBatchError:
+        # Nothing was run, go through the devices one by one
+        for device in devices:
+            unplug_device(conf, device)
+        return
+    for device_name in failed:
+        unplug_ovs_port(conf, device_name)
 
 
 def destroy_namespace(conf, namespace, force=False):
@@ -135,12 +175,40 @@ def destroy_namespace(conf, namespace, force=False):
             # NOTE: The dhcp driver will remove the namespace if is it empty,
             # so a second check is required here.
             if ip.netns.exists(namespace):
-                for device in ip.get_devices(exclude_loopback=True):
-                    unplug_device(conf, device)
+                unplug_devices(conf, ip,
+                               ip.get_devices(exclude_loopback=True))
 
         ip.garbage_collect_namespace()
     except Exception, e:
         LOG.exception(_('Error unable to destroy namespace: %s'), namespace)
+        return False
+    return True
+
+
+def destroy_namespaces(conf, namespaces, force=False):
+    """Destroy namespaces with conf.workers of them handled concurrently.
+
+    Progress and throughput are logged every PROGRESS_INTERVAL seconds.
+    """
+    pool = eventlet.GreenPool(conf.workers)
+    total = len(namespaces)
+    done = failed = 0
+    start = last_report = time.time()
+
+    def destroy(namespace):
+        return destroy_namespace(conf, namespace, force)
+
+    for destroyed in pool.imap(destroy, namespaces):
+        done += 1
+        if not destroyed:
+            failed += 1
+        now = time.time()
+        if now - last_report >= PROGRESS_INTERVAL or done == total:
+            last_report = now
+            LOG.info(_('Cleaned up %(done)d of %(total)d namespaces '
+                       '(%(failed)d failed), %(rate).1f namespaces/s'),
+                     {'done': done, 'total': total, 'failed': failed,
+                      'rate': done / max(now - start, 0.001)})
 
 
 def main():
@@ -166,12 +234,12 @@ def main():
     conf()
 
     # Identify namespaces that are candidates for deletion.
+    devices = get_namespace_devices(conf)
     candidates = [ns for ns in
                   ip_lib.IPWrapper.get_namespaces(conf.root_helper)
-                  if eligible_for_deletion(conf, ns, conf.force)]
+                  if eligible_for_deletion(conf, ns, conf.force, devices)]
 
     if candidates:
         eventlet.sleep(2)
 
-        for namespace in candidates:
-            destroy_namespace(conf, namespace, conf.force)
+        destroy_namespaces(conf, candidates, conf.force)
@@ -17,6 +17,7 @@
 
 from quantum.agent import l3_agent
 from quantum.agent.linux import interface
+from quantum.agent.linux import ip_lib
 from quantum.agent.linux import ovs_lib
 from quantum.common import config
 from quantum.openstack.common import cfg
@@ -49,6 +50,32 @@ def setup_conf():
     return conf
 
 
+def is_stale_device(interface):
+    """Whether a port is a tap or veth left behind once removed from OVS.
+
+    Internal ports go away with their port, and devices other than VIFs
+    (physical NICs, bonds, VLAN devices) are never deleted.
+    """
+    return (ovs_lib.is_vif_interface(interface) and
+            interface['type'] == '' and
+            interface['ofport'] is not None and interface['ofport'] > 0)
+
+
+def delete_devices(conf, device_names):
+    """Delete the devices with a single 'ip -batch' run."""
+    if not device_names:
+        return
+    LOG.info(_("Deleting %d devices"), len(device_names))
+    try:
+        failed = ip_lib.IPWrapper(conf.root_helper).delete_devices(
+            device_names)
+    except RuntimeError, e:
+        LOG.error(_("Unable to delete devices. Exception: %s"), e)
+        return
+    if failed:
+        LOG.warn(_("Unable to delete devices: %s"), ', '.join(failed))
+
+
 def main():
     """Main method for cleaning up OVS bridges.
 
@@ -60,16 +87,28 @@ def main():
 
     configuration_bridges = set([conf.ovs_integration_bridge,
                                  conf.external_network_bridge])
-    ovs_bridges = set(ovs_lib.get_bridges(conf.root_helper))
+    # All ports and interfaces are read at once
+    bridge_ports = ovs_lib.get_bridge_ports(conf.root_helper)
+    ovs_bridges = set(bridge_ports)
 
     if conf.ovs_all_ports:
         bridges = ovs_bridges
     else:
         bridges = configuration_bridges & ovs_bridges
 
+    stale_devices = []
     for bridge in bridges:
-        LOG.info(_("Cleaning %s"), bridge)
+        ports = bridge_ports[bridge]
+        port_names = sorted(
+            name for name, interface in ports.iteritems()
+            if conf.ovs_all_ports or ovs_lib.is_vif_interface(interface))
+        LOG.info(_("Cleaning %(bridge)s: deleting %(count)d ports"),
+                 {'bridge': bridge, 'count': len(port_names)})
         ovs = ovs_lib.OVSBridge(bridge, conf.root_helper)
-        ovs.delete_ports(all_ports=conf.ovs_all_ports)
+        ovs.delete_port_list(port_names)
+        stale_devices.extend(name for name in port_names
+                             if is_stale_device(ports[name]))
+
+    delete_devices(conf, stale_devices)
 
     LOG.info(_("OVS cleanup completed successfully"))
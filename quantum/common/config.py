@@ -38,6 +38,15 @@ core_opts = [
                help=_("The host IP to bind to")),
     cfg.IntOpt('bind_port', default=9696,
                help=_("The port to bind to")),
+    cfg.IntOpt('api_workers', default=0,
+               help=_("Number of worker processes serving the API, 0 to "
+                      "serve it from the main process")),
+    cfg.IntOpt('api_worker_stop_timeout', default=60,
+               help=_("Seconds a stopping API worker waits for the requests "
+                      "it is serving to complete")),
+    cfg.IntOpt('rpc_workers', default=0,
+               help=_("Number of worker processes consuming the RPC of the "
+                      "plugin, 0 to consume it from the API process")),
     cfg.StrOpt('api_paste_config', default="api-paste.ini",
                help=_("The API paste config file to use")),
     cfg.StrOpt('api_extensions_path', default="",
@@ -164,6 +164,12 @@ def clear_db(base=BASE):
     _ENGINE = None
 
 
+def dispose():
+    """Drop the pooled connections, e.g. after forking a worker."""
+    if _ENGINE:
+        _ENGINE.dispose()
+
+
 def get_session(autocommit=True, expire_on_commit=False):
     """Helper method to grab session"""
     global _MAKER, _ENGINE
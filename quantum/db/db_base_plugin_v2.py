@@ -19,6 +19,7 @@ import datetime
 import random
 
 import netaddr
+import sqlalchemy as sa
 from sqlalchemy import orm
 from sqlalchemy.orm import exc
 
@@ -401,6 +402,32 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
                         "%(network_id)s and ip address %(ip_address)s."),
                       locals())
 
+    def update_fixed_ip_lease_expirations(self, context, leases):
+        """Update the expiration of the fixed IPs of many leases.
+
+        leases is a list of dicts with the network_id, ip_address and
+        lease_remaining of each lease. The leases sharing the same
+        lease_remaining, usually all of them, are updated with a single
+        UPDATE statement.
+        """
+        now = timeutils.utcnow()
+        by_remaining = {}
+        for lease in leases:
+            ips = by_remaining.setdefault(lease['lease_remaining'], {})
+            ips.setdefault(lease['network_id'], []).append(
+                lease['ip_address'])
+
+        model = models_v2.IPAllocation
+        with context.session.begin(subtransactions=True):
+            for lease_remaining, ips in by_remaining.iteritems():
+                expiration = now + datetime.timedelta(seconds=lease_remaining)
+                query = context.session.query(model).filter(sa.or_(
+                    *[sa.and_(model.network_id == network_id,
+                              model.ip_address.in_(ip_addresses))
+                      for network_id, ip_addresses in ips.iteritems()]))
+                query.update({'expiration': expiration},
+                             synchronize_session=False)
+
     @staticmethod
     def _delete_ip_allocation(context, network_id, subnet_id, ip_address):
 
@@ -16,6 +16,7 @@
 from sqlalchemy.orm import exc
 
 from quantum.api.v2 import attributes
+from quantum.db import models_v2
 from quantum import manager
 from quantum.openstack.common import log as logging
 
@@ -24,7 +25,11 @@ LOG = logging.getLogger(__name__)
 
 
 class DhcpRpcCallbackMixin(object):
-    """A mix-in that enable DHCP agent support in plugin implementations."""
+    """A mix-in that enable DHCP agent support in plugin implementations.
+
+    get_networks_info and update_lease_expirations were added in version
+    1.1 of the API.
+    """
 
     def get_active_networks(self, context, **kwargs):
         """Retrieve and return a list of the active network ids."""
@@ -47,6 +52,98 @@ class DhcpRpcCallbackMixin(object):
         network['ports'] = plugin.get_ports(context, filters=filters)
         return network
 
+    def get_networks_info(self, context, **kwargs):
+        """Retrieve and return the networks in network_ids with their
+        subnets and ports.
+
+        Only the attributes needed for DHCP are returned. They are read
+        with five queries, on the networks, subnets, DNS servers, host
+        routes and ports with their fixed IPs, whatever their number.
+        """
+        host = kwargs.get('host')
+        network_ids = kwargs.get('network_ids')
+        LOG.debug(_('Info on %(count)d networks requested from %(host)s'),
+                  {'count': len(network_ids), 'host': host})
+        if not network_ids:
+            return []
+        session = context.session
+
+        networks = {}
+        query = session.query(models_v2.Network.id,
+                              models_v2.Network.tenant_id,
+                              models_v2.Network.admin_state_up)
+        for row in query.filter(models_v2.Network.id.in_(network_ids)):
+            networks[row.id] = {'id': row.id,
+                                'tenant_id': row.tenant_id,
+                                'admin_state_up': row.admin_state_up,
+                                'subnets': [],
+                                'ports': []}
+        if not networks:
+            return []
+        network_ids = networks.keys()
+
+        subnets = {}
+        query = session.query(models_v2.Subnet.id,
+                              models_v2.Subnet.network_id,
+                              models_v2.Subnet.ip_version,
+                              models_v2.Subnet.cidr,
+                              models_v2.Subnet.gateway_ip,
+                              models_v2.Subnet.enable_dhcp)
+        for row in query.filter(models_v2.Subnet.network_id.in_(network_ids)):
+            subnets[row.id] = {'id': row.id,
+                               'network_id': row.network_id,
+                               'ip_version': row.ip_version,
+                               'cidr': row.cidr,
+                               'gateway_ip': row.gateway_ip,
+                               'enable_dhcp': row.enable_dhcp,
+                               'dns_nameservers': [],
+                               'host_routes': []}
+            networks[row.network_id]['subnets'].append(subnets[row.id])
+
+        if subnets:
+            query = session.query(models_v2.DNSNameServer.subnet_id,
+                                  models_v2.DNSNameServer.address)
+            query = query.join(
+                models_v2.Subnet,
+                models_v2.Subnet.id == models_v2.DNSNameServer.subnet_id)
+            for row in query.filter(
+                    models_v2.Subnet.network_id.in_(network_ids)):
+                subnets[row.subnet_id]['dns_nameservers'].append(row.address)
+
+            query = session.query(models_v2.Route.subnet_id,
+                                  models_v2.Route.destination,
+                                  models_v2.Route.nexthop)
+            query = query.join(
+                models_v2.Subnet,
+                models_v2.Subnet.id == models_v2.Route.subnet_id)
+            for row in query.filter(
+                    models_v2.Subnet.network_id.in_(network_ids)):
+                subnets[row.subnet_id]['host_routes'].append(
+                    {'destination': row.destination,
+                     'nexthop': row.nexthop})
+
+        ports = {}
+        query = session.query(models_v2.Port.id,
+                              models_v2.Port.network_id,
+                              models_v2.Port.mac_address,
+                              models_v2.IPAllocation.subnet_id,
+                              models_v2.IPAllocation.ip_address)
+        query = query.outerjoin(
+            models_v2.IPAllocation,
+            models_v2.IPAllocation.port_id == models_v2.Port.id)
+        for row in query.filter(models_v2.Port.network_id.in_(network_ids)):
+            port = ports.get(row.id)
+            if port is None:
+                port = ports[row.id] = {'id': row.id,
+                                        'network_id': row.network_id,
+                                        'mac_address': row.mac_address,
+                                        'fixed_ips': []}
+                networks[row.network_id]['ports'].append(port)
+            if row.subnet_id:
+                port['fixed_ips'].append({'subnet_id': row.subnet_id,
+                                          'ip_address': row.ip_address})
+        return networks.values()
+
     def get_dhcp_port(self, context, **kwargs):
         """Allocate a DHCP port for the host and return port information.
 
@@ -168,3 +265,18 @@ class DhcpRpcCallbackMixin(object):
 
         plugin.update_fixed_ip_lease_expiration(context, network_id,
                                                 ip_address, lease_remaining)
+
+    def update_lease_expirations(self, context, **kwargs):
+        """Update the expiration of a batch of leases.
+
+        Each lease is a dict with the network_id, ip_address and
+        lease_remaining of the lease.
+        """
+        host = kwargs.get('host')
+        leases = kwargs.get('leases')
+
+        LOG.debug(_('Updating %(count)d lease expirations from %(host)s.'),
+                  {'count': len(leases), 'host': host})
+        plugin = manager.QuantumManager.get_plugin()
+
+        plugin.update_fixed_ip_lease_expirations(context, leases)
@@ -31,6 +31,7 @@ from quantum.db import l3_rpc_agent_api
 from quantum.db import model_base
 from quantum.db import models_v2
 from quantum.extensions import l3
+from quantum.openstack.common import cfg
 from quantum.openstack.common import log as logging
 from quantum.openstack.common.notifier import api as notifier_api
 from quantum.openstack.common import uuidutils
@@ -158,9 +159,8 @@ class L3_NAT_db_mixin(l3.RouterPluginBase):
             # Ensure we actually have something to update
             if r.keys():
                 router_db.update(r)
-        routers = self.get_sync_data(context.elevated(),
-                                     [router_db['id']])
-        l3_rpc_agent_api.L3AgentNofity.routers_updated(context, routers)
+        self._notify_routers_updated(context, [router_db['id']],
+                                     'update_router')
         return self._make_router_dict(router_db)
 
     def _update_router_gw_info(self, context, router_id, info):
@@ -352,8 +352,8 @@ class L3_NAT_db_mixin(l3.RouterPluginBase):
                  'device_owner': DEVICE_OWNER_ROUTER_INTF,
                  'name': ''}})
 
-        routers = self.get_sync_data(context.elevated(), [router_id])
-        l3_rpc_agent_api.L3AgentNofity.routers_updated(context, routers)
+        self._notify_routers_updated(context, [router_id],
+                                     'add_router_interface')
         info = {'port_id': port['id'],
                 'subnet_id': port['fixed_ips'][0]['subnet_id']}
         notifier_api.notify(context,
@@ -430,8 +430,8 @@ class L3_NAT_db_mixin(l3.RouterPluginBase):
             if not found:
                 raise l3.RouterInterfaceNotFoundForSubnet(router_id=router_id,
                                                           subnet_id=subnet_id)
-        routers = self.get_sync_data(context.elevated(), [router_id])
-        l3_rpc_agent_api.L3AgentNofity.routers_updated(context, routers)
+        self._notify_routers_updated(context, [router_id],
+                                     'remove_router_interface')
         notifier_api.notify(context,
                             notifier_api.publisher_id('network'),
                             'router.interface.delete',
@@ -641,8 +641,8 @@ class L3_NAT_db_mixin(l3.RouterPluginBase):
             raise
         router_id = floatingip_db['router_id']
         if router_id:
-            routers = self.get_sync_data(context.elevated(), [router_id])
-            l3_rpc_agent_api.L3AgentNofity.routers_updated(context, routers)
+            self._notify_routers_updated(context, [router_id],
+                                         'create_floatingip')
         return self._make_floatingip_dict(floatingip_db)
 
     def update_floatingip(self, context, id, floatingip):
@@ -663,8 +663,8 @@ class L3_NAT_db_mixin(l3.RouterPluginBase):
         if router_id and router_id != before_router_id:
             router_ids.append(router_id)
         if router_ids:
-            routers = self.get_sync_data(context.elevated(), router_ids)
-            l3_rpc_agent_api.L3AgentNofity.routers_updated(context, routers)
+            self._notify_routers_updated(context, router_ids,
+                                         'update_floatingip')
         return self._make_floatingip_dict(floatingip_db)
 
     def delete_floatingip(self, context, id):
@@ -676,8 +676,8 @@ class L3_NAT_db_mixin(l3.RouterPluginBase):
                              floatingip['floating_port_id'],
                              l3_port_check=False)
         if router_id:
-            routers = self.get_sync_data(context.elevated(), [router_id])
-            l3_rpc_agent_api.L3AgentNofity.routers_updated(context, routers)
+            self._notify_routers_updated(context, [router_id],
+                                         'delete_floatingip')
 
     def get_floatingip(self, context, id, fields=None):
         floatingip = self._get_floatingip(context, id)
@@ -723,8 +723,8 @@ class L3_NAT_db_mixin(l3.RouterPluginBase):
                 raise Exception(_('Multiple floating IPs found for port %s')
                                 % port_id)
         if router_id:
-            routers = self.get_sync_data(context.elevated(), [router_id])
-            l3_rpc_agent_api.L3AgentNofity.routers_updated(context, routers)
+            self._notify_routers_updated(context, [router_id],
+                                         'disassociate_floatingips')
 
     def _check_l3_view_auth(self, context, network):
         return policy.check(context,
@@ -801,134 +801,129 @@ class L3_NAT_db_mixin(l3.RouterPluginBase):
         else:
             return [n for n in nets if n['id'] not in ext_nets]
 
-    def _get_sync_routers(self, context, router_ids=None):
-        """Query routers and their gw ports for l3 agent.
-
-        Query routers with the router_ids. The gateway ports, if any,
-        will be queried too.
-        l3 agent has an option to deal with only one router id. In addition,
-        when we need to notify the agent the data about only one router
-        (when modification of router, its interfaces, gw_port and floatingips),
-        we will have router_ids.
-        @param router_ids: the list of router ids which we want to query.
-                           if it is None, all of routers will be queried.
-        @return: a list of dicted routers with dicted gw_port populated if any
+    def _notify_routers_updated(self, context, router_ids, operation):
+        """Tell the L3 agents that operation changed the routers.
+
+        With l3_notify_router_ids set only the router ids are sent, and
+        the agents fetch the routers they host; otherwise the full
+        routers are cast to every agent.
         """
-        router_query = context.session.query(Router)
-        if router_ids:
-            router_query = router_query.filter(Router.id.in_(router_ids))
-        routers = router_query.all()
-        gw_port_ids = []
-        if not routers:
-            return []
-        for router in routers:
-            gw_port_id = router.gw_port_id
-            if gw_port_id:
-                gw_port_ids.append(gw_port_id)
-        gw_ports = []
-        if gw_port_ids:
-            gw_ports = self._get_sync_gw_ports(context, gw_port_ids)
-        gw_port_id_gw_port_dict = {}
-        for gw_port in gw_ports:
-            gw_port_id_gw_port_dict[gw_port['id']] = gw_port
-        router_id_gw_port_id_dict = {}
-        for router in routers:
-            router_id_gw_port_id_dict[router.id] = router.gw_port_id
-        routers_list = [self._make_router_dict(c, None) for c in routers]
-        for router in routers_list:
-            gw_port_id = router_id_gw_port_id_dict[router['id']]
-            if gw_port_id:
-                router['gw_port'] = gw_port_id_gw_port_dict[gw_port_id]
-        return routers_list
-
-    def _get_sync_floating_ips(self, context, router_ids):
-        """Query floating_ips that relate to list of router_ids."""
-        if not router_ids:
-            return []
-        return self.get_floatingips(context, {'router_id': router_ids})
-
-    def _get_sync_gw_ports(self, context, gw_port_ids):
-        if not gw_port_ids:
-            return []
-        filters = {'id': gw_port_ids}
-        gw_ports = self.get_ports(context, filters)
-        if gw_ports:
-            self._populate_subnet_for_ports(context, gw_ports)
-        return gw_ports
-
-    def _get_sync_interfaces(self, context, router_ids):
-        """Query router interfaces that relate to list of router_ids."""
-        if not router_ids:
-            return []
-        filters = {'device_id': router_ids,
-                   'device_owner': [DEVICE_OWNER_ROUTER_INTF]}
-        interfaces = self.get_ports(context, filters)
-        if interfaces:
-            self._populate_subnet_for_ports(context, interfaces)
-        return interfaces
-
-    def _populate_subnet_for_ports(self, context, ports):
-        """Populate ports with subnet.
-
-        These ports already have fixed_ips populated.
+        if cfg.CONF.l3_notify_router_ids:
+            l3_rpc_agent_api.L3AgentNofity.routers_changed(
+                context, router_ids, operation)
+        else:
+            routers = self.get_sync_data(context.elevated(), router_ids)
+            l3_rpc_agent_api.L3AgentNofity.routers_updated(context, routers)
+
+    def _get_sync_ports(self, context, router_ids=None):
+        """Query the gateway and interface ports of routers for l3 agent.
+
+        A single query fetches the ports with their fixed IPs and the
+        cidr and gateway of their subnet.
+        @return: a dict of dicted ports, by port id, with the subnet
+                 populated for the ports having a single fixed IP
         """
-        if not ports:
-            return
-        subnet_id_ports_dict = {}
-        for port in ports:
-            fixed_ips = port.get('fixed_ips', [])
-            if len(fixed_ips) > 1:
+        query = context.session.query(
+            models_v2.Port.id, models_v2.Port.name,
+            models_v2.Port.network_id, models_v2.Port.tenant_id,
+            models_v2.Port.mac_address, models_v2.Port.admin_state_up,
+            models_v2.Port.status, models_v2.Port.device_id,
+            models_v2.Port.device_owner,
+            models_v2.IPAllocation.subnet_id,
+            models_v2.IPAllocation.ip_address,
+            models_v2.Subnet.cidr, models_v2.Subnet.gateway_ip)
+        query = query.outerjoin(
+            models_v2.IPAllocation,
+            models_v2.IPAllocation.port_id == models_v2.Port.id)
+        query = query.outerjoin(
+            models_v2.Subnet,
+            models_v2.Subnet.id == models_v2.IPAllocation.subnet_id)
+        query = query.filter(models_v2.Port.device_owner.in_(
+            [DEVICE_OWNER_ROUTER_INTF, DEVICE_OWNER_ROUTER_GW]))
+        if router_ids:
+            query = query.filter(models_v2.Port.device_id.in_(router_ids))
+
+        ports = {}
+        subnets = {}
+        for row in query:
+            port = ports.get(row.id)
+            if port is None:
+                port = ports[row.id] = {'id': row.id,
+                                        'name': row.name,
+                                        'network_id': row.network_id,
+                                        'tenant_id': row.tenant_id,
+                                        'mac_address': row.mac_address,
+                                        'admin_state_up': row.admin_state_up,
+                                        'status': row.status,
+                                        'fixed_ips': [],
+                                        'device_id': row.device_id,
+                                        'device_owner': row.device_owner}
+            if row.subnet_id:
+                port['fixed_ips'].append({'subnet_id': row.subnet_id,
+                                          'ip_address': row.ip_address})
+                subnets[row.subnet_id] = {'id': row.subnet_id,
+                                          'cidr': row.cidr,
+                                          'gateway_ip': row.gateway_ip}
+        for port in ports.itervalues():
+            if len(port['fixed_ips']) > 1:
                 LOG.error(_("Ignoring multiple IPs on router port %s"),
                           port['id'])
-                continue
-            # Empty fixed_ips should not happen
-            fixed_ip = fixed_ips[0]
-            my_ports = subnet_id_ports_dict.get(fixed_ip['subnet_id'], [])
-            my_ports.append(port)
-            subnet_id_ports_dict[fixed_ip['subnet_id']] = my_ports
-        if not subnet_id_ports_dict:
-            return
-        filters = {'id': subnet_id_ports_dict.keys()}
-        fields = ['id', 'cidr', 'gateway_ip']
-        subnet_dicts = self.get_subnets(context, filters, fields)
-        for subnet_dict in subnet_dicts:
-            ports = subnet_id_ports_dict.get(subnet_dict['id'], [])
-            for port in ports:
-                # TODO(gongysh) stash the subnet into fixed_ips
-                # to make the payload smaller.
-                port['subnet'] = {'id': subnet_dict['id'],
-                                  'cidr': subnet_dict['cidr'],
-                                  'gateway_ip': subnet_dict['gateway_ip']}
-
-    def _process_sync_data(self, routers, interfaces, floating_ips):
+            elif port['fixed_ips']:
+                port['subnet'] = subnets[port['fixed_ips'][0]['subnet_id']]
+        return ports
+
+    def get_sync_data(self, context, router_ids=None):
+        """Query routers and their related floating_ips, interfaces.
+
+        The payload is built from three queries, on the routers, their
+        ports and their floating IPs, whatever the number of routers.
+        """
+        with context.session.begin(subtransactions=True):
+            # Columns only, so that the gw_port relationship is not loaded
+            router_query = context.session.query(
+                Router.id, Router.name, Router.tenant_id,
+                Router.admin_state_up, Router.status, Router.gw_port_id)
+            if router_ids:
+                router_query = router_query.filter(Router.id.in_(router_ids))
+            routers = router_query.all()
+            if not routers:
+                return []
+            ports = self._get_sync_ports(context, router_ids)
+            fip_query = context.session.query(FloatingIP)
+            if router_ids:
+                fip_query = fip_query.filter(
+                    FloatingIP.router_id.in_(router_ids))
+            else:
+                fip_query = fip_query.filter(FloatingIP.router_id.isnot(None))
+            floating_ips = fip_query.all()
+
         routers_dict = {}
-        for router in routers:
-            routers_dict[router['id']] = router
+        for row in routers:
+            router = {'id': row.id,
+                      'name': row.name,
+                      'tenant_id': row.tenant_id,
+                      'admin_state_up': row.admin_state_up,
+                      'status': row.status,
+                      'external_gateway_info': None}
+            gw_port = ports.get(row.gw_port_id)
+            if gw_port:
+                router['gw_port'] = gw_port
+                router['external_gateway_info'] = {
+                    'network_id': gw_port['network_id']}
+            routers_dict[row.id] = router
         for floating_ip in floating_ips:
             router = routers_dict.get(floating_ip['router_id'])
             if router:
-                router_floatingips = router.get(l3_constants.FLOATINGIP_KEY,
-                                                [])
-                router_floatingips.append(floating_ip)
-                router[l3_constants.FLOATINGIP_KEY] = router_floatingips
-        for interface in interfaces:
-            router = routers_dict.get(interface['device_id'])
+                router.setdefault(l3_constants.FLOATINGIP_KEY, []).append(
+                    self._make_floatingip_dict(floating_ip))
+        for port in ports.itervalues():
+            if port['device_owner'] != DEVICE_OWNER_ROUTER_INTF:
+                continue
+            router = routers_dict.get(port['device_id'])
             if router:
-                router_interfaces = router.get(l3_constants.INTERFACE_KEY, [])
-                router_interfaces.append(interface)
-                router[l3_constants.INTERFACE_KEY] = router_interfaces
+                router.setdefault(l3_constants.INTERFACE_KEY, []).append(port)
         return routers_dict.values()
 
-    def get_sync_data(self, context, router_ids=None):
-        """Query routers and their related floating_ips, interfaces."""
-        with context.session.begin(subtransactions=True):
-            routers = self._get_sync_routers(context,
-                                             router_ids)
-            router_ids = [router['id'] for router in routers]
-            floating_ips = self._get_sync_floating_ips(context, router_ids)
-            interfaces = self._get_sync_interfaces(context, router_ids)
-        return self._process_sync_data(routers, interfaces, floating_ips)
-
     def get_external_network_id(self, context):
         nets = self.get_networks(context, {'router:external': [True]})
         if len(nets) > 1:
@@ -14,6 +14,7 @@
 # limitations under the License.
 
 from quantum.common import topics
+from quantum.openstack.common import cfg
 from quantum.openstack.common import jsonutils
 from quantum.openstack.common import log as logging
 from quantum.openstack.common.rpc import proxy
@@ -21,9 +22,23 @@ from quantum.openstack.common.rpc import proxy
 
 LOG = logging.getLogger(__name__)
 
+l3_notify_opts = [
+    cfg.BoolOpt('l3_notify_router_ids', default=False,
+                help=_('Notify L3 agents of the ids of the routers changed '
+                       'and let them fetch the routers, instead of casting '
+                       'the full routers. Requires L3 agents supporting '
+                       'RPC API version 1.1')),
+]
+cfg.CONF.register_opts(l3_notify_opts)
+
 
 class L3AgentNotifyAPI(proxy.RpcProxy):
-    """API for plugin to notify L3 agent."""
+    """API for plugin to notify L3 agent.
+
+    API version history:
+        1.0 - Initial version.
+        1.1 - Added routers_changed, carrying router ids only.
+    """
     BASE_RPC_API_VERSION = '1.0'
 
     def __init__(self, topic=topics.L3_AGENT):
@@ -40,11 +55,22 @@ class L3AgentNotifyAPI(proxy.RpcProxy):
     def routers_updated(self, context, routers):
         if routers:
             LOG.debug(_('Nofity agent routers were updated:\n %s'),
-                      jsonutils.dumps(routers, indent=5))
+                      logging.LazyFormat(jsonutils.dumps, routers, indent=5))
             self.cast(context,
                       self.make_msg('routers_updated',
                                     routers=routers),
                       topic=self.topic)
 
+    def routers_changed(self, context, router_ids, operation=None):
+        if router_ids:
+            LOG.debug(_('Nofity agent routers %(router_ids)s were changed '
+                        'by %(operation)s'),
+                      {'router_ids': router_ids, 'operation': operation})
+            self.cast(context,
+                      self.make_msg('routers_changed',
+                                    router_ids=router_ids,
+                                    operation=operation),
+                      topic=self.topic, version='1.1')
+
 
 L3AgentNofity = L3AgentNotifyAPI()
@@ -29,17 +29,20 @@ class L3RpcCallbackMixin(object):
         """Sync routers according to filters to a specific agent.
 
         @param context: contain user information
-        @param kwargs: host, or router_id
+        @param kwargs: host, or router_ids
         @return: a list of routers
                  with their interfaces and floating_ips
         """
-        router_id = kwargs.get('router_id')
+        router_ids = kwargs.get('router_ids')
+        if router_ids is None and kwargs.get('router_id'):
+            # Agents predating router_ids
+            router_ids = [kwargs['router_id']]
         # TODO(gongysh) we will use host in kwargs for multi host BP
         context = quantum_context.get_admin_context()
         plugin = manager.QuantumManager.get_plugin()
-        routers = plugin.get_sync_data(context, router_id)
+        routers = plugin.get_sync_data(context, router_ids)
         LOG.debug(_("Routers returned to l3 agent:\n %s"),
-                  jsonutils.dumps(routers, indent=5))
+                  logging.LazyFormat(jsonutils.dumps, routers, indent=5))
         return routers
 
     def get_external_network_id(self, context, **kwargs):
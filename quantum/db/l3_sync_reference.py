@@ -0,0 +1,73 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Reference build of the L3 agent sync payload through the plugin API.
+
+L3_NAT_db_mixin.get_sync_data builds the same payload from a few queries.
+The unit tests check it against this one, and
+tools/l3_sync_data_benchmark.py compares their speed.
+"""
+
+from quantum.common import constants as l3_constants
+from quantum.db import l3_db
+
+
+def get_sync_data_from_plugin(plugin, context, router_ids=None):
+    """Build the L3 agent payload of plugin through its API."""
+    def add_subnets(ports):
+        subnet_ids = [port['fixed_ips'][0]['subnet_id'] for port in ports
+                      if len(port['fixed_ips']) == 1]
+        if not subnet_ids:
+            return
+        subnets = dict(
+            (subnet['id'], subnet) for subnet in plugin.get_subnets(
+                context, {'id': subnet_ids}, ['id', 'cidr', 'gateway_ip']))
+        for port in ports:
+            if len(port['fixed_ips']) == 1:
+                port['subnet'] = subnets[port['fixed_ips'][0]['subnet_id']]
+
+    with context.session.begin(subtransactions=True):
+        query = context.session.query(l3_db.Router)
+        if router_ids:
+            query = query.filter(l3_db.Router.id.in_(router_ids))
+        router_dbs = query.all()
+        if not router_dbs:
+            return []
+        routers = dict((router_db.id, plugin._make_router_dict(router_db))
+                       for router_db in router_dbs)
+        gw_port_ids = dict((router_db.gw_port_id, router_db.id)
+                           for router_db in router_dbs
+                           if router_db.gw_port_id)
+        if gw_port_ids:
+            gw_ports = plugin.get_ports(context,
+                                        {'id': gw_port_ids.keys()})
+            add_subnets(gw_ports)
+            for gw_port in gw_ports:
+                routers[gw_port_ids[gw_port['id']]]['gw_port'] = gw_port
+        floating_ips = plugin.get_floatingips(
+            context, {'router_id': routers.keys()})
+        interfaces = plugin.get_ports(
+            context, {'device_id': routers.keys(),
+                      'device_owner': [l3_db.DEVICE_OWNER_ROUTER_INTF]})
+        add_subnets(interfaces)
+    for floating_ip in floating_ips:
+        routers[floating_ip['router_id']].setdefault(
+            l3_constants.FLOATINGIP_KEY, []).append(floating_ip)
+    for interface in interfaces:
+        routers[interface['device_id']].setdefault(
+            l3_constants.INTERFACE_KEY, []).append(interface)
+    return routers.values()
@@ -388,6 +388,36 @@ def getLogger(name='unknown', version='unknown'):
     return _loggers[name]
 
 
+class LazyFormat(object):
+    """Log argument formatted as the result of func(*args, **kwargs).
+
+    func is only called when a record using it is emitted, so that
+    costly renderings of large payloads are skipped when the level of
+    the record is disabled:
+
+        LOG.debug(_('Routers: %s'), LazyFormat(jsonutils.dumps, routers))
+
+    The result is kept for the other handlers emitting the record.
+    """
+
+    def __init__(self, func, *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def _result(self):
+        if self.func is not None:
+            self.result = self.func(*self.args, **self.kwargs)
+            self.func = self.args = self.kwargs = None
+        return self.result
+
+    def __str__(self):
+        return str(self._result())
+
+    def __unicode__(self):
+        return unicode(self._result())
+
+
 class WritableLogger(object):
     """A thin wrapper that responds to `write` and logs."""
 
@@ -15,6 +15,9 @@
 
 import uuid
 
+import eventlet
+from eventlet import queue
+
 from quantum.openstack.common import cfg
 from quantum.openstack.common import context
 from quantum.openstack.common.gettextutils import _
@@ -37,6 +40,25 @@ notifier_opts = [
     cfg.StrOpt('default_publisher_id',
                default='$host',
                help='Default publisher_id for outgoing notifications'),
+    cfg.IntOpt('notification_queue_size',
+               default=0,
+               help='Size of the in-memory queue of the notifications sent '
+                    'by a background thread rather than by their emitter, '
+                    '0 to send them synchronously'),
+    cfg.IntOpt('notification_batch_size',
+               default=50,
+               help='Maximum number of queued notifications sent together'),
+    cfg.IntOpt('notification_publishers',
+               default=1,
+               help='Number of threads sending the queued notifications'),
+    cfg.StrOpt('notification_overflow_policy',
+               default='block',
+               help='What to do when the notification queue is full: block '
+                    'the emitter, drop_new or drop_oldest notification'),
+    cfg.IntOpt('notification_flush_timeout',
+               default=10,
+               help='Seconds to wait on shutdown for the queued '
+                    'notifications to be sent'),
 ]
 
 CONF = cfg.CONF
@@ -50,6 +72,12 @@ DEBUG = 'DEBUG'
 
 log_levels = (DEBUG, WARN, INFO, ERROR, CRITICAL)
 
+BLOCK = 'block'
+DROP_NEW = 'drop_new'
+DROP_OLDEST = 'drop_oldest'
+
+overflow_policies = (BLOCK, DROP_NEW, DROP_OLDEST)
+
 
 class BadPriorityException(Exception):
     pass
@@ -134,14 +162,121 @@ def notify(context, publisher_id, event_type, priority, payload):
                payload=payload,
                timestamp=str(timeutils.utcnow()))
 
-    for driver in _get_drivers():
-        try:
-            driver.notify(context, msg)
-        except Exception as e:
-            LOG.exception(_("Problem '%(e)s' attempting to "
-                            "send to notification system. "
-                            "Payload=%(payload)s")
-                          % dict(e=e, payload=payload))
+    if CONF.notification_queue_size > 0:
+        _get_queue().put(context, msg)
+    else:
+        for driver in _get_drivers():
+            _driver_notify(driver, context, msg)
+
+
+def _driver_notify(driver, context, msg):
+    try:
+        driver.notify(context, msg)
+    except Exception as e:
+        LOG.exception(_("Problem '%(e)s' attempting to "
+                        "send to notification system. "
+                        "Payload=%(payload)s")
+                      % dict(e=e, payload=msg['payload']))
+
+
+def _driver_notify_many(driver, notifications):
+    if not hasattr(driver, 'notify_many'):
+        for context, msg in notifications:
+            _driver_notify(driver, context, msg)
+        return
+    try:
+        driver.notify_many(notifications)
+    except Exception as e:
+        LOG.exception(_("Problem '%(e)s' attempting to send %(count)d "
+                        "notifications to notification system")
+                      % dict(e=e, count=len(notifications)))
+
+
+class NotificationQueue(object):
+    """Bounded queue of notifications sent by background green threads.
+
+    Each of the publisher threads sends the notifications in batches,
+    through the notify_many of the drivers providing it, e.g. over a
+    single connection for the rpc notifiers.
+    """
+
+    def __init__(self, size, batch_size, overflow_policy=BLOCK,
+                 publishers=1):
+        if overflow_policy not in overflow_policies:
+            LOG.error(_("Unknown notification overflow policy %(policy)s, "
+                        "using %(default)s"),
+                      dict(policy=overflow_policy, default=BLOCK))
+            overflow_policy = BLOCK
+        self.overflow_policy = overflow_policy
+        self.batch_size = max(batch_size, 1)
+        self.dropped = 0
+        self._queue = queue.Queue(size)
+        self._threads = [eventlet.spawn(self._run)
+                         for _i in xrange(max(publishers, 1))]
+
+    def put(self, context, msg):
+        """Queue msg, applying the overflow policy if the queue is full."""
+        if self.overflow_policy == BLOCK:
+            self._queue.put((context, msg))
+            return
+        if self._queue.full():
+            self.dropped += 1
+            if self.overflow_policy == DROP_NEW:
+                return
+            self._queue.get_nowait()
+            self._queue.task_done()
+        self._queue.put_nowait((context, msg))
+
+    def flush(self, timeout=None):
+        """Wait until the queued notifications are sent.
+
+        Returns False if some were still queued after timeout seconds.
+        """
+        with eventlet.Timeout(timeout, False):
+            self._queue.join()
+            return True
+        return False
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                for driver in _get_drivers():
+                    _driver_notify_many(driver, batch)
+            finally:
+                for _item in batch:
+                    self._queue.task_done()
+            if self.dropped:
+                LOG.warn(_("%d notifications dropped as the notification "
+                           "queue was full"), self.dropped)
+                self.dropped = 0
+
+
+_queue = None
+
+
+def _get_queue():
+    """Create, cache, and return the notification queue."""
+    global _queue
+    if _queue is None:
+        _queue = NotificationQueue(CONF.notification_queue_size,
+                                   CONF.notification_batch_size,
+                                   CONF.notification_overflow_policy,
+                                   CONF.notification_publishers)
+    return _queue
+
+
+def flush(timeout=None):
+    """Wait for the queued notifications to be sent, e.g. on shutdown.
+
+    Returns False if some notifications were still queued after timeout
+    seconds.
+    """
+    if _queue is None:
+        return True
+    return _queue.flush(timeout)
 
 
 _drivers = None
@@ -180,3 +315,12 @@ def _reset_drivers():
     """Used by unit tests to reset the drivers."""
     global _drivers
     _drivers = None
+
+
+def _reset_queue():
+    """Used by unit tests to reset the notification queue."""
+    global _queue
+    if _queue is not None:
+        for thread in _queue._threads:
+            thread.kill()
+    _queue = None
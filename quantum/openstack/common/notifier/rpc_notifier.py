@@ -44,3 +44,20 @@ def notify(context, message):
         except Exception:
             LOG.exception(_("Could not send notification to %(topic)s. "
                             "Payload=%(message)s"), locals())
+
+
+def notify_many(notifications):
+    """Sends several (context, message) notifications on one connection"""
+    messages = []
+    for context, message in notifications:
+        if not context:
+            context = req_context.get_admin_context()
+        priority = message.get('priority',
+                               CONF.default_notification_level)
+        priority = priority.lower()
+        for topic in CONF.notification_topics:
+            messages.append((context, '%s.%s' % (topic, priority), message))
+    try:
+        rpc.notify_many(messages)
+    except Exception:
+        LOG.exception(_("Could not send %d notifications"), len(messages))
@@ -192,6 +192,25 @@ def notify(context, topic, msg, envelope=False):
     return _get_impl().notify(cfg.CONF, context, topic, msg, envelope)
 
 
+def notify_many(notifications, envelope=False):
+    """Send several notification events.
+
+    Implementations supporting it send all the events over a single
+    connection rather than taking a connection for each.
+
+    :param notifications: A list of (context, topic, msg) tuples, as
+                          passed to notify().
+    :param envelope: Set to True to enable message envelope for notifications.
+
+    :returns: None
+    """
+    impl = _get_impl()
+    if hasattr(impl, 'notify_many'):
+        return impl.notify_many(cfg.CONF, notifications, envelope)
+    for context, topic, msg in notifications:
+        impl.notify(cfg.CONF, context, topic, msg, envelope=envelope)
+
+
 def cleanup():
     """Clean up resoruces in use by implementation.
 
@@ -205,6 +224,19 @@ def cleanup():
     return _get_impl().cleanup()
 
 
+def reset_after_fork():
+    """Forget the connections inherited from a parent process.
+
+    A forked child must open connections of its own rather than use, or
+    close, the ones it shares with its parent.
+
+    :returns: None
+    """
+    # Nothing was inherited if the parent did not load the implementation
+    if _RPCIMPL is not None and hasattr(_RPCIMPL, 'reset_after_fork'):
+        _RPCIMPL.reset_after_fork()
+
+
 def cast_to_server(context, server_params, topic, msg):
     """Invoke a remote method that does not return anything.
 
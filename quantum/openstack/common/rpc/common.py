@@ -211,7 +211,10 @@ class Connection(object):
 
 
 def _safe_log(log_func, msg, msg_data):
-    """Sanitizes the msg_data field before logging."""
+    """Sanitizes the msg_data field before logging.
+
+    The sanitized copy is only made if the record is emitted.
+    """
     SANITIZE = {'set_admin_password': [('args', 'new_pass')],
                 'run_instance': [('args', 'admin_password')],
                 'route_message': [('args', 'message', 'args', 'method_info',
@@ -226,27 +229,31 @@ def _safe_log(log_func, msg, msg_data):
     if not any([has_method, has_context_token, has_token]):
         return log_func(msg, msg_data)
 
-    msg_data = copy.deepcopy(msg_data)
+    def sanitize(msg_data):
+        msg_data = copy.deepcopy(msg_data)
 
-    if has_method:
-        for arg in SANITIZE.get(msg_data['method'], []):
-            try:
-                d = msg_data
-                for elem in arg[:-1]:
-                    d = d[elem]
-                d[arg[-1]] = '<SANITIZED>'
-            except KeyError, e:
-                LOG.info(_('Failed to sanitize %(item)s. Key error %(err)s'),
-                         {'item': arg,
-                          'err': e})
-
-    if has_context_token:
-        msg_data['_context_auth_token'] = '<SANITIZED>'
-
-    if has_token:
-        msg_data['auth_token'] = '<SANITIZED>'
-
-    return log_func(msg, msg_data)
+        if has_method:
+            for arg in SANITIZE.get(msg_data['method'], []):
+                try:
+                    d = msg_data
+                    for elem in arg[:-1]:
+                        d = d[elem]
+                    d[arg[-1]] = '<SANITIZED>'
+                except KeyError, e:
+                    LOG.info(_('Failed to sanitize %(item)s. '
+                               'Key error %(err)s'),
+                             {'item': arg,
+                              'err': e})
+
+        if has_context_token:
+            msg_data['_context_auth_token'] = '<SANITIZED>'
+
+        if has_token:
+            msg_data['auth_token'] = '<SANITIZED>'
+
+        return msg_data
+
+    return log_func(msg, logging.LazyFormat(sanitize, msg_data))
 
 
 def serialize_remote_exception(failure_info, log_failure=True):
@@ -605,5 +605,17 @@ def notify(conf, context, topic, msg, envelope):
                            envelope)
 
 
+def notify_many(conf, notifications, envelope):
+    """Sends several notification events on one connection."""
+    return rpc_amqp.notify_many(
+        conf, notifications,
+        rpc_amqp.get_connection_pool(conf, Connection),
+        envelope)
+
+
 def cleanup():
     return rpc_amqp.cleanup(Connection.pool)
+
+
+def reset_after_fork():
+    Connection.pool = None
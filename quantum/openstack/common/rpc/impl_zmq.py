@@ -29,6 +29,7 @@ from quantum.openstack.common import cfg
 from quantum.openstack.common.gettextutils import _
 from quantum.openstack.common import importutils
 from quantum.openstack.common import jsonutils
+from quantum.openstack.common import log as logging
 from quantum.openstack.common import processutils as utils
 from quantum.openstack.common.rpc import common as rpc_common
 
@@ -36,6 +37,11 @@ zmq = importutils.try_import('eventlet.green.zmq')
 
 # for convenience, are not modified.
 pformat = pprint.pformat
+
+
+def _pformat_all(items):
+    return ' '.join(map(pformat, items))
+
 Timeout = eventlet.timeout.Timeout
 LOG = rpc_common.LOG
 RemoteError = rpc_common.RemoteError
@@ -434,7 +440,8 @@ class ZmqProxy(ZmqBaseReactor):
         msg_id, topic, style, in_msg = data
         topic = topic.split('.', 1)[0]
 
-        LOG.debug(_("CONSUMER GOT %s"), ' '.join(map(pformat, data)))
+        LOG.debug(_("CONSUMER GOT %s"),
+                  logging.LazyFormat(_pformat_all, data))
 
         # Handle zmq_replies magic
         if topic.startswith('fanout~'):
@@ -475,7 +482,7 @@ class ZmqProxy(ZmqBaseReactor):
                 while(True):
                     data = self.topic_proxy[topic].get()
                     out_sock.send(data)
-                    LOG.debug(_("ROUTER RELAY-OUT SUCCEEDED %(data)s") %
+                    LOG.debug(_("ROUTER RELAY-OUT SUCCEEDED %(data)s"),
                               {'data': data})
 
             wait_sock_creation = eventlet.event.Event()
@@ -489,7 +496,7 @@ class ZmqProxy(ZmqBaseReactor):
 
         try:
             self.topic_proxy[topic].put_nowait(data)
-            LOG.debug(_("ROUTER RELAY-OUT QUEUED %(data)s") %
+            LOG.debug(_("ROUTER RELAY-OUT QUEUED %(data)s"),
                       {'data': data})
         except eventlet.queue.Full:
             LOG.error(_("Local per-topic backlog buffer full for topic "
@@ -542,8 +549,7 @@ class ZmqReactor(ZmqBaseReactor):
         data = sock.recv()
         LOG.debug(_("CONSUMER RECEIVED DATA: %s"), data)
         if sock in self.mapping:
-            LOG.debug(_("ROUTER RELAY-OUT %(data)s") % {
-                'data': data})
+            LOG.debug(_("ROUTER RELAY-OUT %(data)s"), {'data': data})
             self.mapping[sock].send(data)
             return
 
@@ -689,7 +695,8 @@ def _multi_send(method, context, topic, msg, timeout=None, serialize=True,
     message to all relevant hosts.
     """
     conf = CONF
-    LOG.debug(_("%(msg)s") % {'msg': ' '.join(map(pformat, (topic, msg)))})
+    LOG.debug(_("%(msg)s"),
+              {'msg': logging.LazyFormat(_pformat_all, (topic, msg))})
 
     queues = _get_matchmaker().queues(topic)
     LOG.debug(_("Sending message(s) to: %s"), queues)
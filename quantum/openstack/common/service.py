@@ -141,12 +141,17 @@ class ProcessLauncher(object):
     def __init__(self):
         self.children = {}
         self.sigcaught = None
+        self.sighup_caught = False
         self.running = True
+        # Children left to restart after a SIGHUP, and the one restarting
+        self._restart_pids = []
+        self._restart_pid = None
         rfd, self.writepipe = os.pipe()
         self.readpipe = eventlet.greenio.GreenPipe(rfd, 'r')
 
         signal.signal(signal.SIGTERM, self._handle_signal)
         signal.signal(signal.SIGINT, self._handle_signal)
+        signal.signal(signal.SIGHUP, self._handle_sighup)
 
     def _handle_signal(self, signo, frame):
         self.sigcaught = signo
@@ -156,6 +161,9 @@ class ProcessLauncher(object):
         signal.signal(signal.SIGTERM, signal.SIG_DFL)
         signal.signal(signal.SIGINT, signal.SIG_DFL)
 
+    def _handle_sighup(self, signo, frame):
+        self.sighup_caught = True
+
     def _pipe_watcher(self):
         # This will block until the write end is closed when the parent
         # dies unexpectedly
@@ -167,13 +175,20 @@ class ProcessLauncher(object):
 
     def _child_process(self, service):
         # Setup child signal handlers differently
+        main = eventlet.greenthread.getcurrent()
+
         def _sigterm(*args):
             signal.signal(signal.SIGTERM, signal.SIG_DFL)
-            raise SignalExit(signal.SIGTERM)
+            # Raise in the main green thread rather than in the one the
+            # signal interrupted, which may be serving a request, so that
+            # the service is stopped gracefully
+            eventlet.hubs.get_hub().schedule_call_global(
+                0, main.throw, SignalExit(signal.SIGTERM))
 
         signal.signal(signal.SIGTERM, _sigterm)
-        # Block SIGINT and let the parent send us a SIGTERM
+        # Block SIGINT and SIGHUP and let the parent send us a SIGTERM
         signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
 
         # Reopen the eventlet hub to make sure we don't share an epoll
         # fd with parent and/or siblings, which would be bad
@@ -269,6 +284,35 @@ class ProcessLauncher(object):
         wrap.children.remove(pid)
         return wrap
 
+    def _restart_children(self):
+        """Restart the children one at a time.
+
+        A child is only stopped once the previous one has exited and been
+        started again by wait(), so that the others keep serving.
+        """
+        LOG.info(_('Caught SIGHUP, restarting children'))
+        self._restart_pids = list(self.children)
+        self._restart_next_child()
+
+    def _restart_next_child(self):
+        """Stop the next child to restart, which wait() starts again."""
+        self._restart_pid = None
+        while self._restart_pids:
+            pid = self._restart_pids.pop(0)
+            if pid not in self.children:
+                continue
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError as exc:
+                if exc.errno != errno.ESRCH:
+                    raise
+            self._restart_pid = pid
+            return
+
+    def stop(self):
+        """Make wait() stop the children and return."""
+        self.running = False
+
     def wait(self):
         """Loop waiting on children to die and respawning as necessary"""
 
@@ -276,6 +320,10 @@ class ProcessLauncher(object):
         CONF.log_opt_values(LOG, std_logging.DEBUG)
 
         while self.running:
+            if self.sighup_caught:
+                self.sighup_caught = False
+                self._restart_children()
+
             wrap = self._wait_child()
             if not wrap:
                 # Yield to other threads if no children have exited
@@ -287,6 +335,10 @@ class ProcessLauncher(object):
             while self.running and len(wrap.children) < wrap.workers:
                 self._start_child(wrap)
 
+            if (self._restart_pid is not None and
+                    self._restart_pid not in self.children):
+                self._restart_next_child()
+
         if self.sigcaught:
             signame = {signal.SIGTERM: 'SIGTERM',
                        signal.SIGINT: 'SIGINT'}[self.sigcaught]
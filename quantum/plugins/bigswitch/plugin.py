@@ -58,7 +58,6 @@ from quantum.db import db_base_plugin_v2
 from quantum.db import dhcp_rpc_base
 from quantum.openstack.common import cfg
 from quantum.openstack.common import log as logging
-from quantum.openstack.common import rpc
 from quantum.plugins.bigswitch.version import version_string_with_vcs
 
 
@@ -240,7 +239,9 @@ class ServerPool(object):
 
 class RpcProxy(dhcp_rpc_base.DhcpRpcCallbackMixin):
 
-    RPC_API_VERSION = '1.0'
+    RPC_API_VERSION = '1.1'
+    # history
+    #   1.1 Support get_networks_info and update_lease_expirations
 
     def create_rpc_dispatcher(self):
         return q_rpc.PluginRpcDispatcher([self])
@@ -276,13 +277,9 @@ class QuantumRestProxyV2(db_base_plugin_v2.QuantumDbPluginV2):
 
         # init dhcp support
         self.topic = topics.PLUGIN
-        self.conn = rpc.create_connection(new=True)
         self.callbacks = RpcProxy()
         self.dispatcher = self.callbacks.create_rpc_dispatcher()
-        self.conn.create_consumer(self.topic, self.dispatcher,
-                                  fanout=False)
-        # Consume from all consumers in a thread
-        self.conn.consume_in_thread()
+        self.setup_rpc_listener([self.topic])
         if syncdata:
             self._send_all_data()
 
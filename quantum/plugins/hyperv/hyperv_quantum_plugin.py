@@ -27,7 +27,6 @@ from quantum.extensions import portbindings
 from quantum.extensions import providernet as provider
 from quantum.openstack.common import cfg
 from quantum.openstack.common import log as logging
-from quantum.openstack.common import rpc
 from quantum.plugins.hyperv import agent_notifier_api
 from quantum.plugins.hyperv.common import constants
 from quantum.plugins.hyperv import db as hyperv_db
@@ -182,15 +181,11 @@ class HyperVQuantumPlugin(db_base_plugin_v2.QuantumDbPluginV2,
     def _setup_rpc(self):
         # RPC support
         self.topic = topics.PLUGIN
-        self.conn = rpc.create_connection(new=True)
         self.notifier = agent_notifier_api.AgentNotifierApi(
             topics.AGENT)
         self.callbacks = rpc_callbacks.HyperVRpcCallbacks(self.notifier)
         self.dispatcher = self.callbacks.create_rpc_dispatcher()
-        self.conn.create_consumer(self.topic, self.dispatcher,
-                                  fanout=False)
-        # Consume from all consumers in a thread
-        self.conn.consume_in_thread()
+        self.setup_rpc_listener([self.topic])
 
     def _check_view_auth(self, context, resource, action):
         return policy.check(context, action, resource)
@@ -31,8 +31,9 @@ class HyperVRpcCallbacks(
         dhcp_rpc_base.DhcpRpcCallbackMixin,
         l3_rpc_base.L3RpcCallbackMixin):
 
-    # Set RPC API version to 1.0 by default.
-    RPC_API_VERSION = '1.0'
+    RPC_API_VERSION = '1.1'
+    # history
+    #   1.1 Support get_networks_info and update_lease_expirations
 
     def __init__(self, notifier):
         self.notifier = notifier
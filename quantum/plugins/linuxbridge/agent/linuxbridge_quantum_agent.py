@@ -29,6 +29,7 @@ import time
 import eventlet
 import pyudev
 
+from quantum.agent.linux import command_stats
 from quantum.agent.linux import ip_lib
 from quantum.agent.linux import utils
 from quantum.agent import rpc as agent_rpc
@@ -56,6 +57,126 @@ DEVICE_NAME_PLACEHOLDER = "device_name"
 BRIDGE_PORT_FS_FOR_DEVICE = BRIDGE_FS + DEVICE_NAME_PLACEHOLDER + "/brport"
 
 
+class TapDeviceMonitor(object):
+    """Collects tap device add and remove events from udev.
+
+    Events are read from a netlink monitor in a green thread and
+    accumulated until the agent loop fetches them with get_events().
+    """
+
+    def __init__(self, udev):
+        self.monitor = pyudev.Monitor.from_netlink(udev)
+        self.monitor.filter_by('net')
+        self.added = set()
+        self.removed = set()
+
+    def start(self):
+        self.monitor.enable_receiving()
+        eventlet.spawn_n(self._monitor_loop)
+
+    def _monitor_loop(self):
+        while True:
+            try:
+                eventlet.hubs.trampoline(self.monitor.fileno(), read=True)
+                action, device = self.monitor.receive_device()
+                self.handle_event(action, device.sys_name)
+            except Exception:
+                LOG.exception(_("Error receiving udev device event"))
+
+    def handle_event(self, action, name):
+        if not name.startswith(TAP_INTERFACE_PREFIX):
+            return
+        if action == 'add':
+            self.removed.discard(name)
+            self.added.add(name)
+        elif action == 'remove':
+            self.added.discard(name)
+            self.removed.add(name)
+
+    def get_events(self):
+        """Return and reset the (added, removed) device name sets."""
+        added, self.added = self.added, set()
+        removed, self.removed = self.removed, set()
+        return added, removed
+
+
+class BridgeTopology(object):
+    """Cache of the quantum bridges and the interfaces attached to them.
+
+    The bridge list and each bridge's interfaces are read from sysfs on
+    first use, kept up to date by LinuxBridgeManager as it changes the
+    bridges, and read again after invalidate() has been called.
+    """
+
+    def __init__(self):
+        self._bridges = None
+
+    def invalidate(self):
+        self._bridges = None
+
+    def _get_bridge_map(self):
+        if self._bridges is None:
+            self._bridges = dict((bridge, None)
+                                 for bridge in os.listdir(BRIDGE_FS)
+                                 if bridge.startswith(BRIDGE_NAME_PREFIX))
+        return self._bridges
+
+    def _get_interface_set(self, bridge_name):
+        bridges = self._get_bridge_map()
+        interfaces = bridges.get(bridge_name)
+        if interfaces is None:
+            bridge_interface_path = BRIDGE_INTERFACES_FS.replace(
+                BRIDGE_NAME_PLACEHOLDER, bridge_name)
+            try:
+                interfaces = set(os.listdir(bridge_interface_path))
+            except OSError:
+                # The bridge does not exist
+                bridges.pop(bridge_name, None)
+                return None
+            bridges[bridge_name] = interfaces
+        return interfaces
+
+    def get_bridges(self):
+        return self._get_bridge_map().keys()
+
+    def has_bridge(self, bridge_name):
+        return bridge_name in self._get_bridge_map()
+
+    def get_interfaces(self, bridge_name):
+        interfaces = self._get_interface_set(bridge_name)
+        if interfaces is not None:
+            return list(interfaces)
+
+    def has_interface(self, bridge_name, interface):
+        interfaces = self._get_interface_set(bridge_name)
+        return interfaces is not None and interface in interfaces
+
+    def get_bridge_for_interface(self, interface):
+        for bridge_name in self.get_bridges():
+            if self.has_interface(bridge_name, interface):
+                return bridge_name
+
+    def add_bridge(self, bridge_name):
+        if self._bridges is not None:
+            self._bridges.setdefault(bridge_name, set())
+
+    def remove_bridge(self, bridge_name):
+        if self._bridges is not None:
+            self._bridges.pop(bridge_name, None)
+
+    def add_interface(self, bridge_name, interface):
+        if self._bridges is not None:
+            interfaces = self._bridges.get(bridge_name)
+            if interfaces is not None:
+                interfaces.add(interface)
+
+    def remove_interface(self, interface):
+        if self._bridges is not None:
+            for interfaces in self._bridges.itervalues():
+                if interfaces is not None:
+                    interfaces.discard(interface)
+
+
 class LinuxBridgeManager:
     def __init__(self, interface_mappings, root_helper):
         self.interface_mappings = interface_mappings
@@ -63,8 +184,12 @@ class LinuxBridgeManager:
         self.ip = ip_lib.IPWrapper(self.root_helper)
 
         self.udev = pyudev.Context()
-        monitor = pyudev.Monitor.from_netlink(self.udev)
-        monitor.filter_by('net')
+        self.device_monitor = None
+        self.topology = BridgeTopology()
+
+    def start_device_monitor(self):
+        self.device_monitor = TapDeviceMonitor(self.udev)
+        self.device_monitor.start()
 
     def device_exists(self, device):
         """Check if ethernet device exists."""
@@ -75,12 +200,13 @@ class LinuxBridgeManager:
             return False
         return True
 
+    def bridge_exists(self, bridge_name):
+        """Check if a bridge exists, using the topology cache if possible."""
+        return (self.topology.has_bridge(bridge_name) or
+                self.device_exists(bridge_name))
+
     def interface_exists_on_bridge(self, bridge, interface):
-        directory = '/sys/class/net/%s/brif' % bridge
-        for filename in os.listdir(directory):
-            if filename == interface:
-                return True
-        return False
+        return self.topology.has_interface(bridge, interface)
 
     def get_bridge_name(self, network_id):
         if not network_id:
@@ -104,27 +230,13 @@ class LinuxBridgeManager:
         return tap_device_name
 
     def get_all_quantum_bridges(self):
-        quantum_bridge_list = []
-        bridge_list = os.listdir(BRIDGE_FS)
-        for bridge in bridge_list:
-            if bridge.startswith(BRIDGE_NAME_PREFIX):
-                quantum_bridge_list.append(bridge)
-        return quantum_bridge_list
+        return self.topology.get_bridges()
 
     def get_interfaces_on_bridge(self, bridge_name):
-        if self.device_exists(bridge_name):
-            bridge_interface_path = BRIDGE_INTERFACES_FS.replace(
-                BRIDGE_NAME_PLACEHOLDER, bridge_name)
-            return os.listdir(bridge_interface_path)
+        return self.topology.get_interfaces(bridge_name)
 
     def get_bridge_for_tap_device(self, tap_device_name):
-        bridges = self.get_all_quantum_bridges()
-        for bridge in bridges:
-            interfaces = self.get_interfaces_on_bridge(bridge)
-            if tap_device_name in interfaces:
-                return bridge
-
-        return None
+        return self.topology.get_bridge_for_interface(tap_device_name)
 
     def is_device_on_bridge(self, device_name):
         if not device_name:
@@ -213,7 +325,7 @@ class LinuxBridgeManager:
         """
         Create a bridge unless it already exists.
         """
-        if not self.device_exists(bridge_name):
+        if not self.bridge_exists(bridge_name):
             LOG.debug(_("Starting bridge %(bridge_name)s for subinterface "
                         "%(interface)s"), locals())
             if utils.execute(['brctl', 'addbr', bridge_name],
@@ -228,6 +340,7 @@ class LinuxBridgeManager:
             if utils.execute(['ip', 'link', 'set', bridge_name,
                               'up'], root_helper=self.root_helper):
                 return
+            self.topology.add_bridge(bridge_name)
             LOG.debug(_("Done starting bridge %(bridge_name)s for "
                         "subinterface %(interface)s"),
                       locals())
@@ -247,6 +360,7 @@ class LinuxBridgeManager:
                 LOG.error(_("Unable to add %(interface)s to %(bridge_name)s! "
                             "Exception: %(e)s"), locals())
                 return
+            self.topology.add_interface(bridge_name, interface)
 
     def ensure_physical_in_bridge(self, network_id,
                                   physical_network,
@@ -294,6 +408,7 @@ class LinuxBridgeManager:
             if utils.execute(['brctl', 'addif', bridge_name, tap_device_name],
                              root_helper=self.root_helper):
                 return False
+            self.topology.add_interface(bridge_name, tap_device_name)
         else:
             msg = _("%(tap_device_name)s already exists on bridge "
                     "%(bridge_name)s") % locals()
@@ -308,7 +423,7 @@ class LinuxBridgeManager:
                                       tap_device_name)
 
     def delete_vlan_bridge(self, bridge_name):
-        if self.device_exists(bridge_name):
+        if self.bridge_exists(bridge_name):
             interfaces_on_bridge = self.get_interfaces_on_bridge(bridge_name)
             for interface in interfaces_on_bridge:
                 self.remove_interface(bridge_name, interface)
@@ -331,6 +446,7 @@ class LinuxBridgeManager:
             if utils.execute(['brctl', 'delbr', bridge_name],
                              root_helper=self.root_helper):
                 return
+            self.topology.remove_bridge(bridge_name)
             LOG.debug(_("Done deleting bridge %s"), bridge_name)
 
         else:
@@ -338,7 +454,7 @@ class LinuxBridgeManager:
                       bridge_name)
 
     def remove_interface(self, bridge_name, interface_name):
-        if self.device_exists(bridge_name):
+        if self.bridge_exists(bridge_name):
             if not self.is_device_on_bridge(interface_name):
                 return True
             LOG.debug(_("Removing device %(interface_name)s from bridge "
@@ -346,6 +462,7 @@ class LinuxBridgeManager:
             if utils.execute(['brctl', 'delif', bridge_name, interface_name],
                              root_helper=self.root_helper):
                 return False
+            self.topology.remove_interface(interface_name)
             LOG.debug(_("Done removing device %(interface_name)s from bridge "
                         "%(bridge_name)s"), locals())
             return True
@@ -367,6 +484,21 @@ class LinuxBridgeManager:
 
     def update_devices(self, registered_devices):
         devices = self.udev_get_tap_devices()
+        if self.device_monitor:
+            # Events received up to now are covered by the full scan
+            self.device_monitor.get_events()
+        # Bridge topology is reloaded lazily after a full scan
+        self.topology.invalidate()
+        return self._get_device_changes(registered_devices, devices)
+
+    def update_devices_from_events(self, registered_devices):
+        added, removed = self.device_monitor.get_events()
+        for device in removed:
+            self.topology.remove_interface(device)
+        devices = (registered_devices | added) - removed
+        return self._get_device_changes(registered_devices, devices)
+
+    def _get_device_changes(self, registered_devices, devices):
         if devices == registered_devices:
             return
         added = devices - registered_devices
@@ -458,9 +590,11 @@ class LinuxBridgePluginApi(agent_rpc.PluginApi,
 class LinuxBridgeQuantumAgentRPC(sg_rpc.SecurityGroupAgentRpcMixin):
 
     def __init__(self, interface_mappings, polling_interval,
-                 root_helper):
+                 root_helper, device_events=False, device_scan_interval=60):
         self.polling_interval = polling_interval
         self.root_helper = root_helper
+        self.device_events = device_events
+        self.device_scan_interval = device_scan_interval
         self.setup_linux_bridge(interface_mappings)
         self.setup_rpc(interface_mappings.values())
         self.init_firewall()
@@ -567,17 +701,29 @@ class LinuxBridgeQuantumAgentRPC(sg_rpc.SecurityGroupAgentRpcMixin):
     def daemon_loop(self):
         sync = True
         devices = set()
+        last_scan = 0
 
         LOG.info(_("LinuxBridge Agent RPC Daemon Started!"))
 
+        if self.device_events:
+            self.br_mgr.start_device_monitor()
+
         while True:
             start = time.time()
             if sync:
                 LOG.info(_("Agent out of sync with plugin!"))
                 devices.clear()
                 sync = False
-
-            device_info = self.br_mgr.update_devices(devices)
+                last_scan = 0
+
+            # With device events enabled the full scan only runs
+            # periodically as a consistency check.
+            if (not self.device_events or
+                    start - last_scan >= self.device_scan_interval):
+                device_info = self.br_mgr.update_devices(devices)
+                last_scan = start
+            else:
+                device_info = self.br_mgr.update_devices_from_events(devices)
 
             # notify plugin about device deltas
             if device_info:
@@ -602,6 +748,7 @@ def main():
     cfg.CONF(project='quantum')
 
     logging_config.setup_logging(cfg.CONF)
+    command_stats.setup(cfg.CONF)
     try:
         interface_mappings = q_utils.parse_mappings(
             cfg.CONF.LINUX_BRIDGE.physical_interface_mappings)
@@ -615,7 +762,9 @@ def main():
     root_helper = cfg.CONF.AGENT.root_helper
     plugin = LinuxBridgeQuantumAgentRPC(interface_mappings,
                                         polling_interval,
-                                        root_helper)
+                                        root_helper,
+                                        cfg.CONF.AGENT.device_events,
+                                        cfg.CONF.AGENT.device_scan_interval)
     LOG.info(_("Agent initialized successfully, now running... "))
     plugin.daemon_loop()
     sys.exit(0)
@@ -42,6 +42,13 @@ bridge_opts = [
 agent_opts = [
     cfg.IntOpt('polling_interval', default=2),
     cfg.StrOpt('root_helper', default='sudo'),
+    cfg.BoolOpt('device_events', default=False,
+                help=_("Discover tap devices from udev netlink events "
+                       "instead of rescanning all devices every polling "
+                       "interval")),
+    cfg.IntOpt('device_scan_interval', default=60,
+               help=_("Interval (secs) between full tap device scans when "
+                      "device_events is enabled")),
 ]
 
 
@@ -35,7 +35,6 @@ from quantum.extensions import providernet as provider
 from quantum.extensions import securitygroup as ext_sg
 from quantum.openstack.common import cfg
 from quantum.openstack.common import log as logging
-from quantum.openstack.common import rpc
 from quantum.openstack.common.rpc import proxy
 from quantum.plugins.linuxbridge.common import constants
 from quantum.plugins.linuxbridge.db import l2network_db_v2 as db
@@ -52,7 +51,8 @@ class LinuxBridgeRpcCallbacks(dhcp_rpc_base.DhcpRpcCallbackMixin,
     RPC_API_VERSION = '1.1'
     # Device names start with "tap"
     # history
-    #   1.1 Support Security Group RPC
+    #   1.1 Support Security Group RPC, get_networks_info and
+    #       update_lease_expirations
     TAP_PREFIX_LEN = 3
 
     def create_rpc_dispatcher(self):
@@ -217,14 +217,10 @@ class LinuxBridgePluginV2(db_base_plugin_v2.QuantumDbPluginV2,
     def _setup_rpc(self):
         # RPC support
         self.topic = topics.PLUGIN
-        self.conn = rpc.create_connection(new=True)
         self.callbacks = LinuxBridgeRpcCallbacks()
         self.dispatcher = self.callbacks.create_rpc_dispatcher()
-        self.conn.create_consumer(self.topic, self.dispatcher,
-                                  fanout=False)
-        # Consume from all consumers in a thread
-        self.conn.consume_in_thread()
         self.notifier = AgentNotifierApi(topics.AGENT)
+        self.setup_rpc_listener([self.topic])
 
     def _parse_network_vlan_ranges(self):
         self.network_vlan_ranges = {}
@@ -108,6 +108,14 @@ class MetaPluginV2(db_base_plugin_v2.QuantumDbPluginV2,
 
         self.default_flavor = cfg.CONF.META.default_flavor
 
+    def start_rpc_listener(self):
+        conns = []
+        plugins = set(self.plugins.values() + self.l3_plugins.values())
+        for plugin in plugins:
+            if plugin.rpc_workers_supported():
+                conns.append(plugin.start_rpc_listener())
+        return conns
+
     def _load_plugin(self, plugin_provider):
         LOG.debug(_("Plugin location: %s"), plugin_provider)
         plugin_klass = importutils.import_class(plugin_provider)
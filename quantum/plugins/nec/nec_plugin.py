@@ -25,7 +25,6 @@ from quantum.extensions import portbindings
 #NOTE(amotoki): quota_db cannot be removed, it is for db model
 from quantum.db import quota_db
 from quantum.openstack.common import log as logging
-from quantum.openstack.common import rpc
 from quantum.plugins.nec.common import config
 from quantum.plugins.nec.common import exceptions as nexc
 from quantum.plugins.nec.db import api as ndb
@@ -89,12 +88,9 @@ class NECPluginV2(nec_plugin_base.NECPluginV2Base, l3_db.L3_NAT_db_mixin):
 
     def setup_rpc(self):
         self.topic = topics.PLUGIN
-        self.conn = rpc.create_connection(new=True)
         self.callbacks = NECPluginV2RPCCallbacks(self)
         self.dispatcher = self.callbacks.create_rpc_dispatcher()
-        self.conn.create_consumer(self.topic, self.dispatcher, fanout=False)
-        # Consume from all consumers in a thread
-        self.conn.consume_in_thread()
+        self.setup_rpc_listener([self.topic])
 
     def _update_resource_status(self, context, resource, id, status):
         """Update status of specified resource."""
@@ -532,7 +528,9 @@ class NECPluginV2(nec_plugin_base.NECPluginV2Base, l3_db.L3_NAT_db_mixin):
 class NECPluginV2RPCCallbacks(dhcp_rpc_base.DhcpRpcCallbackMixin,
                               l3_rpc_base.L3RpcCallbackMixin):
 
-    RPC_API_VERSION = '1.0'
+    RPC_API_VERSION = '1.1'
+    # history
+    #   1.1 Support get_networks_info and update_lease_expirations
 
     def __init__(self, plugin):
         self.plugin = plugin
@@ -38,7 +38,6 @@ from quantum.db import dhcp_rpc_base
 from quantum.db import quota_db
 from quantum.extensions import providernet as pnet
 from quantum.openstack.common import cfg
-from quantum.openstack.common import rpc
 from quantum import policy
 from quantum.plugins.nicira.nicira_nvp_plugin.common import config
 from quantum.plugins.nicira.nicira_nvp_plugin.common import (exceptions
@@ -93,8 +92,9 @@ def parse_config():
 
 class NVPRpcCallbacks(dhcp_rpc_base.DhcpRpcCallbackMixin):
 
-    # Set RPC API version to 1.0 by default.
-    RPC_API_VERSION = '1.0'
+    RPC_API_VERSION = '1.1'
+    # history
+    #   1.1 Support get_networks_info and update_lease_expirations
 
     def create_rpc_dispatcher(self):
         '''Get the rpc dispatcher for this manager.
@@ -324,12 +324,8 @@ class NvpPluginV2(db_base_plugin_v2.QuantumDbPluginV2):
     def setup_rpc(self):
         # RPC support for dhcp
         self.topic = topics.PLUGIN
-        self.conn = rpc.create_connection(new=True)
         self.dispatcher = NVPRpcCallbacks().create_rpc_dispatcher()
-        self.conn.create_consumer(self.topic, self.dispatcher,
-                                  fanout=False)
-        # Consume from all consumers in a thread
-        self.conn.consume_in_thread()
+        self.setup_rpc_listener([self.topic])
 
     def get_all_networks(self, tenant_id, **kwargs):
         networks = []
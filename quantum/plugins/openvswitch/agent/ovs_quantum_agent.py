@@ -25,6 +25,7 @@ import time
 
 import eventlet
 
+from quantum.agent.linux import command_stats
 from quantum.agent.linux import ip_lib
 from quantum.agent.linux import ovs_lib
 from quantum.agent.linux import utils
@@ -48,7 +49,10 @@ DEAD_VLAN_TAG = "4095"
 
 # A class to represent a VIF (i.e., a port that has 'iface-id' and 'vif-mac'
 # attributes set).
-class LocalVLANMapping:
+class LocalVLANMapping(object):
+    __slots__ = ('vlan', 'network_type', 'physical_network',
+                 'segmentation_id', 'vif_ports')
+
     def __init__(self, vlan, network_type, physical_network, segmentation_id,
                  vif_ports=None):
         if vif_ports is None:
@@ -72,6 +76,8 @@ class Port(object):
     still available even if a row has been deleted.
     """
 
+    __slots__ = ('id', 'network_id', 'device_id', 'admin_state_up', 'status')
+
     def __init__(self, p):
         self.id = p.id
         self.network_id = p.network_id
@@ -151,6 +157,15 @@ class OVSQuantumAgent(object):
         self.int_br = self.setup_integration_br(integ_br)
         self.setup_physical_bridges(bridge_mappings)
         self.local_vlan_map = {}
+        # Reverse indexes kept in step with local_vlan_map so that
+        # looking up the network or VIF of a port does not require a
+        # scan of every local VLAN mapping.
+        self.vif_net_map = {}
+        self.ofport_vif_map = {}
+        # VIF ports currently plugged into the integration bridge, and
+        # port updates received from the plugin awaiting processing.
+        self.local_vif_ports = {}
+        self.updated_ports = {}
 
         self.polling_interval = polling_interval
 
@@ -181,9 +196,21 @@ class OVSQuantumAgent(object):
                                                      consumers)
 
     def get_net_uuid(self, vif_id):
-        for network_id, vlan_mapping in self.local_vlan_map.iteritems():
-            if vif_id in vlan_mapping.vif_ports:
-                return network_id
+        return self.vif_net_map.get(vif_id)
+
+    def get_vif_id_by_ofport(self, ofport):
+        return self.ofport_vif_map.get(str(ofport))
+
+    def _index_vif_port(self, port, net_uuid):
+        self.vif_net_map[port.vif_id] = net_uuid
+        self.ofport_vif_map[str(port.ofport)] = port.vif_id
+
+    def _unindex_vif_port(self, vif_id, port=None):
+        self.vif_net_map.pop(vif_id, None)
+        if port is not None:
+            ofport = str(port.ofport)
+            if self.ofport_vif_map.get(ofport) == vif_id:
+                del self.ofport_vif_map[ofport]
 
     def network_delete(self, context, **kwargs):
         LOG.debug(_("network_delete received"))
@@ -199,13 +226,15 @@ class OVSQuantumAgent(object):
     def port_update(self, context, **kwargs):
         LOG.debug(_("port_update received"))
         port = kwargs.get('port')
-        network_type = kwargs.get('network_type')
-        segmentation_id = kwargs.get('segmentation_id')
-        physical_network = kwargs.get('physical_network')
-        vif_port = self.int_br.get_vif_port_by_id(port['id'])
-        self.treat_vif_port(vif_port, port['id'], port['network_id'],
-                            network_type, physical_network,
-                            segmentation_id, port['admin_state_up'])
+        # port_update is fanned out to every agent, so the in-memory port
+        # cache is used to drop notifications for ports on other hosts
+        # without querying ovsdb.
+        if port['id'] not in self.local_vif_ports:
+            LOG.debug(_("Port %s not defined on agent."), port['id'])
+            return
+        # Processing is deferred to the main loop; a newer update for the
+        # same port replaces a pending one.
+        self.updated_ports[port['id']] = kwargs
 
     def tunnel_update(self, context, **kwargs):
         LOG.debug(_("tunnel_update received"))
@@ -355,6 +384,8 @@ class OVSQuantumAgent(object):
                       {'network_type': lvm.network_type,
                        'net_uuid': net_uuid})
 
+        for vif_id, port in lvm.vif_ports.iteritems():
+            self._unindex_vif_port(vif_id, port)
         del self.local_vlan_map[net_uuid]
         self.available_local_vlans.add(lvm.vlan)
 
@@ -374,6 +405,7 @@ class OVSQuantumAgent(object):
                                       physical_network, segmentation_id)
         lvm = self.local_vlan_map[net_uuid]
         lvm.vif_ports[port.vif_id] = port
+        self._index_vif_port(port, net_uuid)
 
         if network_type == constants.TYPE_GRE:
             if self.enable_tunneling:
@@ -411,8 +443,9 @@ class OVSQuantumAgent(object):
                                          dl_dst=lvm.vif_ports[vif_id].vif_mac)
 
         if vif_id in lvm.vif_ports:
-            del lvm.vif_ports[vif_id]
+            self._unindex_vif_port(vif_id, lvm.vif_ports.pop(vif_id))
         else:
+            self._unindex_vif_port(vif_id)
             LOG.info(_('port_unbound: vif_id %s not in local_vlan_map'),
                      vif_id)
 
@@ -550,6 +583,8 @@ class OVSQuantumAgent(object):
                 resync = True
                 continue
             port = self.int_br.get_vif_port_by_id(details['device'])
+            if port:
+                self.local_vif_ports[details['device']] = port
             if 'port_id' in details:
                 LOG.info(_("Port %(device)s updated. Details: %(details)s"),
                          locals())
@@ -569,6 +604,8 @@ class OVSQuantumAgent(object):
         resync = False
         for device in devices:
             LOG.info(_("Attachment %s removed"), device)
+            self.local_vif_ports.pop(device, None)
+            self.updated_ports.pop(device, None)
             try:
                 details = self.plugin_rpc.update_device_down(self.context,
                                                              device,
@@ -586,6 +623,25 @@ class OVSQuantumAgent(object):
                 self.port_unbound(device)
         return resync
 
+    def treat_ports_updated(self, updated_ports):
+        for port_id, update in updated_ports.iteritems():
+            vif_port = self.local_vif_ports.get(port_id)
+            if not vif_port:
+                LOG.debug(_("Port %s removed before update was processed"),
+                          port_id)
+                continue
+            port = update['port']
+            LOG.info(_("Port %s updated."), port_id)
+            self.treat_vif_port(vif_port, port_id, port['network_id'],
+                                update.get('network_type'),
+                                update.get('physical_network'),
+                                update.get('segmentation_id'),
+                                port['admin_state_up'])
+
+    def process_updated_ports(self):
+        updated_ports, self.updated_ports = self.updated_ports, {}
+        self.treat_ports_updated(updated_ports)
+
     def process_network_ports(self, port_info):
         resync_a = False
         resync_b = False
@@ -622,6 +678,10 @@ class OVSQuantumAgent(object):
                 if sync:
                     LOG.info(_("Agent out of sync with plugin!"))
                     ports.clear()
+                    # All ports are treated as added, which also picks up
+                    # any pending port updates.
+                    self.local_vif_ports.clear()
+                    self.updated_ports.clear()
                     sync = False
 
                 # Notify the plugin of tunnel IP
@@ -638,6 +698,10 @@ class OVSQuantumAgent(object):
                     sync = self.process_network_ports(port_info)
                     ports = port_info['current']
 
+                if self.updated_ports:
+                    LOG.debug(_("Agent loop has updated ports!"))
+                    self.process_updated_ports()
+
             except:
                 LOG.exception(_("Error in agent event loop"))
                 sync = True
@@ -689,6 +753,7 @@ def main():
     eventlet.monkey_patch()
     cfg.CONF(project='quantum')
     logging_config.setup_logging(cfg.CONF)
+    command_stats.setup(cfg.CONF)
 
     try:
         agent_config = create_agent_config_map(cfg.CONF)
@@ -31,7 +31,6 @@ from quantum.db import l3_rpc_base
 from quantum.db import models_v2
 from quantum.openstack.common import cfg
 from quantum.openstack.common import log as logging
-from quantum.openstack.common import rpc
 from quantum.plugins.ryu.common import config
 from quantum.plugins.ryu.db import api_v2 as db_api_v2
 from quantum.plugins.ryu import ofp_service_type
@@ -43,7 +42,9 @@ LOG = logging.getLogger(__name__)
 class RyuRpcCallbacks(dhcp_rpc_base.DhcpRpcCallbackMixin,
                       l3_rpc_base.L3RpcCallbackMixin):
 
-    RPC_API_VERSION = '1.0'
+    RPC_API_VERSION = '1.1'
+    # history
+    #   1.1 Support get_networks_info and update_lease_expirations
 
     def create_rpc_dispatcher(self):
         return q_rpc.PluginRpcDispatcher([self])
@@ -81,11 +82,9 @@ class RyuQuantumPluginV2(db_base_plugin_v2.QuantumDbPluginV2,
         self._create_all_tenant_network()
 
     def _setup_rpc(self):
-        self.conn = rpc.create_connection(new=True)
         self.callbacks = RyuRpcCallbacks()
         self.dispatcher = self.callbacks.create_rpc_dispatcher()
-        self.conn.create_consumer(topics.PLUGIN, self.dispatcher, fanout=False)
-        self.conn.consume_in_thread()
+        self.setup_rpc_listener([topics.PLUGIN])
 
     def _create_all_tenant_network(self):
         for net in db_api_v2.network_all_tenant_list():
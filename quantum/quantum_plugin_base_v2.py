@@ -24,12 +24,17 @@ methods that needs to be implemented by a v2 Quantum Plug-in.
 from abc import ABCMeta, abstractmethod
 
 from quantum.common import exceptions
+from quantum.openstack.common import cfg
+from quantum.openstack.common import rpc
 
 
 class QuantumPluginBaseV2(object):
 
     __metaclass__ = ABCMeta
 
+    # Topics consumed by start_rpc_listener, set by setup_rpc_listener
+    rpc_topics = ()
+
     @abstractmethod
     def create_subnet(self, context, subnet):
         """
@@ -290,3 +295,40 @@ class QuantumPluginBaseV2(object):
         : param id: UUID representing the port to delete.
         """
         pass
+
+    def setup_rpc_listener(self, topics):
+        """
+        Declare the RPC topics served by the plugin with self.dispatcher.
+
+        The topics are consumed right away, unless rpc_workers is set: the
+        server then calls start_rpc_listener from each of its RPC worker
+        processes instead, and the API process does not consume them.
+        """
+        self.rpc_topics = topics
+        if not cfg.CONF.rpc_workers:
+            self.start_rpc_listener()
+
+    def start_rpc_listener(self):
+        """
+        Start consuming the RPC topics served by the plugin.
+
+        NOTE: plugins neither calling setup_rpc_listener nor overriding
+              this method do not support rpc_workers.
+        """
+        if not self.rpc_topics:
+            raise exceptions.NotImplementedError()
+        self.conn = rpc.create_connection(new=True)
+        for topic in self.rpc_topics:
+            self.conn.create_consumer(topic, self.dispatcher, fanout=False)
+        # Consume from all consumers in a thread
+        self.conn.consume_in_thread()
+        return self.conn
+
+    def rpc_workers_supported(self):
+        """
+        Returns whether the plugin can consume its RPC from the processes
+        calling start_rpc_listener.
+        """
+        return bool(self.rpc_topics or
+                    self.__class__.start_rpc_listener !=
+                    QuantumPluginBaseV2.start_rpc_listener)
@@ -0,0 +1,164 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright (c) 2013 OpenStack, LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Root wrapper daemon for Quantum
+
+   A long-lived alternative to quantum-rootwrap. The filters are loaded
+   once at startup (and again on SIGHUP) and commands are received over
+   a Unix socket, so agents do not pay for a sudo and Python interpreter
+   start-up on every privileged command. Commands are checked with the
+   same filters and match_filter() as quantum-rootwrap.
+
+   The daemon is started as root with the rootwrap configuration file:
+   quantum-rootwrap-daemon /etc/quantum/rootwrap.conf
+
+   and agents use it by setting root_helper_daemon_socket to the value of
+   daemon_socket in that file.
+
+   Each request is a single line holding a JSON object with the command
+   ('cmd', a list) and optional 'process_input'. The reply is a single
+   JSON line with 'returncode', 'stdout' and 'stderr'. Strings are
+   latin-1 decoded so that any command output can be carried.
+"""
+
+import ConfigParser
+import json
+import os
+import pwd
+import signal
+import SocketServer
+import subprocess
+import sys
+
+from quantum.common import utils
+from quantum.rootwrap import wrapper
+
+
+# Same return code as quantum-rootwrap for commands matching no filter
+RC_UNAUTHORIZED = 99
+RC_BADREQUEST = 96
+
+ENCODING = 'latin-1'
+
+
+def encode_message(message):
+    return json.dumps(message, encoding=ENCODING) + '\n'
+
+
+def decode_message(line):
+    return json.loads(line)
+
+
+def run_command(filter_list, userargs, process_input=None):
+    """Run userargs if a filter allows it.
+
+    Returns a (returncode, stdout, stderr) tuple.
+    """
+    filtermatch = wrapper.match_filter(filter_list, userargs)
+    if not filtermatch:
+        return (RC_UNAUTHORIZED,
+                "Unauthorized command: %s\n" % ' '.join(userargs), '')
+    checker = wrapper.input_filter(filter_list, filtermatch, userargs)
+    if checker and not checker[0].match_input(checker[1],
+                                              process_input or ''):
+        return (RC_UNAUTHORIZED,
+                "Unauthorized input for command: %s\n" % ' '.join(userargs),
+                '')
+
+    obj = utils.subprocess_popen(filtermatch.get_command(userargs),
+                                 stdin=subprocess.PIPE,
+                                 stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE,
+                                 env=filtermatch.get_environment(userargs))
+    stdout, stderr = obj.communicate(process_input)
+    return obj.returncode, stdout, stderr
+
+
+class RootwrapRequestHandler(SocketServer.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = decode_message(self.rfile.readline())
+            userargs = [arg.encode(ENCODING) for arg in request['cmd']]
+            if not userargs:
+                raise ValueError('empty command')
+            process_input = request.get('process_input')
+            if process_input is not None:
+                process_input = process_input.encode(ENCODING)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            reply = (RC_BADREQUEST, '', 'Bad request: %s\n' % e)
+        else:
+            reply = run_command(self.server.filters, userargs, process_input)
+
+        returncode, stdout, stderr = reply
+        self.wfile.write(encode_message({'returncode': returncode,
+                                         'stdout': stdout,
+                                         'stderr': stderr}))
+
+
+class RootwrapServer(SocketServer.ThreadingMixIn,
+                     SocketServer.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, filters_path, user=None,
+                 filters_cache=None):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        SocketServer.UnixStreamServer.__init__(self, socket_path,
+                                               RootwrapRequestHandler)
+        # Only root and the agents' user may connect
+        if user:
+            os.chown(socket_path, pwd.getpwnam(user).pw_uid, -1)
+        os.chmod(socket_path, 0600)
+        self.filters_path = filters_path
+        self.filters_cache = filters_cache
+        self.load_filters()
+
+    def load_filters(self):
+        self.filters = wrapper.load_filter_index(self.filters_path,
+                                                 self.filters_cache)
+
+
+def main():
+    execname = sys.argv.pop(0)
+    if len(sys.argv) < 1:
+        print "%s: %s" % (execname, "No configuration file specified")
+        sys.exit(1)
+
+    configfile = sys.argv.pop(0)
+    config = ConfigParser.RawConfigParser()
+    config.read(configfile)
+    try:
+        filters_path = config.get("DEFAULT", "filters_path").split(",")
+        socket_path = config.get("DEFAULT", "daemon_socket")
+    except ConfigParser.Error:
+        print "%s: Incorrect configuration file: %s" % (execname, configfile)
+        sys.exit(1)
+    try:
+        user = config.get("DEFAULT", "daemon_user")
+    except ConfigParser.Error:
+        user = None
+    try:
+        filters_cache = config.get("DEFAULT", "filters_cache")
+    except ConfigParser.Error:
+        filters_cache = None
+
+    server = RootwrapServer(socket_path, filters_path, user, filters_cache)
+    signal.signal(signal.SIGHUP, lambda signum, frame: server.load_filters())
+    try:
+        server.serve_forever()
+    finally:
+        os.unlink(socket_path)
@@ -20,6 +20,12 @@ import os
 import re
 
 
+REGEXP_SPECIAL_CHARS = frozenset('.^$*+?{}[]\\|()')
+
+# ip objects the lines of an 'ip -batch' run may change
+IP_BATCH_OBJECTS = frozenset(['link', 'addr', 'route'])
+
+
 class CommandFilter(object):
     """Command filter only checking that the 1st argument matches exec_path"""
 
@@ -43,6 +49,21 @@ class CommandFilter(object):
         """Returns specific environment to set, None if none"""
         return None
 
+    # Whether match_input() must see what the command reads on stdin
+    checks_input = False
+
+    def match_input(self, userargs, data):
+        """Checks the data fed to the command on stdin"""
+        return True
+
+    def index_key(self):
+        """Returns the only command name (userargs[0]) this filter can
+        match, or None if it may match any command"""
+        if type(self).match.im_func is not CommandFilter.match.im_func:
+            # Subclass with its own matching we know nothing about
+            return None
+        return os.path.basename(self.exec_path)
+
 
 class ExecCommandFilter(CommandFilter):
     def exec_args(self, userargs):
@@ -52,19 +73,27 @@ class ExecCommandFilter(CommandFilter):
 class RegExpFilter(CommandFilter):
     """Command filter doing regexp matching for every argument"""
 
+    _regexes = None
+
+    def _compile(self):
+        # Anchoring patterns explicitly at end of string
+        try:
+            return [re.compile(pattern + '$') for pattern in self.args]
+        except re.error:
+            # Badly-formed filter
+            return []
+
     def match(self, userargs):
+        if self._regexes is None:
+            self._regexes = self._compile()
         # Early skip if command or number of args don't match
-        if (len(self.args) != len(userargs)):
-            # DENY: argument numbers don't match
+        if (len(self._regexes) != len(userargs)):
+            # DENY: argument numbers don't match (or badly-formed filter)
             return False
-        # Compare each arg (anchoring pattern explicitly at end of string)
-        for (pattern, arg) in zip(self.args, userargs):
-            try:
-                if not re.match(pattern + '$', arg):
-                    break
-            except re.error:
-                # DENY: Badly-formed filter
-                return False
+        # Compare each arg
+        for (regex, arg) in zip(self._regexes, userargs):
+            if not regex.match(arg):
+                break
         else:
             # ALLOW: All arguments matched
             return True
@@ -72,6 +101,12 @@ class RegExpFilter(CommandFilter):
         # DENY: Some arguments did not match
         return False
 
+    def index_key(self):
+        if self.args and not REGEXP_SPECIAL_CHARS.intersection(self.args[0]):
+            # Literal command pattern
+            return self.args[0]
+        return None
+
 
 class DnsmasqFilter(CommandFilter):
     """Specific filter for the dnsmasq call (which includes env)"""
@@ -104,6 +139,10 @@ class DnsmasqFilter(CommandFilter):
         env['QUANTUM_NETWORK_ID'] = userargs[1].split('=')[-1]
         return env
 
+    def index_key(self):
+        # The command starts with environment variables
+        return None
+
 
 class DnsmasqNetnsFilter(DnsmasqFilter):
     """Specific filter for the dnsmasq call (which includes env)"""
@@ -170,6 +209,9 @@ class KillFilter(CommandFilter):
             return False
         return True
 
+    def index_key(self):
+        return 'kill'
+
 
 class ReadFileFilter(CommandFilter):
     """Specific filter for the utils.read_file_as_root call"""
@@ -187,12 +229,30 @@ class ReadFileFilter(CommandFilter):
             return False
         return True
 
+    def index_key(self):
+        return 'cat'
+
+
+def _is_ip_batch_option(arg):
+    # ip takes any abbreviation of -batch, with one or two dashes
+    if arg.startswith('--'):
+        arg = arg[1:]
+    return len(arg) > 1 and '-batch'.startswith(arg)
+
 
 class IpFilter(CommandFilter):
     """Specific filter for the ip utility to that does not match exec."""
 
     def match(self, userargs):
         if userargs[0] == 'ip':
+            # The commands of a batch are checked by IpBatchFilter
+            for arg in userargs[1:]:
+                if _is_ip_batch_option(arg):
+                    return False
+            # 'netns exec' after options such as -all runs any command
+            for i in range(1, len(userargs) - 1):
+                if userargs[i:i + 2] == ['netns', 'exec']:
+                    return False
             if userargs[1] == 'netns':
                 if userargs[2] in ('list', 'add', 'delete'):
                     return True
@@ -201,17 +261,48 @@ class IpFilter(CommandFilter):
             else:
                 return True
 
+    def index_key(self):
+        return 'ip'
+
 
 class IpNetnsExecFilter(ExecCommandFilter):
     """Specific filter for the ip utility to that does match exec."""
     def match(self, userargs):
-        if userargs[:3] == ['ip', 'netns', 'exec']:
+        if (userargs[:3] == ['ip', 'netns', 'exec'] or
+                userargs[:4] == ['ip', '-all', 'netns', 'exec']):
             return True
         else:
             return False
 
+    def index_key(self):
+        return 'ip'
+
     def exec_args(self, userargs):
         args = userargs[4:]
         if args:
             args[0] = os.path.basename(args[0])
         return args
+
+
+class IpBatchFilter(CommandFilter):
+    """Specific filter for 'ip -batch -', checking the commands on stdin.
+
+    Each line of a batch is run as a full ip command, so its object must
+    be one of IP_BATCH_OBJECTS. They are compared whole since ip takes
+    abbreviations, e.g. 'netn exec' would run any command.
+    """
+
+    checks_input = True
+
+    def match(self, userargs):
+        return userargs == ['ip', '-batch', '-']
+
+    def match_input(self, userargs, data):
+        for line in data.splitlines():
+            args = line.split()
+            if args and args[0] not in IP_BATCH_OBJECTS:
+                return False
+        return True
+
+    def index_key(self):
+        return 'ip'
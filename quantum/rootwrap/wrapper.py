@@ -17,14 +17,21 @@
 
 
 import ConfigParser
+import cPickle as pickle
 import os
+import stat
 import string
+import tempfile
+import time
 
 # this import has the effect of defining global var "filters",
 # referenced by build_filter(), below.  It gets set up by
 # quantum-rootwrap, when we load_filters().
 from quantum.rootwrap import filters
 
+# Seconds for which FilterIndex.is_executable() trusts a previous lookup
+EXECUTABLE_CACHE_TTL = 60
+
 
 def build_filter(class_name, *args):
     """Returns a filter object of class class_name"""
@@ -35,46 +42,173 @@ def build_filter(class_name, *args):
     return filterclass(*args)
 
 
-def load_filters(filters_path):
-    """Load filters from a list of directories"""
-    filterlist = []
+def _filter_files(filters_path):
     for filterdir in filters_path:
         if not os.path.isdir(filterdir):
             continue
         for filterfile in os.listdir(filterdir):
-            filterconfig = ConfigParser.RawConfigParser()
-            filterconfig.read(os.path.join(filterdir, filterfile))
-            for (name, value) in filterconfig.items("Filters"):
-                filterdefinition = [string.strip(s) for s in value.split(',')]
-                newfilter = build_filter(*filterdefinition)
-                if newfilter is None:
-                    continue
-                filterlist.append(newfilter)
+            yield filterdir, filterfile
+
+
+def load_filters(filters_path):
+    """Load filters from a list of directories"""
+    filterlist = []
+    for filterdir, filterfile in _filter_files(filters_path):
+        filterconfig = ConfigParser.RawConfigParser()
+        filterconfig.read(os.path.join(filterdir, filterfile))
+        for (name, value) in filterconfig.items("Filters"):
+            filterdefinition = [string.strip(s) for s in value.split(',')]
+            newfilter = build_filter(*filterdefinition)
+            if newfilter is None:
+                continue
+            filterlist.append(newfilter)
     return filterlist
 
 
+class FilterIndex(object):
+    """Filters grouped by the command name they can match.
+
+    Lookups only go through the filters that can match userargs[0] (and
+    the ones that may match any command), in their original order, so
+    match_filter() gives the same result as with the full filter list.
+    """
+
+    def __init__(self, filter_list, signature=None):
+        self.filters = list(filter_list)
+        self.signature = signature
+        self._any_command = []
+        self._by_command = {}
+        for f in self.filters:
+            key = f.index_key()
+            if key is None:
+                self._any_command.append(f)
+                for candidates in self._by_command.itervalues():
+                    candidates.append(f)
+            else:
+                self._by_command.setdefault(
+                    key, list(self._any_command)).append(f)
+        self._leaf_index = None
+        self._executable = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Executable availability is checked again by each process
+        state['_executable'] = {}
+        return state
+
+    def candidates(self, userargs):
+        return self._by_command.get(userargs[0], self._any_command)
+
+    def leaf_index(self):
+        """Index of the filters which do not call exec"""
+        if self._leaf_index is None:
+            self._leaf_index = FilterIndex(
+                [f for f in self.filters
+                 if not isinstance(f, filters.ExecCommandFilter)])
+        return self._leaf_index
+
+    def is_executable(self, exec_path):
+        # Lookups expire so that a long-lived index, as in the daemon,
+        # notices executables installed or removed after it was built
+        now = time.time()
+        cached = self._executable.get(exec_path)
+        if cached is None or now - cached[1] > EXECUTABLE_CACHE_TTL:
+            cached = (os.access(exec_path, os.X_OK), now)
+            self._executable[exec_path] = cached
+        return cached[0]
+
+
+def filters_signature(filters_path):
+    """Returns the modification times of the filter directories and files.
+
+    A cached index is valid as long as this does not change.
+    """
+    signature = [(filterdir, os.stat(filterdir).st_mtime)
+                 for filterdir in filters_path if os.path.isdir(filterdir)]
+    for filterdir, filterfile in _filter_files(filters_path):
+        path = os.path.join(filterdir, filterfile)
+        st = os.stat(path)
+        signature.append((path, st.st_mtime, st.st_size))
+    return signature
+
+
+def _read_index_cache(cache_file):
+    try:
+        with open(cache_file, 'rb') as f:
+            # Unpickling runs code: only trust a file nobody else can write
+            st = os.fstat(f.fileno())
+            if (st.st_uid != os.getuid() or
+                    st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)):
+                return None
+            index = pickle.load(f)
+    except Exception:
+        return None
+    if not isinstance(index, FilterIndex):
+        return None
+    return index
+
+
+def _write_index_cache(cache_file, index):
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_file))
+    except (IOError, OSError):
+        return
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(index, f, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_path, cache_file)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+
+def load_filter_index(filters_path, cache_file=None):
+    """Load filters from a list of directories into a FilterIndex.
+
+    If cache_file is given, the index is read from it unless the filter
+    files changed since it was written, in which case it is rebuilt and
+    the cache file is replaced.
+    """
+    if not cache_file:
+        return FilterIndex(load_filters(filters_path))
+
+    signature = filters_signature(filters_path)
+    index = _read_index_cache(cache_file)
+    if index is None or index.signature != signature:
+        index = FilterIndex(load_filters(filters_path), signature)
+        _write_index_cache(cache_file, index)
+    return index
+
+
 def match_filter(filter_list, userargs):
     """
     Checks user command and arguments through command filters and
     returns the first matching filter, or None is none matched.
+    filter_list is either a list of filters or a FilterIndex.
     """
 
+    if not isinstance(filter_list, FilterIndex):
+        filter_list = FilterIndex(filter_list)
+
     found_filter = None
 
-    for f in filter_list:
+    if not userargs:
+        return found_filter
+
+    for f in filter_list.candidates(userargs):
         if f.match(userargs):
             if isinstance(f, filters.ExecCommandFilter):
                 # This command calls exec verify that remaining args
                 # matches another filter.
-                leaf_filters = [fltr for fltr in filter_list
-                                if not isinstance(fltr,
-                                                  filters.ExecCommandFilter)]
                 args = f.exec_args(userargs)
-                if not args or not match_filter(leaf_filters, args):
+                if not args or not match_filter(filter_list.leaf_index(),
+                                                args):
                     continue
 
             # Try other filters if executable is absent
-            if not os.access(f.exec_path, os.X_OK):
+            if not filter_list.is_executable(f.exec_path):
                 if not found_filter:
                     found_filter = f
                 continue
@@ -83,3 +217,21 @@ def match_filter(filter_list, userargs):
 
     # No filter matched or first missing executable
     return found_filter
+
+
+def input_filter(filter_list, filtermatch, userargs):
+    """
+    Returns the filter checking what the command matched by filtermatch
+    reads on stdin, with the arguments it matched, or None if the command
+    may read anything. The command run by an ExecCommandFilter is checked
+    by the filter it matched.
+    """
+
+    if isinstance(filtermatch, filters.ExecCommandFilter):
+        if not isinstance(filter_list, FilterIndex):
+            filter_list = FilterIndex(filter_list)
+        userargs = filtermatch.exec_args(userargs)
+        filtermatch = match_filter(filter_list.leaf_index(), userargs)
+    if filtermatch is not None and filtermatch.checks_input:
+        return filtermatch, userargs
+    return None
@@ -35,7 +35,12 @@ def main():
                    " the '--config-file' option!"))
     try:
         quantum_service = service.serve_wsgi(service.QuantumApiService)
-        quantum_service.wait()
+        launcher = service.serve_rpc(quantum_service.launcher)
+        if launcher:
+            # Supervises the RPC workers, and the API workers if any
+            launcher.wait()
+        else:
+            quantum_service.wait()
     except RuntimeError, e:
         sys.exit(_("ERROR: %s") % e)
 
@@ -20,13 +20,19 @@ import logging as std_logging
 import os
 import random
 
+from eventlet import event
+
 from quantum.common import config
 from quantum import context
+from quantum.db import api as db_api
+from quantum import manager
 from quantum.openstack.common import cfg
 from quantum.openstack.common import importutils
 from quantum.openstack.common import log as logging
 from quantum.openstack.common import loopingcall
+from quantum.openstack.common import rpc
 from quantum.openstack.common.rpc import service
+from quantum.openstack.common import service as common_service
 from quantum import wsgi
 
 
@@ -70,6 +76,10 @@ class WsgiService(object):
     def wait(self):
         self.wsgi_app.wait()
 
+    @property
+    def launcher(self):
+        return self.wsgi_app.launcher
+
 
 class QuantumApiService(WsgiService):
     """Class for quantum-api service."""
@@ -109,7 +119,8 @@ def _run_wsgi(app_name):
         LOG.error(_('No known API applications configured.'))
         return
     server = wsgi.Server("Quantum")
-    server.start(app, cfg.CONF.bind_port, cfg.CONF.bind_host)
+    server.start(app, cfg.CONF.bind_port, cfg.CONF.bind_host,
+                 workers=cfg.CONF.api_workers)
     # Dump all option values here after all options are parsed
     cfg.CONF.log_opt_values(LOG, std_logging.DEBUG)
     LOG.info(_("Quantum service started, listening on %(host)s:%(port)s"),
@@ -118,6 +129,48 @@ def _run_wsgi(app_name):
     return server
 
 
+class RpcWorker(object):
+    """Consumes the RPC of a plugin from a forked worker process."""
+
+    def __init__(self, plugin):
+        self._plugin = plugin
+        self._stopped = event.Event()
+
+    def start(self):
+        # Connections are opened afresh rather than shared with the parent
+        db_api.dispose()
+        rpc.reset_after_fork()
+        self._plugin.start_rpc_listener()
+
+    def wait(self):
+        self._stopped.wait()
+
+    def stop(self):
+        if not self._stopped.ready():
+            self._stopped.send()
+
+
+def serve_rpc(launcher=None):
+    """Fork the processes consuming the RPC of the plugin, if configured.
+
+    The processes are started through launcher if given, e.g. the one of
+    the API workers. Returns the launcher supervising them, or None when
+    the plugin consumes its RPC from the API process.
+    """
+    if cfg.CONF.rpc_workers < 1:
+        return None
+
+    plugin = manager.QuantumManager.get_plugin()
+    if not plugin.rpc_workers_supported():
+        raise RuntimeError(_("rpc_workers is not supported by plugin %s") %
+                           cfg.CONF.core_plugin)
+    if launcher is None:
+        launcher = common_service.ProcessLauncher()
+    launcher.launch_service(RpcWorker(plugin),
+                            workers=cfg.CONF.rpc_workers)
+    return launcher
+
+
 class Service(service.Service):
     """Service object for binaries running on hosts.
 
@@ -51,3 +51,107 @@ class TestLinuxBridge(unittest.TestCase):
             result = self.linux_bridge.ensure_physical_in_bridge(
                 'network_id', 'physnet1', 7)
         self.assertTrue(vlan_bridge_func.called)
+
+    def test_update_devices_from_events(self):
+        monitor = mock.Mock()
+        monitor.get_events.return_value = (set(['tap3']), set(['tap1']))
+        self.linux_bridge.device_monitor = monitor
+        topology = mock.Mock()
+        self.linux_bridge.topology = topology
+        device_info = self.linux_bridge.update_devices_from_events(
+            set(['tap1', 'tap2']))
+        self.assertEqual(device_info, {'current': set(['tap2', 'tap3']),
+                                       'added': set(['tap3']),
+                                       'removed': set(['tap1'])})
+        topology.remove_interface.assert_called_once_with('tap1')
+
+    def test_update_devices_from_events_no_changes(self):
+        monitor = mock.Mock()
+        monitor.get_events.return_value = (set(), set())
+        self.linux_bridge.device_monitor = monitor
+        self.assertIsNone(
+            self.linux_bridge.update_devices_from_events(set(['tap1'])))
+
+    def test_update_devices_full_scan_discards_events(self):
+        monitor = mock.Mock()
+        self.linux_bridge.device_monitor = monitor
+        topology = mock.Mock()
+        self.linux_bridge.topology = topology
+        with mock.patch.object(self.linux_bridge, 'udev_get_tap_devices',
+                               return_value=set(['tap1'])):
+            self.assertIsNone(
+                self.linux_bridge.update_devices(set(['tap1'])))
+        self.assertTrue(monitor.get_events.called)
+        self.assertTrue(topology.invalidate.called)
+
+
+class TestBridgeTopology(unittest.TestCase):
+
+    def setUp(self):
+        self.topology = linuxbridge_quantum_agent.BridgeTopology()
+        self.sysfs = {
+            linuxbridge_quantum_agent.BRIDGE_FS: ['brq1', 'brq2', 'eth0'],
+            '/sys/devices/virtual/net/brq1/brif/': ['tap1', 'eth1.7'],
+            '/sys/devices/virtual/net/brq2/brif/': ['tap2']}
+        listdir_patch = mock.patch('os.listdir', side_effect=self._listdir)
+        self.listdir = listdir_patch.start()
+        self.addCleanup(listdir_patch.stop)
+
+    def _listdir(self, path):
+        try:
+            return self.sysfs[path]
+        except KeyError:
+            raise OSError()
+
+    def test_get_bridges(self):
+        self.assertEqual(sorted(self.topology.get_bridges()),
+                         ['brq1', 'brq2'])
+
+    def test_lookups_are_cached(self):
+        self.assertIsNone(self.topology.get_bridge_for_interface('tap9'))
+        self.assertEqual(self.listdir.call_count, 3)
+        self.assertEqual(self.topology.get_bridge_for_interface('tap2'),
+                         'brq2')
+        self.assertTrue(self.topology.has_interface('brq1', 'tap1'))
+        self.assertEqual(self.listdir.call_count, 3)
+
+    def test_missing_bridge(self):
+        self.assertIsNone(self.topology.get_interfaces('brq3'))
+        self.assertFalse(self.topology.has_interface('brq3', 'tap1'))
+
+    def test_mutations_update_cache(self):
+        self.topology.get_interfaces('brq1')
+        self.topology.add_bridge('brq3')
+        self.topology.add_interface('brq3', 'tap3')
+        self.topology.remove_interface('tap1')
+        self.topology.remove_bridge('brq2')
+        self.assertEqual(self.topology.get_interfaces('brq3'), ['tap3'])
+        self.assertEqual(self.topology.get_interfaces('brq1'), ['eth1.7'])
+        self.assertFalse(self.topology.has_bridge('brq2'))
+
+    def test_invalidate_reloads(self):
+        self.topology.get_bridges()
+        self.sysfs[linuxbridge_quantum_agent.BRIDGE_FS].append('brq3')
+        self.assertFalse(self.topology.has_bridge('brq3'))
+        self.topology.invalidate()
+        self.assertTrue(self.topology.has_bridge('brq3'))
+
+
+class TestTapDeviceMonitor(unittest.TestCase):
+
+    def setUp(self):
+        with mock.patch('pyudev.Monitor'):
+            self.monitor = linuxbridge_quantum_agent.TapDeviceMonitor(
+                mock.Mock())
+
+    def test_handle_event_ignores_non_tap_devices(self):
+        self.monitor.handle_event('add', 'eth0')
+        self.assertEqual(self.monitor.get_events(), (set(), set()))
+
+    def test_handle_event_add_then_remove(self):
+        self.monitor.handle_event('add', 'tap1')
+        self.monitor.handle_event('add', 'tap2')
+        self.monitor.handle_event('remove', 'tap1')
+        self.assertEqual(self.monitor.get_events(),
+                         (set(['tap2']), set(['tap1'])))
+        self.assertEqual(self.monitor.get_events(), (set(), set()))
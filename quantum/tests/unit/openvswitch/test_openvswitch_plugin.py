@@ -13,7 +13,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import mock
+
+from quantum.common import topics
 from quantum.extensions import portbindings
+from quantum.manager import QuantumManager
+from quantum.openstack.common import cfg
+from quantum import quantum_plugin_base_v2
 from quantum.tests.unit import _test_extension_portbindings as test_bindings
 from quantum.tests.unit import test_db_plugin as test_plugin
 
@@ -48,3 +54,30 @@ class TestOpenvswitchPortsV2(test_plugin.TestPortsV2,
 class TestOpenvswitchNetworksV2(test_plugin.TestNetworksV2,
                                 OpenvswitchPluginV2TestCase):
     pass
+
+
+class TestOpenvswitchRpcListener(OpenvswitchPluginV2TestCase):
+
+    def _setup_rpc(self):
+        plugin = QuantumManager.get_plugin()
+        self.assertTrue(plugin.rpc_workers_supported())
+        with mock.patch.object(plugin, 'start_rpc_listener') as start:
+            plugin.setup_rpc()
+        return start
+
+    def test_consumed_from_api_process(self):
+        self.assertTrue(self._setup_rpc().called)
+
+    def test_consumed_from_rpc_workers(self):
+        cfg.CONF.set_override('rpc_workers', 2)
+        self.assertFalse(self._setup_rpc().called)
+
+    def test_start_rpc_listener(self):
+        plugin = QuantumManager.get_plugin()
+        with mock.patch.object(quantum_plugin_base_v2.rpc,
+                               'create_connection') as create_connection:
+            conn = plugin.start_rpc_listener()
+        self.assertEqual(conn, create_connection.return_value)
+        conn.create_consumer.assert_called_once_with(
+            topics.PLUGIN, plugin.dispatcher, fanout=False)
+        conn.consume_in_thread.assert_called_once_with()
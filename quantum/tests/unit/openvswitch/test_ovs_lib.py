@@ -19,6 +19,7 @@ import mox
 import unittest2 as unittest
 
 from quantum.agent.linux import ovs_lib, utils
+from quantum.openstack.common import jsonutils
 from quantum.openstack.common import uuidutils
 
 
@@ -314,26 +315,84 @@ class OVS_Lib_Test(unittest.TestCase):
         self.assertIsNone(ovs_lib.get_bridge_for_iface(root_helper, iface))
         self.mox.VerifyAll()
 
+    def _bridge_ports_output(self):
+        bridges = {'headings': ['name', 'ports'],
+                   'data': [['br-int', ['set', [['uuid', 'p1'],
+                                                ['uuid', 'p2'],
+                                                ['uuid', 'p3']]]],
+                            ['br-ex', ['uuid', 'p4']]]}
+        ports = {'headings': ['_uuid', 'name'],
+                 'data': [[['uuid', 'p1'], 'br-int'],
+                          [['uuid', 'p2'], 'tap1'],
+                          [['uuid', 'p3'], 'patch-tun'],
+                          [['uuid', 'p4'], 'eth1']]}
+        ifaces = {'headings': ['name', 'type', 'external_ids', 'ofport'],
+                  'data': [['br-int', 'internal', ['map', []], 65534],
+                           ['tap1', '', ['map', [['attached-mac', 'mac'],
+                                                 ['iface-id', 'id']]], 3],
+                           ['patch-tun', 'patch', ['map', []], 1],
+                           ['eth1', '', ['map', []], ['set', []]]]}
+        return '\n'.join(jsonutils.dumps(table)
+                         for table in (bridges, ports, ifaces)) + '\n'
+
+    def _expect_get_bridge_ports(self):
+        utils.execute(["ovs-vsctl", self.TO, "--format=json",
+                       "--", "--columns=name,ports", "list", "Bridge",
+                       "--", "--columns=_uuid,name", "list", "Port",
+                       "--", "--columns=name,type,external_ids,ofport",
+                       "list", "Interface"],
+                      root_helper=self.root_helper).AndReturn(
+                          self._bridge_ports_output())
+
+    def test_get_bridge_ports(self):
+        self._expect_get_bridge_ports()
+        self.mox.ReplayAll()
+        self.assertEqual(ovs_lib.get_bridge_ports(self.root_helper), {
+            'br-int': {'tap1': {'type': '', 'ofport': 3,
+                                'external_ids': {'attached-mac': 'mac',
+                                                 'iface-id': 'id'}},
+                       'patch-tun': {'type': 'patch', 'ofport': 1,
+                                     'external_ids': {}}},
+            'br-ex': {'eth1': {'type': '', 'ofport': None,
+                               'external_ids': {}}}})
+        self.mox.VerifyAll()
+
+    def test_get_bridge_ports_fails(self):
+        utils.execute(mox.IgnoreArg(),
+                      root_helper=self.root_helper).AndRaise(RuntimeError)
+        self.mox.ReplayAll()
+        self.assertEqual(ovs_lib.get_bridge_ports(self.root_helper), {})
+        self.mox.VerifyAll()
+
+    def test_is_vif_interface(self):
+        self.assertFalse(ovs_lib.is_vif_interface(None))
+        self.assertFalse(ovs_lib.is_vif_interface({'external_ids': {}}))
+        for key in ('iface-id', 'xs-vif-uuid'):
+            self.assertTrue(ovs_lib.is_vif_interface(
+                {'external_ids': {key: 'id', 'attached-mac': 'mac'}}))
+
+    def test_delete_port_list(self):
+        utils.execute(["ovs-vsctl", self.TO,
+                       "--", "--if-exists", "del-port", self.BR_NAME, "tap1",
+                       "--", "--if-exists", "del-port", self.BR_NAME, "tap2"],
+                      root_helper=self.root_helper)
+        self.mox.ReplayAll()
+        self.br.delete_port_list(['tap1', 'tap2'])
+        self.br.delete_port_list([])
+        self.mox.VerifyAll()
+
     def test_delete_all_ports(self):
-        self.mox.StubOutWithMock(self.br, 'get_port_name_list')
-        self.br.get_port_name_list().AndReturn(['port1'])
-        self.mox.StubOutWithMock(self.br, 'delete_port')
-        self.br.delete_port('port1')
+        self._expect_get_bridge_ports()
+        self.mox.StubOutWithMock(self.br, 'delete_port_list')
+        self.br.delete_port_list(['patch-tun', 'tap1'])
         self.mox.ReplayAll()
         self.br.delete_ports(all_ports=True)
         self.mox.VerifyAll()
 
     def test_delete_quantum_ports(self):
-        port1 = ovs_lib.VifPort('tap1234', 1, uuidutils.generate_uuid(),
-                                'ca:fe:de:ad:be:ef', 'br')
-        port2 = ovs_lib.VifPort('tap5678', 2, uuidutils.generate_uuid(),
-                                'ca:ee:de:ad:be:ef', 'br')
-        ports = [port1, port2]
-        self.mox.StubOutWithMock(self.br, 'get_vif_ports')
-        self.br.get_vif_ports().AndReturn([port1, port2])
-        self.mox.StubOutWithMock(self.br, 'delete_port')
-        self.br.delete_port('tap1234')
-        self.br.delete_port('tap5678')
+        self._expect_get_bridge_ports()
+        self.mox.StubOutWithMock(self.br, 'delete_port_list')
+        self.br.delete_port_list(['tap1'])
         self.mox.ReplayAll()
         self.br.delete_ports(all_ports=False)
         self.mox.VerifyAll()
@@ -146,3 +146,78 @@ class TestOvsQuantumAgent(unittest.TestCase):
 
     def test_treat_devices_removed_ignores_missing_port(self):
         self.mock_treat_devices_removed(False)
+
+    def _bind_port(self, vif_id, ofport, net_uuid):
+        port = mock.Mock()
+        port.vif_id = vif_id
+        port.ofport = ofport
+        self.agent.port_bound(port, net_uuid, 'local', None, None)
+        return port
+
+    def test_port_bound_indexes_vif(self):
+        self._bind_port('vif1', 5, 'net1')
+        self.assertEqual(self.agent.get_net_uuid('vif1'), 'net1')
+        self.assertEqual(self.agent.get_vif_id_by_ofport(5), 'vif1')
+
+    def test_port_unbound_removes_vif_from_index(self):
+        self._bind_port('vif1', 5, 'net1')
+        self._bind_port('vif2', 6, 'net1')
+        self.agent.port_unbound('vif1')
+        self.assertIsNone(self.agent.get_net_uuid('vif1'))
+        self.assertIsNone(self.agent.get_vif_id_by_ofport(5))
+        self.assertEqual(self.agent.get_net_uuid('vif2'), 'net1')
+        self.assertTrue('net1' in self.agent.local_vlan_map)
+
+    def test_reclaim_local_vlan_clears_index(self):
+        self._bind_port('vif1', 5, 'net1')
+        self._bind_port('vif2', 6, 'net1')
+        self.agent.reclaim_local_vlan('net1',
+                                      self.agent.local_vlan_map['net1'])
+        self.assertEqual(self.agent.vif_net_map, {})
+        self.assertEqual(self.agent.ofport_vif_map, {})
+
+    def test_get_net_uuid_unknown_vif(self):
+        self.assertIsNone(self.agent.get_net_uuid('unknown'))
+
+    def _port_update(self, port_id, admin_state_up=True):
+        port = {'id': port_id, 'network_id': 'net1',
+                'admin_state_up': admin_state_up}
+        self.agent.port_update(mock.Mock(), port=port, network_type='local',
+                               physical_network=None, segmentation_id=None)
+
+    def test_port_update_ignores_non_local_port(self):
+        with mock.patch.object(self.agent.int_br,
+                               'get_vif_port_by_id') as get_vif_func:
+            self._port_update('remote-port')
+        self.assertFalse(get_vif_func.called)
+        self.assertEqual(self.agent.updated_ports, {})
+
+    def test_port_update_queues_local_port(self):
+        self.agent.local_vif_ports['port1'] = mock.Mock()
+        with mock.patch.object(self.agent.int_br,
+                               'get_vif_port_by_id') as get_vif_func:
+            self._port_update('port1', admin_state_up=True)
+            self._port_update('port1', admin_state_up=False)
+        self.assertFalse(get_vif_func.called)
+        self.assertEqual(len(self.agent.updated_ports), 1)
+        self.assertFalse(
+            self.agent.updated_ports['port1']['port']['admin_state_up'])
+
+    def test_process_updated_ports(self):
+        vif_port = mock.Mock()
+        self.agent.local_vif_ports['port1'] = vif_port
+        self._port_update('port1')
+        with mock.patch.object(self.agent, 'treat_vif_port') as func:
+            self.agent.process_updated_ports()
+        func.assert_called_once_with(vif_port, 'port1', 'net1', 'local',
+                                     None, None, True)
+        self.assertEqual(self.agent.updated_ports, {})
+
+    def test_treat_devices_removed_drops_cached_port(self):
+        self.agent.local_vif_ports['port1'] = mock.Mock()
+        self._port_update('port1')
+        with mock.patch.object(self.agent.plugin_rpc, 'update_device_down',
+                               return_value={'exists': True}):
+            self.agent.treat_devices_removed(['port1'])
+        self.assertFalse('port1' in self.agent.local_vif_ports)
+        self.assertFalse('port1' in self.agent.updated_ports)
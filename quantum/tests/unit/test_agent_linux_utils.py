@@ -15,11 +15,18 @@
 #    under the License.
 # @author: Dan Wendlandt, Nicira, Inc.
 
+import os
+import shutil
+import tempfile
+import threading
 import unittest
 
 import mock
 
 from quantum.agent.linux import utils
+from quantum.openstack.common import cfg
+from quantum.rootwrap import daemon
+from quantum.rootwrap import filters
 
 
 class AgentUtilsExecuteTest(unittest.TestCase):
@@ -60,6 +67,82 @@ class AgentUtilsExecuteTest(unittest.TestCase):
                                addl_env={'foo': 'bar'})
         self.assertEqual(result, "%s\n" % self.test_file)
 
+    def test_timeout(self):
+        self.assertRaises(utils.ExecuteTimeout, utils.execute,
+                          ["sleep", "10"], timeout=0.1)
+        self.assertEqual(utils.execute(["echo"], timeout=10), "\n")
+
+    def test_run(self):
+        result = utils.run(["ls", self.test_file[:-1]])
+        self.assertEqual(result.cmd, ["ls", self.test_file[:-1]])
+        self.assertNotEqual(result.returncode, 0)
+        self.assertEqual(result.stdout, "")
+        self.assertTrue(result.stderr)
+
+
+class AgentUtilsExecuteDaemonTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.tempdir, 'rootwrap.sock')
+        cfg.CONF.set_override('root_helper_daemon_socket', self.socket_path)
+        self.server = daemon.RootwrapServer(self.socket_path, [])
+        self.server.filters = [filters.CommandFilter('/bin/cat', 'root'),
+                               filters.CommandFilter('/bin/false', 'root')]
+
+    def tearDown(self):
+        self.server.server_close()
+        cfg.CONF.clear_override('root_helper_daemon_socket')
+        shutil.rmtree(self.tempdir)
+
+    def _execute(self, *args, **kwargs):
+        handler = threading.Thread(target=self.server.handle_request)
+        handler.start()
+        try:
+            return utils.execute(*args, **kwargs)
+        finally:
+            handler.join()
+
+    def test_execute(self):
+        result = self._execute(['cat'], 'sudo', process_input='foo\xff\n')
+        self.assertEqual(result, 'foo\xff\n')
+
+    def test_check_exit_code(self):
+        self.assertRaises(RuntimeError, self._execute, ['false'], 'sudo')
+        self.assertEqual(self._execute(['false'], 'sudo',
+                                       check_exit_code=False), '')
+
+    def test_unauthorized(self):
+        self.assertRaises(RuntimeError, self._execute, ['ls'], 'sudo')
+
+    def test_daemon_unavailable_falls_back_to_helper(self):
+        self.server.server_close()
+        os.unlink(self.socket_path)
+        result = utils.execute(['ls', self.tempdir], 'echo')
+        self.assertEqual(result, 'ls %s\n' % self.tempdir)
+
+    def test_connection_closed_without_reply(self):
+        def close_connection():
+            request, client_address = self.server.get_request()
+            request.makefile('r').readline()
+            request.close()
+
+        handler = threading.Thread(target=close_connection)
+        handler.start()
+        try:
+            # The command may have run, it must not be run again
+            with mock.patch.object(utils.utils, 'subprocess_popen') as popen:
+                self.assertRaises(RuntimeError, utils.execute, ['cat'],
+                                  'echo')
+        finally:
+            handler.join()
+        self.assertFalse(popen.called)
+
+    def test_without_helper_bypasses_daemon(self):
+        with mock.patch.object(utils, '_execute_in_daemon') as in_daemon:
+            utils.execute(['true'])
+            utils.execute(['true'], 'echo', addl_env={'foo': 'bar'})
+        self.assertFalse(in_daemon.called)
+
 
 class AgentUtilsGetInterfaceMAC(unittest.TestCase):
     def test_get_interface_mac(self):
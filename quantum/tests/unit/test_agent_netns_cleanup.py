@@ -18,6 +18,7 @@
 import mock
 import unittest2 as unittest
 
+from quantum.agent.linux import ip_lib
 from quantum.agent import netns_cleanup_util as util
 
 
@@ -87,6 +88,67 @@ class TestNetnsCleanup(unittest.TestCase):
     def test_eligible_for_deletion_not_empty_forced(self):
         self._test_eligible_for_deletion_helper('qdhcp-', True, False, True)
 
+    def test_eligible_for_deletion_from_devices(self):
+        ns = 'qdhcp-6e322ac7-ab50-4f53-9cdc-d1d3c1164b6d'
+        with mock.patch('quantum.agent.linux.ip_lib.IPWrapper') as ip_wrap:
+            self.assertTrue(util.eligible_for_deletion(mock.Mock(), ns,
+                                                       False, {ns: []}))
+            self.assertFalse(util.eligible_for_deletion(mock.Mock(), ns,
+                                                        False, {ns: ['tap']}))
+            self.assertFalse(ip_wrap.called)
+
+    def test_get_namespace_devices(self):
+        conf = mock.Mock()
+        conf.root_helper = 'sudo'
+        with mock.patch('quantum.agent.linux.ip_lib.IPWrapper') as ip_wrap:
+            get_devices = ip_wrap.get_devices_by_namespace
+            get_devices.return_value = {'ns': []}
+            self.assertEqual(util.get_namespace_devices(conf), {'ns': []})
+            get_devices.assert_called_once_with('sudo', exclude_loopback=True)
+
+            get_devices.side_effect = RuntimeError
+            self.assertEqual(util.get_namespace_devices(conf), {})
+
+    def _mock_devices(self, *names):
+        devices = []
+        for name in names:
+            device = mock.Mock()
+            device.name = name
+            devices.append(device)
+        return devices
+
+    def test_unplug_devices(self):
+        ip = mock.Mock()
+        ip.delete_devices.return_value = ['qr-1']
+        devices = self._mock_devices('tap1', 'qr-1', 'tap2')
+        with mock.patch.object(util, 'unplug_ovs_port') as unplug_ovs_port:
+            util.unplug_devices(mock.Mock(), ip, devices)
+        ip.delete_devices.assert_called_once_with(['tap1', 'qr-1', 'tap2'])
+        unplug_ovs_port.assert_called_once_with(mock.ANY, 'qr-1')
+
+    def test_unplug_devices_batch_not_run(self):
+        ip = mock.Mock()
+        ip.delete_devices.side_effect = ip_lib.IpBatchError('failed', [])
+        devices = self._mock_devices('tap1', 'tap2')
+        with mock.patch.object(util, 'unplug_device') as unplug_device:
+            util.unplug_devices(mock.Mock(), ip, devices)
+        unplug_device.assert_has_calls([mock.call(mock.ANY, d)
+                                        for d in devices])
+
+    def test_destroy_namespaces(self):
+        conf = mock.Mock()
+        conf.workers = 2
+        namespaces = ['ns%d' % i for i in range(5)]
+        with mock.patch.object(util, 'destroy_namespace') as destroy:
+            destroy.side_effect = lambda conf, ns, force: ns != 'ns3'
+            with mock.patch.object(util.LOG, 'info') as info:
+                util.destroy_namespaces(conf, namespaces, True)
+        destroy.assert_has_calls([mock.call(conf, ns, True)
+                                  for ns in namespaces], any_order=True)
+        report = info.call_args[0][1]
+        self.assertEqual(report['done'], 5)
+        self.assertEqual(report['failed'], 1)
+
     def test_unplug_device_regular_device(self):
         conf = mock.Mock()
         device = mock.Mock()
@@ -164,10 +226,10 @@ class TestNetnsCleanup(unittest.TestCase):
             ip_wrap.return_value.get_devices.return_value = devices
             ip_wrap.return_value.netns.exists.return_value = True
 
-            with mock.patch.object(util, 'unplug_device') as unplug:
+            with mock.patch.object(util, 'unplug_devices') as unplug:
 
                 with mock.patch.object(util, 'kill_dhcp') as kill_dhcp:
-                    util.destroy_namespace(conf, ns, force)
+                    self.assertTrue(util.destroy_namespace(conf, ns, force))
                     expected = [mock.call('sudo', ns)]
 
                     if force:
@@ -175,9 +237,8 @@ class TestNetnsCleanup(unittest.TestCase):
                             mock.call().netns.exists(ns),
                             mock.call().get_devices(exclude_loopback=True)])
                         self.assertTrue(kill_dhcp.called)
-                        unplug.assert_has_calls(
-                            [mock.call(conf, d) for d in
-                             devices[1:]])
+                        unplug.assert_called_once_with(
+                            conf, ip_wrap.return_value, devices)
 
                     expected.append(mock.call().garbage_collect_namespace())
                     ip_wrap.assert_has_calls(expected)
@@ -197,7 +258,7 @@ class TestNetnsCleanup(unittest.TestCase):
         conf.root_helper = 'sudo'
         with mock.patch('quantum.agent.linux.ip_lib.IPWrapper') as ip_wrap:
             ip_wrap.side_effect = Exception()
-            util.destroy_namespace(conf, ns)
+            self.assertFalse(util.destroy_namespace(conf, ns))
 
     def test_main(self):
         namespaces = ['ns1', 'ns2']
@@ -210,21 +271,22 @@ class TestNetnsCleanup(unittest.TestCase):
                 conf.force = False
                 methods_to_mock = dict(
                     eligible_for_deletion=mock.DEFAULT,
-                    destroy_namespace=mock.DEFAULT,
+                    destroy_namespaces=mock.DEFAULT,
+                    get_namespace_devices=mock.DEFAULT,
                     setup_conf=mock.DEFAULT)
 
                 with mock.patch.multiple(util, **methods_to_mock) as mocks:
                     mocks['eligible_for_deletion'].return_value = True
                     mocks['setup_conf'].return_value = conf
+                    devices = mocks['get_namespace_devices'].return_value
                     util.main()
 
                     mocks['eligible_for_deletion'].assert_has_calls(
-                        [mock.call(conf, 'ns1', False),
-                         mock.call(conf, 'ns2', False)])
+                        [mock.call(conf, 'ns1', False, devices),
+                         mock.call(conf, 'ns2', False, devices)])
 
-                    mocks['destroy_namespace'].assert_has_calls(
-                        [mock.call(conf, 'ns1', False),
-                         mock.call(conf, 'ns2', False)])
+                    mocks['destroy_namespaces'].assert_called_once_with(
+                        conf, ['ns1', 'ns2'], False)
 
                     ip_wrap.assert_has_calls(
                         [mock.call.get_namespaces('sudo')])
@@ -242,21 +304,23 @@ class TestNetnsCleanup(unittest.TestCase):
                 conf.force = False
                 methods_to_mock = dict(
                     eligible_for_deletion=mock.DEFAULT,
-                    destroy_namespace=mock.DEFAULT,
+                    destroy_namespaces=mock.DEFAULT,
+                    get_namespace_devices=mock.DEFAULT,
                     setup_conf=mock.DEFAULT)
 
                 with mock.patch.multiple(util, **methods_to_mock) as mocks:
                     mocks['eligible_for_deletion'].return_value = False
                     mocks['setup_conf'].return_value = conf
+                    devices = mocks['get_namespace_devices'].return_value
                     util.main()
 
                     ip_wrap.assert_has_calls(
                         [mock.call.get_namespaces('sudo')])
 
                     mocks['eligible_for_deletion'].assert_has_calls(
-                        [mock.call(conf, 'ns1', False),
-                         mock.call(conf, 'ns2', False)])
+                        [mock.call(conf, 'ns1', False, devices),
+                         mock.call(conf, 'ns2', False, devices)])
 
-                    self.assertFalse(mocks['destroy_namespace'].called)
+                    self.assertFalse(mocks['destroy_namespaces'].called)
 
                     self.assertFalse(eventlet_sleep.called)
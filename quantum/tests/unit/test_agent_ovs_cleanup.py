@@ -30,23 +30,70 @@ class TestOVSCleanup(unittest.TestCase):
             self.assertFalse(conf.ovs_all_ports)
 
     def test_main(self):
+        tap = {'type': '', 'ofport': 3,
+               'external_ids': {'iface-id': 'id', 'attached-mac': 'mac'}}
+        qr = {'type': 'internal', 'ofport': 4,
+              'external_ids': {'iface-id': 'id', 'attached-mac': 'mac'}}
+        bridge_ports = {'br-int': {'tap1': tap, 'qr-1': qr,
+                                   'patch-tun': {'type': 'patch', 'ofport': 1,
+                                                 'external_ids': {}}},
+                        'br-ex': {},
+                        'br-other': {'tap2': tap}}
         with mock.patch('quantum.common.config.setup_logging'):
-            br_patch = mock.patch('quantum.agent.linux.ovs_lib.get_bridges')
-            with br_patch as mock_get_bridges:
-                mock_get_bridges.return_value = ['br-int', 'br-ex']
+            br_patch = mock.patch(
+                'quantum.agent.linux.ovs_lib.get_bridge_ports')
+            with br_patch as mock_get_bridge_ports:
+                mock_get_bridge_ports.return_value = bridge_ports
                 with mock.patch(
                     'quantum.agent.linux.ovs_lib.OVSBridge') as ovs:
                     setup_conf = mock.patch(
                         'quantum.agent.ovs_cleanup_util.setup_conf')
                     with setup_conf as mock_setup_conf:
                         conf = mock.Mock()
-                        confroot_helper = 'sudo'
+                        conf.root_helper = 'sudo'
                         conf.ovs_all_ports = False
                         conf.ovs_integration_bridge = 'br-int'
                         conf.external_network_bridge = 'br-ex'
 
                         mock_setup_conf.return_value = conf
 
-                        util.main()
-                        ovs.assert_has_calls([mock.call().delete_ports(
-                            all_ports=False)])
+                        with mock.patch.object(util,
+                                               'delete_devices') as delete:
+                            util.main()
+                        mock_get_bridge_ports.assert_called_once_with('sudo')
+                        ovs.assert_has_calls(
+                            [mock.call('br-int', 'sudo'),
+                             mock.call().delete_port_list(['qr-1', 'tap1'])])
+                        self.assertEqual(ovs.call_count, 2)
+                        delete.assert_called_once_with(conf, ['tap1'])
+
+    def test_is_stale_device(self):
+        vif_ids = {'iface-id': 'id', 'attached-mac': 'mac'}
+        self.assertTrue(util.is_stale_device(
+            {'type': '', 'ofport': 3, 'external_ids': vif_ids}))
+        # Device gone already
+        self.assertFalse(util.is_stale_device(
+            {'type': '', 'ofport': None, 'external_ids': vif_ids}))
+        self.assertFalse(util.is_stale_device(
+            {'type': '', 'ofport': -1, 'external_ids': vif_ids}))
+        self.assertFalse(util.is_stale_device(
+            {'type': 'internal', 'ofport': 3, 'external_ids': vif_ids}))
+        # Not a VIF, e.g. a physical NIC
+        self.assertFalse(util.is_stale_device(
+            {'type': '', 'ofport': 3, 'external_ids': {}}))
+
+    def test_delete_devices(self):
+        conf = mock.Mock()
+        conf.root_helper = 'sudo'
+        with mock.patch('quantum.agent.linux.ip_lib.IPWrapper') as ip_wrap:
+            ip_wrap.return_value.delete_devices.return_value = ['tap2']
+            with mock.patch.object(util.LOG, 'warn') as warn:
+                util.delete_devices(conf, ['tap1', 'tap2'])
+            ip_wrap.assert_has_calls(
+                [mock.call('sudo'),
+                 mock.call().delete_devices(['tap1', 'tap2'])])
+            self.assertTrue(warn.called)
+
+            ip_wrap.reset_mock()
+            util.delete_devices(conf, [])
+            self.assertFalse(ip_wrap.called)
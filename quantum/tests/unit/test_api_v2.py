@@ -17,6 +17,7 @@
 
 import os
 
+import eventlet
 import mock
 import unittest2 as unittest
 import webob
@@ -784,6 +785,99 @@ class NotificationTest(APIv2TestBase):
                                    notification_level='DEBUG')
 
 
+class NotificationQueueTest(APIv2TestBase):
+    def setUp(self):
+        super(NotificationQueueTest, self).setUp()
+        self.driver = mock.Mock(spec=['notify', 'notify_many'])
+        cfg.CONF.set_override('notification_driver', [])
+        cfg.CONF.set_override('notification_queue_size', 2)
+        notifer_api._reset_drivers()
+        notifer_api._reset_queue()
+        notifer_api.add_driver(self.driver)
+        self.addCleanup(notifer_api._reset_drivers)
+        self.addCleanup(notifer_api._reset_queue)
+
+    def _notify(self, event_type):
+        notifer_api.notify(None, 'network.host', event_type,
+                           notifer_api.INFO, {})
+
+    def _sent(self):
+        return [msg['event_type']
+                for call in self.driver.notify_many.call_args_list
+                for context, msg in call[0][0]]
+
+    def test_create_notifications_queued(self):
+        instance = self.plugin.return_value
+        instance.create_network.return_value = {'id': _uuid()}
+        instance.get_networks_count.return_value = 0
+        self.api.post_json(_get_path('networks'),
+                           {'network': {'name': 'net1',
+                                        'tenant_id': _uuid()}})
+        # Nothing is sent while the request is served
+        self.assertEqual(self._sent(), [])
+        self.assertTrue(notifer_api.flush())
+        self.assertEqual(self._sent(), ['network.create.start',
+                                        'network.create.end'])
+        self.assertFalse(self.driver.notify.called)
+
+    def test_batch_size(self):
+        cfg.CONF.set_override('notification_queue_size', 10)
+        cfg.CONF.set_override('notification_batch_size', 3)
+        for i in range(5):
+            self._notify('event%d' % i)
+        notifer_api.flush()
+        self.assertEqual([len(call[0][0]) for call
+                          in self.driver.notify_many.call_args_list], [3, 2])
+
+    def test_driver_without_notify_many(self):
+        notifer_api._reset_drivers()
+        driver = mock.Mock(spec=['notify'])
+        notifer_api.add_driver(driver)
+        self._notify('event')
+        notifer_api.flush()
+        self.assertEqual(driver.notify.call_count, 1)
+
+    def _test_overflow(self, policy, expected):
+        cfg.CONF.set_override('notification_overflow_policy', policy)
+        for i in range(3):
+            self._notify('event%d' % i)
+        self.assertEqual(notifer_api._get_queue().dropped, 1)
+        notifer_api.flush()
+        self.assertEqual(self._sent(), expected)
+
+    def test_overflow_drop_new(self):
+        self._test_overflow('drop_new', ['event0', 'event1'])
+
+    def test_overflow_drop_oldest(self):
+        self._test_overflow('drop_oldest', ['event1', 'event2'])
+
+    def test_publishers(self):
+        cfg.CONF.set_override('notification_publishers', 2)
+        cfg.CONF.set_override('notification_batch_size', 1)
+        events = []
+        both_started = eventlet.event.Event()
+
+        def notify_many(batch):
+            events.append('start')
+            if events.count('start') == 2:
+                both_started.send()
+            # With a single publisher the other batch never starts
+            with eventlet.Timeout(1, False):
+                both_started.wait()
+            events.append('end')
+
+        self.driver.notify_many.side_effect = notify_many
+        self._notify('event0')
+        self._notify('event1')
+        notifer_api.flush()
+        self.assertEqual(events, ['start', 'start', 'end', 'end'])
+
+    def test_flush_timeout(self):
+        self.driver.notify_many.side_effect = lambda batch: eventlet.sleep(1)
+        self._notify('event')
+        self.assertFalse(notifer_api.flush(0.1))
+
+
 class QuotaTest(APIv2TestBase):
     def test_create_network_quota(self):
         cfg.CONF.set_override('quota_network', 1, group='QUOTAS')
@@ -1416,6 +1416,42 @@ fixed_ips=ip_address%%3D%s&fixed_ips=ip_address%%3D%s&fixed_ips=subnet_id%%3D%s
                     ip_allocation.expiration - timeutils.utcnow(),
                     datetime.timedelta(seconds=10))
 
+    def test_update_fixed_ip_lease_expirations(self):
+        cfg.CONF.set_override('dhcp_lease_duration', 10)
+        plugin = QuantumManager.get_plugin()
+        with self.subnet() as subnet:
+            with contextlib.nested(self.port(subnet=subnet),
+                                   self.port(subnet=subnet),
+                                   self.port(subnet=subnet)) as ports:
+                network_id = subnet['subnet']['network_id']
+                ips = [port['port']['fixed_ips'][0]['ip_address']
+                       for port in ports]
+                update_context = context.get_admin_context()
+                leases = [dict(network_id=network_id, ip_address=ips[0],
+                               lease_remaining=500),
+                          dict(network_id=network_id, ip_address=ips[1],
+                               lease_remaining=500),
+                          dict(network_id=network_id, ip_address=ips[2],
+                               lease_remaining=1000),
+                          dict(network_id=network_id,
+                               ip_address='255.255.255.0',
+                               lease_remaining=500)]
+                plugin.update_fixed_ip_lease_expirations(update_context,
+                                                         leases)
+
+                q = update_context.session.query(models_v2.IPAllocation)
+                expirations = dict(
+                    (ip_allocation.ip_address,
+                     ip_allocation.expiration - timeutils.utcnow())
+                    for ip_allocation in q.filter_by(network_id=network_id))
+                for ip_address in ips[:2]:
+                    self.assertGreater(expirations[ip_address],
+                                       datetime.timedelta(seconds=400))
+                    self.assertLess(expirations[ip_address],
+                                    datetime.timedelta(seconds=600))
+                self.assertGreater(expirations[ips[2]],
+                                   datetime.timedelta(seconds=900))
+
     def test_port_delete_holds_ip(self):
         plugin = QuantumManager.get_plugin()
         base_class = db_base_plugin_v2.QuantumDbPluginV2
@@ -13,11 +13,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import contextlib
 import unittest
 
 import mock
+from sqlalchemy import event
 
+from quantum import context
+from quantum.db import api as db_api
 from quantum.db import dhcp_rpc_base
+from quantum import manager
+from quantum.tests.unit import test_db_plugin
 
 
 class TestDhcpRpcCallackMixin(unittest.TestCase):
@@ -63,6 +69,20 @@ class TestDhcpRpcCallackMixin(unittest.TestCase):
         self.assertEqual(retval['subnets'], subnet_retval)
         self.assertEqual(retval['ports'], port_retval)
 
+    def test_get_networks_info_no_networks(self):
+        retval = self.callbacks.get_networks_info(mock.Mock(), network_ids=[],
+                                                  host='host')
+        self.assertEqual(retval, [])
+        self.assertEqual(self.plugin.mock_calls, [])
+
+    def test_update_lease_expirations(self):
+        leases = [dict(network_id='a', ip_address='10.0.0.2',
+                       lease_remaining=120)]
+        self.callbacks.update_lease_expirations(mock.Mock(), host='host',
+                                                leases=leases)
+        self.plugin.assert_has_calls(
+            [mock.call.update_fixed_ip_lease_expirations(mock.ANY, leases)])
+
     def _test_get_dhcp_port_helper(self, port_retval, other_expectations=[],
                                    update_port=None, create_port=None):
         subnets_retval = [dict(id='a', enable_dhcp=True),
@@ -147,3 +167,76 @@ class TestDhcpRpcCallackMixin(unittest.TestCase):
                                                        device_id=['devid'])),
             mock.call.update_port(mock.ANY, 'port_id',
                                   dict(port=port_update))])
+
+
+class TestDhcpRpcNetworksInfo(test_db_plugin.QuantumDbPluginV2TestCase):
+
+    def setUp(self):
+        super(TestDhcpRpcNetworksInfo, self).setUp()
+        self.callbacks = dhcp_rpc_base.DhcpRpcCallbackMixin()
+        self.context = context.get_admin_context()
+
+    def _get_network_info(self, network_id):
+        """The DHCP attributes of network_id, read through the plugin."""
+        plugin = manager.QuantumManager.get_plugin()
+        network = plugin.get_network(self.context, network_id,
+                                     ['id', 'tenant_id', 'admin_state_up'])
+        filters = dict(network_id=[network_id])
+        network['subnets'] = plugin.get_subnets(
+            self.context, filters=filters,
+            fields=['id', 'network_id', 'ip_version', 'cidr', 'gateway_ip',
+                    'enable_dhcp', 'dns_nameservers', 'host_routes'])
+        network['ports'] = plugin.get_ports(
+            self.context, filters=filters,
+            fields=['id', 'network_id', 'mac_address', 'fixed_ips'])
+        return network
+
+    def _count_queries(self, func, *args, **kwargs):
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        # The engine, and the listener with it, is dropped by clear_db()
+        event.listen(db_api._ENGINE, 'before_cursor_execute', count)
+        func(*args, **kwargs)
+        return len(statements)
+
+    def test_get_networks_info_matches_plugin_api(self):
+        routes = [{'destination': '10.1.0.0/24', 'nexthop': '10.0.0.2'}]
+        with contextlib.nested(
+            self.subnet(dns_nameservers=['8.8.8.8', '8.8.4.4'],
+                        host_routes=routes),
+            self.network()) as (subnet, empty):
+            network_id = subnet['subnet']['network_id']
+            with contextlib.nested(
+                self.port(subnet=subnet),
+                self.port(subnet=subnet, fixed_ips=[])):
+                networks = self.callbacks.get_networks_info(
+                    self.context, network_ids=[network_id,
+                                               empty['network']['id'],
+                                               'missing'],
+                    host='host')
+                expected = [self._get_network_info(network_id),
+                            self._get_network_info(empty['network']['id'])]
+
+        def normalized(networks):
+            for network in networks:
+                network['ports'].sort(key=lambda port: port['id'])
+                for subnet in network['subnets']:
+                    subnet['dns_nameservers'].sort()
+            return sorted(networks, key=lambda network: network['id'])
+
+        self.assertEqual(normalized(networks), normalized(expected))
+
+    def test_get_networks_info_query_count(self):
+        with self.subnet() as subnet:
+            network_id = subnet['subnet']['network_id']
+            queries = self._count_queries(
+                self.callbacks.get_networks_info, self.context,
+                network_ids=[network_id], host='host')
+            with contextlib.nested(self.port(subnet=subnet),
+                                   self.port(subnet=subnet)):
+                self.assertEqual(self._count_queries(
+                    self.callbacks.get_networks_info, self.context,
+                    network_ids=[network_id], host='host'), queries)
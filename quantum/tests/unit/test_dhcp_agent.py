@@ -20,6 +20,7 @@ import socket
 import sys
 import uuid
 
+import eventlet
 import mock
 import unittest2 as unittest
 
@@ -28,6 +29,7 @@ from quantum.agent.linux import interface
 from quantum.common import exceptions
 from quantum.openstack.common import cfg
 from quantum.openstack.common import jsonutils
+from quantum.openstack.common.rpc import common as rpc_common
 
 
 ROOTDIR = os.path.dirname(os.path.dirname(__file__))
@@ -158,34 +160,105 @@ class TestDhcpAgent(unittest.TestCase):
                                                     mock.ANY,
                                                     'qdhcp-1')
                 self.assertEqual(log.call_count, 1)
-                self.assertTrue(dhcp.needs_resync)
+                self.assertEqual(dhcp.needs_resync_networks, set(['1']))
+                self.assertFalse(dhcp.needs_full_resync)
 
-    def test_update_lease(self):
+    def test_update_leases(self):
+        leases = [dict(network_id='net_id', ip_address='192.168.1.1',
+                       lease_remaining=120)]
         with mock.patch('quantum.agent.dhcp_agent.DhcpPluginApi') as plug:
             dhcp = dhcp_agent.DhcpAgent(cfg.CONF)
-            dhcp.update_lease('net_id', '192.168.1.1', 120)
+            dhcp.update_leases(leases)
             plug.assert_has_calls(
-                [mock.call().update_lease_expiration(
-                    'net_id', '192.168.1.1', 120)])
-
-    def test_update_lease_failure(self):
+                [mock.call().update_lease_expirations(leases)])
+
+    def test_update_leases_not_batched(self):
+        leases = [dict(network_id='net_id', ip_address='192.168.1.1',
+                       lease_remaining=120),
+                  dict(network_id='net_id2', ip_address='192.168.2.1',
+                       lease_remaining=60)]
+        expected = [mock.call('net_id', '192.168.1.1', 120),
+                    mock.call('net_id2', '192.168.2.1', 60)]
+        cfg.CONF.set_override('dhcp_lease_relay_interval', 0)
+        try:
+            with mock.patch('quantum.agent.dhcp_agent.DhcpPluginApi') as plug:
+                dhcp = dhcp_agent.DhcpAgent(cfg.CONF)
+                dhcp.update_leases(leases)
+        finally:
+            cfg.CONF.clear_override('dhcp_lease_relay_interval')
+        self.assertFalse(plug.return_value.update_lease_expirations.called)
+        self.assertEqual(
+            plug.return_value.update_lease_expiration.call_args_list,
+            expected)
+
+    def test_update_leases_batches_unsupported(self):
+        leases = [dict(network_id='net_id', ip_address='192.168.1.1',
+                       lease_remaining=120)]
+        with mock.patch('quantum.agent.dhcp_agent.DhcpPluginApi') as plug:
+            plugin = plug.return_value
+            plugin.update_lease_expirations.side_effect = (
+                rpc_common.RemoteError('UnsupportedRpcVersion'))
+            dhcp = dhcp_agent.DhcpAgent(cfg.CONF)
+            dhcp.update_leases(leases)
+            dhcp.update_leases(leases)
+        plugin.update_lease_expirations.assert_called_once_with(leases)
+        self.assertEqual(plugin.update_lease_expiration.call_args_list,
+                         [mock.call('net_id', '192.168.1.1', 120)] * 2)
+        self.assertEqual(dhcp.needs_resync_networks, set())
+
+    def test_update_leases_batches_method_missing(self):
+        leases = [dict(network_id='net_id', ip_address='192.168.1.1',
+                       lease_remaining=120)]
+        with mock.patch('quantum.agent.dhcp_agent.DhcpPluginApi') as plug:
+            plugin = plug.return_value
+            plugin.update_lease_expirations.side_effect = AttributeError
+            dhcp = dhcp_agent.DhcpAgent(cfg.CONF)
+            dhcp.update_leases(leases)
+        self.assertFalse(dhcp.batch_lease_updates)
+        plugin.update_lease_expiration.assert_called_once_with(
+            'net_id', '192.168.1.1', 120)
+
+    def test_update_leases_batches_remote_failure(self):
+        leases = [dict(network_id='net_id', ip_address='192.168.1.1',
+                       lease_remaining=120)]
+        with mock.patch('quantum.agent.dhcp_agent.DhcpPluginApi') as plug:
+            plugin = plug.return_value
+            plugin.update_lease_expirations.side_effect = (
+                rpc_common.RemoteError('OperationalError'))
+            dhcp = dhcp_agent.DhcpAgent(cfg.CONF)
+            dhcp.update_leases(leases)
+        # Batching is kept for the next updates
+        self.assertTrue(dhcp.batch_lease_updates)
+        self.assertFalse(plugin.update_lease_expiration.called)
+        self.assertEqual(dhcp.needs_resync_networks, set(['net_id']))
+
+    def test_update_leases_failure(self):
+        leases = [dict(network_id='net_id', ip_address='192.168.1.1',
+                       lease_remaining=120),
+                  dict(network_id='net_id2', ip_address='192.168.2.1',
+                       lease_remaining=120)]
         with mock.patch('quantum.agent.dhcp_agent.DhcpPluginApi') as plug:
-            plug.return_value.update_lease_expiration.side_effect = Exception
+            plug.return_value.update_lease_expirations.side_effect = Exception
 
             with mock.patch.object(dhcp_agent.LOG, 'exception') as log:
                 dhcp = dhcp_agent.DhcpAgent(cfg.CONF)
-                dhcp.update_lease('net_id', '192.168.1.1', 120)
+                dhcp.update_leases(leases)
                 plug.assert_has_calls(
-                    [mock.call().update_lease_expiration(
-                        'net_id', '192.168.1.1', 120)])
+                    [mock.call().update_lease_expirations(leases)])
 
                 self.assertTrue(log.called)
-                self.assertTrue(dhcp.needs_resync)
+                self.assertEqual(dhcp.needs_resync_networks,
+                                 set(['net_id', 'net_id2']))
+
+    def _mock_active_networks(self, plugin, network_ids):
+        plugin.get_active_networks.return_value = network_ids
+        plugin.get_networks_info.side_effect = lambda ids: [
+            FakeModel(network_id) for network_id in ids]
 
     def _test_sync_state_helper(self, known_networks, active_networks):
         with mock.patch('quantum.agent.dhcp_agent.DhcpPluginApi') as plug:
             mock_plugin = mock.Mock()
-            mock_plugin.get_active_networks.return_value = active_networks
+            self._mock_active_networks(mock_plugin, active_networks)
             plug.return_value = mock_plugin
 
             dhcp = dhcp_agent.DhcpAgent(cfg.CONF)
@@ -198,15 +271,21 @@ class TestDhcpAgent(unittest.TestCase):
                 mocks['cache'].get_network_ids.return_value = known_networks
                 dhcp.sync_state()
 
-                exp_refresh = [
-                    mock.call(net_id) for net_id in active_networks]
-
-                diff = set(known_networks) - set(active_networks)
-                exp_disable = [mock.call(net_id) for net_id in diff]
+                refreshed = [
+                    c[0][0] for c in
+                    mocks['refresh_dhcp_helper'].call_args_list]
+                disabled = [
+                    c[0][0] for c in
+                    mocks['disable_dhcp_helper'].call_args_list]
 
                 mocks['cache'].assert_has_calls([mock.call.get_network_ids()])
-                mocks['refresh_dhcp_helper'].assert_has_called(exp_refresh)
-                mocks['disable_dhcp_helper'].assert_has_called(exp_disable)
+                self.assertEqual(sorted(refreshed), sorted(active_networks))
+                self.assertEqual(sorted(disabled),
+                                 sorted(set(known_networks) -
+                                        set(active_networks)))
+                if active_networks:
+                    mock_plugin.get_networks_info.assert_called_once_with(
+                        mock.ANY)
 
     def test_sync_state_initial(self):
         self._test_sync_state_helper([], ['a'])
@@ -228,7 +307,120 @@ class TestDhcpAgent(unittest.TestCase):
                 dhcp.sync_state()
 
                 self.assertTrue(log.called)
-                self.assertTrue(dhcp.needs_resync)
+                self.assertTrue(dhcp.needs_full_resync)
+
+    def test_sync_state_networks_info_error(self):
+        with mock.patch('quantum.agent.dhcp_agent.DhcpPluginApi') as plug:
+            plug.return_value.get_active_networks.return_value = ['a', 'b']
+            plug.return_value.get_networks_info.side_effect = Exception
+
+            with mock.patch.object(dhcp_agent.LOG, 'exception') as log:
+                dhcp = dhcp_agent.DhcpAgent(cfg.CONF)
+                dhcp.sync_state(set(['a']))
+
+                self.assertTrue(log.called)
+                self.assertFalse(dhcp.needs_full_resync)
+                self.assertEqual(dhcp.needs_resync_networks, set(['a']))
+                plug.return_value.get_networks_info.assert_called_once_with(
+                    ['a'])
+
+    def test_sync_state_networks_info_unsupported(self):
+        with mock.patch('quantum.agent.dhcp_agent.DhcpPluginApi') as plug:
+            plugin = plug.return_value
+            plugin.get_active_networks.return_value = ['a', 'b']
+            plugin.get_networks_info.side_effect = rpc_common.RemoteError(
+                'UnsupportedRpcVersion')
+            plugin.get_network_info.side_effect = FakeModel
+            dhcp = dhcp_agent.DhcpAgent(cfg.CONF)
+            with mock.patch.object(dhcp, 'refresh_dhcp_helper') as refresh:
+                dhcp.sync_state()
+            fetched = [c[0][0] for c in plugin.get_network_info.call_args_list]
+            self.assertEqual(sorted(fetched), ['a', 'b'])
+            self.assertEqual(sorted(c[0][0] for c in refresh.call_args_list),
+                             ['a', 'b'])
+            self.assertFalse(dhcp.needs_full_resync)
+
+    def test_sync_state_networks_info_remote_failure(self):
+        with mock.patch('quantum.agent.dhcp_agent.DhcpPluginApi') as plug:
+            plugin = plug.return_value
+            plugin.get_active_networks.return_value = ['a', 'b']
+            plugin.get_networks_info.side_effect = rpc_common.RemoteError(
+                'OperationalError')
+            dhcp = dhcp_agent.DhcpAgent(cfg.CONF)
+            dhcp.sync_state()
+            self.assertFalse(plugin.get_network_info.called)
+            self.assertTrue(dhcp.needs_full_resync)
+
+    def test_sync_state_disables_networks_missing_info(self):
+        with mock.patch('quantum.agent.dhcp_agent.DhcpPluginApi') as plug:
+            plug.return_value.get_active_networks.return_value = ['a', 'b']
+            plug.return_value.get_networks_info.return_value = [
+                FakeModel('a')]
+            dhcp = dhcp_agent.DhcpAgent(cfg.CONF)
+            attrs_to_mock = dict(
+                [(a, mock.DEFAULT) for a in
+                 ['refresh_dhcp_helper', 'disable_dhcp_helper', 'cache']])
+            with mock.patch.multiple(dhcp, **attrs_to_mock) as mocks:
+                mocks['cache'].get_network_ids.return_value = ['a', 'b']
+                dhcp.sync_state()
+                mocks['refresh_dhcp_helper'].assert_called_once_with(
+                    'a', skip_unchanged=True, network=mock.ANY)
+                mocks['disable_dhcp_helper'].assert_called_once_with('b')
+
+    def test_sync_state_skips_unchanged(self):
+        with mock.patch('quantum.agent.dhcp_agent.DhcpPluginApi') as plug:
+            self._mock_active_networks(plug.return_value, ['a'])
+            dhcp = dhcp_agent.DhcpAgent(cfg.CONF)
+            with mock.patch.object(dhcp, 'refresh_dhcp_helper') as refresh:
+                dhcp.sync_state()
+                refresh.assert_called_once_with('a', skip_unchanged=True,
+                                                network=mock.ANY)
+                refresh.reset_mock()
+                dhcp.sync_state(set(['a', 'b']))
+                refresh.assert_called_once_with('a', skip_unchanged=False,
+                                                network=mock.ANY)
+
+    def test_sync_state_network_failure_isolated(self):
+        with mock.patch('quantum.agent.dhcp_agent.DhcpPluginApi') as plug:
+            self._mock_active_networks(plug.return_value, ['a', 'b', 'c'])
+            dhcp = dhcp_agent.DhcpAgent(cfg.CONF)
+            refreshed = []
+
+            def refresh(network_id, skip_unchanged, network):
+                if network_id == 'b':
+                    raise Exception()
+                refreshed.append(network_id)
+
+            with mock.patch.object(dhcp, 'refresh_dhcp_helper',
+                                   side_effect=refresh):
+                with mock.patch.object(dhcp_agent.LOG, 'exception') as log:
+                    dhcp.sync_state()
+                    self.assertEqual(log.call_count, 1)
+            self.assertEqual(sorted(refreshed), ['a', 'c'])
+            self.assertEqual(dhcp.needs_resync_networks, set(['b']))
+            self.assertFalse(dhcp.needs_full_resync)
+
+    def test_sync_state_bounded_concurrency(self):
+        cfg.CONF.set_override('num_sync_threads', 2)
+        self.addCleanup(cfg.CONF.clear_override, 'num_sync_threads')
+        network_ids = ['net%d' % i for i in range(6)]
+        with mock.patch('quantum.agent.dhcp_agent.DhcpPluginApi') as plug:
+            self._mock_active_networks(plug.return_value, network_ids)
+            dhcp = dhcp_agent.DhcpAgent(cfg.CONF)
+            running = []
+            peak = []
+
+            def refresh(network_id, skip_unchanged, network):
+                running.append(network_id)
+                peak.append(len(running))
+                eventlet.sleep(0.01)
+                running.remove(network_id)
+
+            with mock.patch.object(dhcp, 'refresh_dhcp_helper',
+                                   side_effect=refresh):
+                dhcp.sync_state()
+            self.assertEqual(len(peak), 6)
+            self.assertEqual(max(peak), 2)
 
     def test_periodic_resync(self):
         dhcp = dhcp_agent.DhcpAgent(cfg.CONF)
@@ -239,14 +431,26 @@ class TestDhcpAgent(unittest.TestCase):
     def test_periodoc_resync_helper(self):
         with mock.patch.object(dhcp_agent.eventlet, 'sleep') as sleep:
             dhcp = dhcp_agent.DhcpAgent(cfg.CONF)
-            dhcp.needs_resync = True
+            dhcp.needs_full_resync = True
             with mock.patch.object(dhcp, 'sync_state') as sync_state:
                 sync_state.side_effect = RuntimeError
                 with self.assertRaises(RuntimeError):
                     dhcp._periodic_resync_helper()
                 sync_state.assert_called_once_with()
                 sleep.assert_called_once_with(dhcp.conf.resync_interval)
-                self.assertFalse(dhcp.needs_resync)
+                self.assertFalse(dhcp.needs_full_resync)
+
+    def test_periodoc_resync_helper_failed_networks(self):
+        with mock.patch.object(dhcp_agent.eventlet, 'sleep') as sleep:
+            dhcp = dhcp_agent.DhcpAgent(cfg.CONF)
+            dhcp.schedule_resync('a')
+            dhcp.schedule_resync('b')
+            with mock.patch.object(dhcp, 'sync_state') as sync_state:
+                sync_state.side_effect = RuntimeError
+                with self.assertRaises(RuntimeError):
+                    dhcp._periodic_resync_helper()
+                sync_state.assert_called_once_with(set(['a', 'b']))
+                self.assertEqual(dhcp.needs_resync_networks, set())
 
 
 class TestDhcpAgentEventHandler(unittest.TestCase):
@@ -265,6 +469,7 @@ class TestDhcpAgentEventHandler(unittest.TestCase):
         self.plugin = mock.Mock()
         plugin_cls.return_value = self.plugin
 
+        self.real_cache_cls = dhcp_agent.NetworkCache
         self.cache_p = mock.patch('quantum.agent.dhcp_agent.NetworkCache')
         cache_cls = self.cache_p.start()
         self.cache = mock.Mock()
@@ -275,7 +480,12 @@ class TestDhcpAgentEventHandler(unittest.TestCase):
 
         self.call_driver = self.call_driver_p.start()
 
+        self.spawn_after_p = mock.patch.object(dhcp_agent.eventlet,
+                                               'spawn_after')
+        self.spawn_after = self.spawn_after_p.start()
+
     def tearDown(self):
+        self.spawn_after_p.stop()
         self.call_driver_p.stop()
         self.cache_p.stop()
         self.plugin_p.stop()
@@ -289,6 +499,12 @@ class TestDhcpAgentEventHandler(unittest.TestCase):
         self.call_driver.assert_called_once_with('enable', fake_network)
         self.cache.assert_has_calls([mock.call.put(fake_network)])
 
+    def test_enable_dhcp_helper_network_given(self):
+        self.dhcp.enable_dhcp_helper(fake_network.id, fake_network)
+        self.assertFalse(self.plugin.get_network_info.called)
+        self.call_driver.assert_called_once_with('enable', fake_network)
+        self.cache.assert_has_calls([mock.call.put(fake_network)])
+
     def test_enable_dhcp_helper_down_network(self):
         self.plugin.get_network_info.return_value = fake_down_network
         self.dhcp.enable_dhcp_helper(fake_down_network.id)
@@ -305,7 +521,8 @@ class TestDhcpAgentEventHandler(unittest.TestCase):
                 [mock.call.get_network_info(fake_network.id)])
             self.assertFalse(self.call_driver.called)
             self.assertTrue(log.called)
-            self.assertTrue(self.dhcp.needs_resync)
+            self.assertEqual(self.dhcp.needs_resync_networks,
+                             set([fake_network.id]))
             self.assertFalse(self.cache.called)
 
     def test_enable_dhcp_helper_driver_failure(self):
@@ -399,7 +616,16 @@ class TestDhcpAgentEventHandler(unittest.TestCase):
             self.cache.assert_has_calls(
                 [mock.call.get_network_by_id('net-id')])
             self.assertTrue(log.called)
-            self.assertTrue(self.dhcp.needs_resync)
+            self.assertEqual(self.dhcp.needs_resync_networks,
+                             set(['net-id']))
+
+    def test_refresh_dhcp_helper_skip_unchanged(self):
+        self.cache.get_network_by_id.return_value = (
+            dhcp_agent.NetworkRecord(fake_network))
+        self.plugin.get_network_info.return_value = fake_network
+        self.dhcp.refresh_dhcp_helper(fake_network.id, skip_unchanged=True)
+        self.assertFalse(self.call_driver.called)
+        self.assertFalse(self.cache.put.called)
 
     def test_subnet_update_end(self):
         payload = dict(subnet=dict(network_id=fake_network.id))
@@ -451,29 +677,130 @@ class TestDhcpAgentEventHandler(unittest.TestCase):
         self.call_driver.assert_called_once_with('restart',
                                                  fake_network)
 
+    def _changed_network(self):
+        network = dhcp_agent.NetworkRecord(fake_network)
+        network.revision = 1
+        self.cache.get_network_by_id.return_value = network
+        return network
+
     def test_port_update_end(self):
         payload = dict(port=vars(fake_port2))
-        self.cache.get_network_by_id.return_value = fake_network
+        network = self._changed_network()
         self.dhcp.port_update_end(payload)
         self.cache.assert_has_calls(
             [mock.call.get_network_by_id(fake_port2.network_id),
              mock.call.put_port(mock.ANY)])
+        self.assertFalse(self.call_driver.called)
+        self.assertEqual(self.dhcp.dirty_networks, set([fake_network.id]))
+
+        self.dhcp._reload_dirty_networks()
         self.call_driver.assert_called_once_with('reload_allocations',
-                                                 fake_network)
+                                                 network)
+        self.assertEqual(network.served_revision, 1)
 
     def test_port_delete_end(self):
         payload = dict(port_id=fake_port2.id)
-        self.cache.get_network_by_id.return_value = fake_network
+        network = self._changed_network()
         self.cache.get_port_by_id.return_value = fake_port2
 
         self.dhcp.port_delete_end(payload)
+        self.dhcp._reload_dirty_networks()
 
         self.cache.assert_has_calls(
             [mock.call.get_port_by_id(fake_port2.id),
-             mock.call.get_network_by_id(fake_network.id),
-             mock.call.remove_port(fake_port2)])
+             mock.call.remove_port(fake_port2),
+             mock.call.get_network_by_id(fake_network.id)])
+        self.call_driver.assert_called_once_with('reload_allocations',
+                                                 network)
+
+    def test_reload_dirty_networks_already_served(self):
+        network = self._changed_network()
+        network.served_revision = network.revision
+        self.dhcp.dirty_networks.add(fake_network.id)
+        self.dhcp._reload_dirty_networks()
+        self.assertFalse(self.call_driver.called)
+
+    def test_port_updated_during_reload(self):
+        self.dhcp.cache = self.real_cache_cls()
+        network = self.dhcp.cache.put(fake_network)
+
+        def reload_allocations(action, network):
+            # A port event handled while the driver yields
+            self.dhcp.port_update_end(dict(port=vars(fake_port2)))
+            return True
+
+        self.call_driver.side_effect = reload_allocations
+        self.dhcp.port_update_end(dict(port=vars(fake_port1)))
+        self.dhcp._reload_dirty_networks()
+        self.assertEqual(network.served_revision, 1)
+        self.assertEqual(network.revision, 2)
+        self.assertEqual(self.dhcp.dirty_networks, set([fake_network.id]))
+
+        self.call_driver.side_effect = None
+        self.call_driver.reset_mock()
+        self.dhcp._reload_dirty_networks()
+        self.call_driver.assert_called_once_with('reload_allocations',
+                                                 network)
+        self.assertEqual(network.served_revision, 2)
+
+    def test_dirty_networks_reloaded_concurrently(self):
+        networks = {}
+        for network_id in ('a', 'b'):
+            networks[network_id] = dhcp_agent.NetworkRecord(
+                FakeModel(network_id, ports=[]))
+            networks[network_id].revision = 1
+        self.cache.get_network_by_id.side_effect = networks.get
+        order = []
+
+        def reload_allocations(action, network):
+            order.append(('start', network.id))
+            eventlet.sleep(0)
+            order.append(('end', network.id))
+            return True
+
+        self.call_driver.side_effect = reload_allocations
+        self.dhcp.dirty_networks.update(networks)
+        self.dhcp._reload_dirty_networks()
+        self.assertEqual([entry[0] for entry in order],
+                         ['start', 'start', 'end', 'end'])
+        self.assertEqual(networks['a'].served_revision, 1)
+        self.assertEqual(networks['b'].served_revision, 1)
+
+    def test_port_events_debounced(self):
+        network = self._changed_network()
+        self.cache.get_port_by_id.return_value = fake_port2
+        self.dhcp.port_create_end(dict(port=vars(fake_port1)))
+        self.dhcp.port_update_end(dict(port=vars(fake_port2)))
+        self.dhcp.port_delete_end(dict(port_id=fake_port2.id))
+
+        self.spawn_after.assert_called_once_with(
+            cfg.CONF.reload_allocations_delay,
+            self.dhcp._reload_dirty_networks)
+        self.assertFalse(self.call_driver.called)
+
+        self.dhcp._reload_dirty_networks()
+        self.call_driver.assert_called_once_with('reload_allocations',
+                                                 network)
+        self.assertEqual(self.dhcp.dirty_networks, set())
+
+        # The next event opens a new window
+        self.dhcp.port_update_end(dict(port=vars(fake_port2)))
+        self.assertEqual(self.spawn_after.call_count, 2)
+
+    def test_reload_dirty_networks_disabled_meanwhile(self):
+        self.dhcp.dirty_networks.add(fake_network.id)
+        self.cache.get_network_by_id.return_value = None
+        self.dhcp._reload_dirty_networks()
+        self.assertFalse(self.call_driver.called)
+
+    def test_port_update_end_no_delay(self):
+        cfg.CONF.set_override('reload_allocations_delay', 0)
+        self.addCleanup(cfg.CONF.clear_override, 'reload_allocations_delay')
+        self.cache.get_network_by_id.return_value = fake_network
+        self.dhcp.port_update_end(dict(port=vars(fake_port2)))
         self.call_driver.assert_called_once_with('reload_allocations',
                                                  fake_network)
+        self.assertFalse(self.spawn_after.called)
 
     def test_port_delete_end_unknown_port(self):
         payload = dict(port_id='unknown')
@@ -514,6 +841,15 @@ class TestDhcpPluginApiProxy(unittest.TestCase):
                                               network_id='netid',
                                               host='foo')
 
+    def test_get_networks_info(self):
+        self.call.return_value = [dict(id='a'), dict(id='b')]
+        retval = self.proxy.get_networks_info(['a', 'b'])
+        self.assertEqual([network.id for network in retval], ['a', 'b'])
+        self.assertEqual(self.call.call_args[1]['version'], '1.1')
+        self.make_msg.assert_called_once_with('get_networks_info',
+                                              network_ids=['a', 'b'],
+                                              host='foo')
+
     def test_get_dhcp_port(self):
         self.call.return_value = dict(a=1)
         retval = self.proxy.get_dhcp_port('netid', 'devid')
@@ -541,6 +877,15 @@ class TestDhcpPluginApiProxy(unittest.TestCase):
                                               device_id='devid',
                                               host='foo')
 
+    def test_update_lease_expirations(self):
+        leases = [dict(network_id='netid', ip_address='ipaddr',
+                       lease_remaining=1)]
+        self.proxy.update_lease_expirations(leases)
+        self.assertEqual(self.call.call_args[1]['version'], '1.1')
+        self.make_msg.assert_called_once_with('update_lease_expirations',
+                                              leases=leases,
+                                              host='foo')
+
     def test_update_lease_expiration(self):
         with mock.patch.object(self.proxy, 'cast') as mock_cast:
             self.proxy.update_lease_expiration('netid', 'ipaddr', 1)
@@ -555,9 +900,9 @@ class TestDhcpPluginApiProxy(unittest.TestCase):
 class TestNetworkCache(unittest.TestCase):
     def test_put_network(self):
         nc = dhcp_agent.NetworkCache()
-        nc.put(fake_network)
-        self.assertEqual(nc.cache,
-                         {fake_network.id: fake_network})
+        record = nc.put(fake_network)
+        self.assertEqual(nc.cache, {fake_network.id: record})
+        self.assertEqual(record, dhcp_agent.NetworkRecord(fake_network))
         self.assertEqual(nc.subnet_lookup,
                          {fake_subnet1.id: fake_network.id,
                           fake_subnet2.id: fake_network.id})
@@ -565,28 +910,19 @@ class TestNetworkCache(unittest.TestCase):
                          {fake_port1.id: fake_network.id})
 
     def test_put_network_existing(self):
-        prev_network_info = mock.Mock()
         nc = dhcp_agent.NetworkCache()
+        prev_record = nc.put(fake_network)
         with mock.patch.object(nc, 'remove') as remove:
-            nc.cache[fake_network.id] = prev_network_info
-
-            nc.put(fake_network)
-            remove.assert_called_once_with(prev_network_info)
-        self.assertEqual(nc.cache,
-                         {fake_network.id: fake_network})
-        self.assertEqual(nc.subnet_lookup,
-                         {fake_subnet1.id: fake_network.id,
-                          fake_subnet2.id: fake_network.id})
-        self.assertEqual(nc.port_lookup,
-                         {fake_port1.id: fake_network.id})
+            record = nc.put(fake_network)
+            remove.assert_called_once_with(prev_record)
+        self.assertEqual(nc.cache, {fake_network.id: record})
+        self.assertEqual(record.revision, 1)
+        self.assertEqual(record.served_revision, 1)
 
     def test_remove_network(self):
         nc = dhcp_agent.NetworkCache()
-        nc.cache = {fake_network.id: fake_network}
-        nc.subnet_lookup = {fake_subnet1.id: fake_network.id,
-                            fake_subnet2.id: fake_network.id}
-        nc.port_lookup = {fake_port1.id: fake_network.id}
-        nc.remove(fake_network)
+        record = nc.put(fake_network)
+        nc.remove(record)
 
         self.assertEqual(len(nc.cache), 0)
         self.assertEqual(len(nc.subnet_lookup), 0)
@@ -594,9 +930,9 @@ class TestNetworkCache(unittest.TestCase):
 
     def test_get_network_by_id(self):
         nc = dhcp_agent.NetworkCache()
-        nc.put(fake_network)
+        record = nc.put(fake_network)
 
-        self.assertEqual(nc.get_network_by_id(fake_network.id), fake_network)
+        self.assertIs(nc.get_network_by_id(fake_network.id), record)
 
     def test_get_network_ids(self):
         nc = dhcp_agent.NetworkCache()
@@ -606,28 +942,25 @@ class TestNetworkCache(unittest.TestCase):
 
     def test_get_network_by_subnet_id(self):
         nc = dhcp_agent.NetworkCache()
-        nc.put(fake_network)
+        record = nc.put(fake_network)
 
-        self.assertEqual(nc.get_network_by_subnet_id(fake_subnet1.id),
-                         fake_network)
+        self.assertIs(nc.get_network_by_subnet_id(fake_subnet1.id), record)
 
     def test_get_network_by_port_id(self):
         nc = dhcp_agent.NetworkCache()
-        nc.put(fake_network)
+        record = nc.put(fake_network)
 
-        self.assertEqual(nc.get_network_by_port_id(fake_port1.id),
-                         fake_network)
+        self.assertIs(nc.get_network_by_port_id(fake_port1.id), record)
 
     def test_put_port(self):
-        fake_network = FakeModel('12345678-1234-5678-1234567890ab',
-                                 tenant_id='aaaaaaaa-aaaa-aaaa-aaaaaaaaaaaa',
-                                 subnets=[fake_subnet1],
-                                 ports=[fake_port1])
         nc = dhcp_agent.NetworkCache()
-        nc.put(fake_network)
+        record = nc.put(fake_network)
         nc.put_port(fake_port2)
         self.assertEqual(len(nc.port_lookup), 2)
-        self.assertIn(fake_port2, fake_network.ports)
+        self.assertEqual(record.port_map[fake_port2.id],
+                         dhcp_agent.PortRecord(fake_port2))
+        self.assertEqual(record.revision, 1)
+        self.assertEqual(record.served_revision, 0)
 
     def test_put_port_existing(self):
         fake_network = FakeModel('12345678-1234-5678-1234567890ab',
@@ -635,11 +968,20 @@ class TestNetworkCache(unittest.TestCase):
                                  subnets=[fake_subnet1],
                                  ports=[fake_port1, fake_port2])
         nc = dhcp_agent.NetworkCache()
-        nc.put(fake_network)
-        nc.put_port(fake_port2)
+        record = nc.put(fake_network)
+        record.host_entries = {fake_port1.id: 'entry1',
+                               fake_port2.id: 'entry2'}
+        updated_port = FakeModel(fake_port2.id,
+                                 mac_address='aa:bb:cc:dd:ee:11',
+                                 network_id=fake_port2.network_id)
+        nc.put_port(updated_port)
 
         self.assertEqual(len(nc.port_lookup), 2)
-        self.assertIn(fake_port2, fake_network.ports)
+        self.assertEqual(len(record.ports), 2)
+        self.assertEqual(nc.get_port_by_id(fake_port2.id).mac_address,
+                         'aa:bb:cc:dd:ee:11')
+        # Only the entry of the updated port is formatted again
+        self.assertEqual(record.host_entries, {fake_port1.id: 'entry1'})
 
     def test_remove_port_existing(self):
         fake_network = FakeModel('12345678-1234-5678-1234567890ab',
@@ -648,16 +990,56 @@ class TestNetworkCache(unittest.TestCase):
                                  ports=[fake_port1, fake_port2])
 
         nc = dhcp_agent.NetworkCache()
-        nc.put(fake_network)
-        nc.remove_port(fake_port2)
+        record = nc.put(fake_network)
+        record.host_entries = {fake_port1.id: 'entry1',
+                               fake_port2.id: 'entry2'}
+        nc.remove_port(nc.get_port_by_id(fake_port2.id))
 
         self.assertEqual(len(nc.port_lookup), 1)
-        self.assertNotIn(fake_port2, fake_network.ports)
+        self.assertEqual([port.id for port in record.ports], [fake_port1.id])
+        self.assertEqual(record.revision, 1)
+        self.assertEqual(record.host_entries, {fake_port1.id: 'entry1'})
+
+    def test_remove_port_unknown(self):
+        nc = dhcp_agent.NetworkCache()
+        record = nc.put(fake_network)
+        nc.remove_port(fake_port2)
+        self.assertEqual(len(record.ports), 1)
+        self.assertEqual(record.revision, 0)
 
     def test_get_port_by_id(self):
         nc = dhcp_agent.NetworkCache()
         nc.put(fake_network)
-        self.assertEqual(nc.get_port_by_id(fake_port1.id), fake_port1)
+        self.assertEqual(nc.get_port_by_id(fake_port1.id),
+                         dhcp_agent.PortRecord(fake_port1))
+
+
+class TestNetworkRecord(unittest.TestCase):
+    def test_only_driver_fields_kept(self):
+        port = dhcp_agent.DictModel(dict(
+            id='p1', network_id='n1', mac_address='aa:bb:cc:dd:ee:ff',
+            name='vm', status='ACTIVE', device_owner='compute:nova',
+            fixed_ips=[dict(subnet_id='s1', ip_address='10.0.0.2')]))
+        record = dhcp_agent.PortRecord(port)
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertFalse(hasattr(record, 'name'))
+        self.assertEqual(record.fixed_ips[0].ip_address, '10.0.0.2')
+
+    def test_equality_ignores_revision(self):
+        first = dhcp_agent.NetworkRecord(fake_network)
+        second = dhcp_agent.NetworkRecord(fake_network)
+        second.revision = 3
+        self.assertEqual(first, second)
+        second.port_map.clear()
+        self.assertNotEqual(first, second)
+
+    def test_ports_sorted_by_id(self):
+        network = FakeModel(fake_network.id, tenant_id=fake_network.tenant_id,
+                            admin_state_up=True, subnets=[],
+                            ports=[fake_port1, fake_port2])
+        record = dhcp_agent.NetworkRecord(network)
+        self.assertEqual([port.id for port in record.ports],
+                         sorted([fake_port1.id, fake_port2.id]))
 
 
 class TestDeviceManager(unittest.TestCase):
@@ -831,8 +1213,12 @@ class TestDhcpLeaseRelay(unittest.TestCase):
         cfg.CONF.register_opts(dhcp_agent.DhcpLeaseRelay.OPTS)
         self.unlink_p = mock.patch('os.unlink')
         self.unlink = self.unlink_p.start()
+        self.spawn_after_p = mock.patch.object(dhcp_agent.eventlet,
+                                               'spawn_after')
+        self.spawn_after = self.spawn_after_p.start()
 
     def tearDown(self):
+        self.spawn_after_p.stop()
         self.unlink_p.stop()
 
     def test_init_relay_socket_path_no_prev_socket(self):
@@ -884,7 +1270,52 @@ class TestDhcpLeaseRelay(unittest.TestCase):
 
         relay._handler(mock_sock, mock.Mock())
         mock_sock.assert_has_calls([mock.call.recv(1024), mock.call.close()])
-        handler.called_once_with(network_id, ip_address, lease_remaining)
+        self.assertFalse(handler.called)
+
+        relay.flush()
+        handler.assert_called_once_with(
+            [dict(network_id=network_id, ip_address=ip_address,
+                  lease_remaining=lease_remaining)])
+
+    def test_queue_lease_batched(self):
+        handler = mock.Mock()
+        relay = dhcp_agent.DhcpLeaseRelay(handler)
+        relay.queue_lease('net1', '10.0.0.2', 120)
+        relay.queue_lease('net1', '10.0.0.3', 120)
+        relay.queue_lease('net2', '10.0.0.2', 120)
+        # Only the latest update of a lease is sent
+        relay.queue_lease('net1', '10.0.0.2', 0)
+
+        self.spawn_after.assert_called_once_with(
+            cfg.CONF.dhcp_lease_relay_interval, relay.flush)
+        self.assertFalse(handler.called)
+
+        relay.flush()
+        leases = handler.call_args[0][0]
+        self.assertEqual(
+            sorted(leases),
+            sorted([dict(network_id='net1', ip_address='10.0.0.2',
+                         lease_remaining=0),
+                    dict(network_id='net1', ip_address='10.0.0.3',
+                         lease_remaining=120),
+                    dict(network_id='net2', ip_address='10.0.0.2',
+                         lease_remaining=120)]))
+
+        relay.flush()
+        self.assertEqual(handler.call_count, 1)
+        relay.queue_lease('net1', '10.0.0.2', 120)
+        self.assertEqual(self.spawn_after.call_count, 2)
+
+    def test_queue_lease_no_interval(self):
+        cfg.CONF.set_override('dhcp_lease_relay_interval', 0)
+        self.addCleanup(cfg.CONF.clear_override, 'dhcp_lease_relay_interval')
+        handler = mock.Mock()
+        relay = dhcp_agent.DhcpLeaseRelay(handler)
+        relay.queue_lease('net1', '10.0.0.2', 120)
+        handler.assert_called_once_with(
+            [dict(network_id='net1', ip_address='10.0.0.2',
+                  lease_remaining=120)])
+        self.assertFalse(self.spawn_after.called)
 
     def test_handler_invalid_data(self):
         network_id = 'cccccccc-cccc-cccc-cccc-cccccccccccc'
@@ -21,9 +21,11 @@ import inspect
 import os
 import unittest
 
+import mock
 import mox
 
 from quantum.agent.linux import iptables_manager
+from quantum.agent.linux import utils
 
 
 class IptablesManagerStateFulTestCase(unittest.TestCase):
@@ -292,3 +294,33 @@ class IptablesManagerStateLessTestCase(unittest.TestCase):
 
     def test_nat_not_found(self):
         self.assertFalse('nat' in self.iptables.ipv4)
+
+
+class IptablesManagerExecutorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.run_p = mock.patch.object(
+            utils, 'run', return_value=utils.CommandResult([], 0, '', ''))
+        self.run = self.run_p.start()
+
+    def tearDown(self):
+        self.run_p.stop()
+
+    def test_apply_in_namespace(self):
+        iptables = iptables_manager.IptablesManager(root_helper='sudo',
+                                                    namespace='qrouter-1')
+        with mock.patch.object(iptables_manager.lockutils,
+                               'synchronized') as synchronized:
+            synchronized.return_value = lambda f: f
+            iptables.apply()
+        synchronized.assert_called_once_with('iptables-qrouter-1',
+                                             'quantum-', external=True)
+
+        ns = ['ip', 'netns', 'exec', 'qrouter-1']
+        tables = ['filter', 'nat']
+        saves = [ns + ['iptables-save', '-t', table] for table in tables]
+        self.assertEqual([c[0][0] for c in self.run.call_args_list],
+                         [cmd for save in saves
+                          for cmd in (save, ns + ['iptables-restore'])])
+        for call in self.run.call_args_list:
+            self.assertEqual(call[0][1], 'sudo')
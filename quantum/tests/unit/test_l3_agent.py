@@ -22,6 +22,7 @@ import mock
 
 from quantum.agent import l3_agent
 from quantum.agent.linux import interface
+from quantum.agent.linux import utils
 from quantum.common import config as base_config
 from quantum.common import constants as l3_constants
 from quantum.openstack.common import cfg
@@ -51,6 +52,11 @@ class TestBasicRouterOperations(unittest2.TestCase):
             'quantum.agent.linux.utils.execute')
         self.utils_exec = self.utils_exec_p.start()
 
+        self.utils_run_p = mock.patch(
+            'quantum.agent.linux.utils.run',
+            return_value=utils.CommandResult([], 0, '', ''))
+        self.utils_run = self.utils_run_p.start()
+
         self.external_process_p = mock.patch(
             'quantum.agent.linux.external_process.ProcessManager')
         self.external_process = self.external_process_p.start()
@@ -79,6 +85,7 @@ class TestBasicRouterOperations(unittest2.TestCase):
         self.ip_cls_p.stop()
         self.dvr_cls_p.stop()
         self.utils_exec_p.stop()
+        self.utils_run_p.stop()
         self.external_process_p.stop()
 
     def testRouterInfoCreate(self):
@@ -282,6 +289,55 @@ class TestBasicRouterOperations(unittest2.TestCase):
         self.device_exists.assert_has_calls(
             [mock.call(self.conf.external_network_bridge)])
 
+    def testRoutersChanged(self):
+        self.conf.set_override('router_update_delay', 0)
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        routers = [{'id': _uuid()}]
+        self.plugin_api.get_routers.return_value = routers
+        with mock.patch.object(agent, '_process_routers') as process:
+            agent.routers_changed(None, [routers[0]['id']], 'update_router')
+        self.plugin_api.get_routers.assert_called_once_with(
+            mock.ANY, router_ids=[routers[0]['id']])
+        process.assert_called_once_with(routers)
+        self.assertEqual(agent.changed_routers, set())
+
+    def testRoutersChangedBatched(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        router_ids = [_uuid(), _uuid()]
+        with mock.patch('eventlet.spawn_after') as spawn_after:
+            agent.routers_changed(None, router_ids[:1], 'update_router')
+            agent.routers_changed(None, router_ids, 'create_floatingip')
+        spawn_after.assert_called_once_with(
+            self.conf.router_update_delay, agent._process_changed_routers)
+        self.assertEqual(agent.changed_routers, set(router_ids))
+
+        self.plugin_api.get_routers.return_value = []
+        agent._process_changed_routers()
+        fetched = self.plugin_api.get_routers.call_args[1]['router_ids']
+        self.assertEqual(set(fetched), set(router_ids))
+        self.assertEqual(agent.changed_routers, set())
+        self.assertIsNone(agent._changed_routers_timer)
+
+    def testRoutersChangedFetchFailure(self):
+        self.conf.set_override('router_update_delay', 0)
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        agent.fullsync = False
+        self.plugin_api.get_routers.side_effect = Exception()
+        agent.routers_changed(None, [_uuid()], 'update_router')
+        self.assertTrue(agent.fullsync)
+
+    def testRoutersChangedWithoutNamespaces(self):
+        self.conf.set_override('use_namespaces', False)
+        self.conf.set_override('router_id', 'r1')
+        self.conf.set_override('router_update_delay', 0)
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        agent.routers_changed(None, ['r2'], 'update_router')
+        self.assertFalse(self.plugin_api.get_routers.called)
+        self.plugin_api.get_routers.return_value = []
+        agent.routers_changed(None, ['r1', 'r2'], 'update_router')
+        self.plugin_api.get_routers.assert_called_once_with(
+            mock.ANY, router_ids=['r1'])
+
     def testDestroyNamespace(self):
 
         class FakeDev(object):
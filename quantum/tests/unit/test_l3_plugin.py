@@ -37,6 +37,8 @@ from quantum import context
 from quantum.db import db_base_plugin_v2
 from quantum.db import l3_db
 from quantum.db import l3_rpc_agent_api
+from quantum.db import l3_rpc_base
+from quantum.db import l3_sync_reference
 from quantum.db import models_v2
 from quantum.extensions import l3
 from quantum import manager
@@ -1384,6 +1386,38 @@ class L3NatDBTestCase(test_db_plugin.QuantumDbPluginV2TestCase):
     def test_floatingips_op_agent(self):
         self._test_notify_op_agent(self._test_floatingips_op_agent)
 
+    def _test_floatingips_op_agent_router_ids(self, notifyApi):
+        with self.floatingip_with_assoc() as fip:
+            router_id = fip['floatingip']['router_id']
+        self.assertEqual(6, notifyApi.routers_changed.call_count)
+        self.assertFalse(notifyApi.routers_updated.called)
+        operations = [call[0][2] for call
+                      in notifyApi.routers_changed.call_args_list]
+        self.assertIn('create_floatingip', operations)
+        self.assertIn('delete_floatingip', operations)
+        for call in notifyApi.routers_changed.call_args_list:
+            self.assertEqual(call[0][1], [router_id])
+
+    def test_floatingips_op_agent_router_ids(self):
+        cfg.CONF.set_override('l3_notify_router_ids', True)
+        self._test_notify_op_agent(self._test_floatingips_op_agent_router_ids)
+
+    def test_l3_agent_routers_query_router_ids(self):
+        with contextlib.nested(self.router(),
+                               self.router()) as (r1, r2):
+            callbacks = l3_rpc_base.L3RpcCallbackMixin()
+            ctx = context.get_admin_context()
+            routers = callbacks.sync_routers(
+                ctx, router_ids=[r1['router']['id']])
+            self.assertEqual([r1['router']['id']],
+                             [router['id'] for router in routers])
+            # Agents predating router_ids
+            routers = callbacks.sync_routers(
+                ctx, router_id=r2['router']['id'])
+            self.assertEqual([r2['router']['id']],
+                             [router['id'] for router in routers])
+            self.assertEqual(2, len(callbacks.sync_routers(ctx)))
+
     def test_l3_agent_routers_query_interfaces(self):
         with self.router() as r:
             with self.port(no_delete=True) as p:
@@ -1466,3 +1500,15 @@ class L3NatDBTestCase(test_db_plugin.QuantumDbPluginV2TestCase):
                              fip['floatingip']['port_id'])
             self.assertTrue(floatingips[0]['fixed_ip_address'] is not None)
             self.assertTrue(floatingips[0]['router_id'] is not None)
+
+    def test_l3_agent_routers_query_matches_plugin_api(self):
+        with contextlib.nested(self.floatingip_with_assoc(),
+                               self.router()):
+            plugin = TestL3NatPlugin()
+            ctx = context.get_admin_context()
+            for router_ids in (None, [self._list('routers')
+                                      ['routers'][0]['id']]):
+                routers = plugin.get_sync_data(ctx, router_ids)
+                expected = l3_sync_reference.get_sync_data_from_plugin(
+                    plugin, ctx, router_ids)
+                self.assertEqual(sorted(routers), sorted(expected))
@@ -0,0 +1,138 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2013 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import socket
+import tempfile
+
+import eventlet
+import mock
+import unittest2 as unittest
+
+from quantum.agent.linux import command_stats
+from quantum.agent.linux import utils
+from quantum.openstack.common import cfg
+from quantum.openstack.common import jsonutils
+
+
+class TestCommandVerb(unittest.TestCase):
+    def test_command_verb(self):
+        cases = [
+            (['ip', 'netns', 'exec', 'ns', 'ip', '-o', 'addr', 'show'],
+             'ip netns exec: ip addr'),
+            (['ip', 'netns', 'exec', 'ns', 'iptables-restore'],
+             'ip netns exec: iptables-restore'),
+            (['ip', '-all', 'netns', 'exec', 'ip', 'link'],
+             'ip netns exec: ip link'),
+            (['ip', 'netns', 'exec', 'ns'], 'ip netns exec'),
+            (['ip', '-o', 'link', 'show', 'tap0'], 'ip link'),
+            (['ip', '-batch', '-'], 'ip -batch'),
+            (['ovs-vsctl', '--timeout=2', 'list-ports', 'br-int'],
+             'ovs-vsctl'),
+            (['/sbin/iptables-restore'], 'iptables-restore'),
+            (['kill', '-HUP', '123'], 'kill -HUP'),
+            (['kill', '123'], 'kill'),
+            (['QUANTUM_NETWORK_ID=1', 'dnsmasq', '--no-hosts'], 'dnsmasq'),
+            ([], ''),
+        ]
+        for cmd, verb in cases:
+            self.assertEqual(command_stats.command_verb(cmd), verb)
+
+
+class TestCommandStats(unittest.TestCase):
+    def setUp(self):
+        super(TestCommandStats, self).setUp()
+        self.stats = command_stats.CommandStats()
+
+    def _record(self, cmd, returncode=0, stdout='', duration=0.02):
+        result = utils.CommandResult(cmd, returncode, stdout, '')
+        self.stats.record(cmd, result, duration)
+
+    def test_record(self):
+        self._record(['ip', 'link', 'show'], stdout='abc')
+        self._record(['ip', 'link', 'set'], returncode=1, duration=2)
+        self.stats.record(['ovs-vsctl', 'show'], None, 20)
+        verbs = self.stats.to_dict()['verbs']
+
+        link = verbs['ip link']
+        self.assertEqual(link['count'], 2)
+        self.assertEqual(link['failures'], 1)
+        self.assertEqual(link['output_bytes'], 3)
+        self.assertAlmostEqual(link['total_time'], 2.02)
+        self.assertEqual(link['max_time'], 2)
+        self.assertEqual(link['histogram'], [0, 1, 0, 0, 0, 1, 0, 0, 0])
+        # Timed out
+        self.assertEqual(verbs['ovs-vsctl']['failures'], 1)
+        self.assertEqual(verbs['ovs-vsctl']['histogram'][-2], 1)
+
+    def test_log_summary(self):
+        self._record(['ip', 'link'], duration=0.1)
+        self._record(['ovs-vsctl', 'show'], duration=1)
+        with mock.patch.object(command_stats, 'LOG') as log:
+            self.stats.log_summary()
+        summary = log.info.call_args[0][1]
+        self.assertTrue(summary.index('ovs-vsctl') < summary.index('ip link'))
+
+    def test_log_summary_nothing_recorded(self):
+        with mock.patch.object(command_stats, 'LOG') as log:
+            self.stats.log_summary()
+        self.assertFalse(log.info.called)
+
+    def test_serve(self):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        socket_path = os.path.join(tempdir, 'stats.sock')
+        self._record(['ip', 'link'])
+        server = self.stats.serve(socket_path)
+        self.addCleanup(server.kill)
+
+        client = eventlet.connect(socket_path, family=socket.AF_UNIX)
+        data = ''
+        while True:
+            chunk = client.recv(4096)
+            if not chunk:
+                break
+            data += chunk
+        self.assertEqual(jsonutils.loads(data)['verbs']['ip link']['count'],
+                         1)
+
+
+class TestSetup(unittest.TestCase):
+    def tearDown(self):
+        cfg.CONF.reset()
+        super(TestSetup, self).tearDown()
+
+    def test_disabled(self):
+        with mock.patch.object(utils, 'register_execute_hook') as register:
+            self.assertIsNone(command_stats.setup(cfg.CONF))
+        self.assertFalse(register.called)
+
+    def test_execute_recorded(self):
+        cfg.CONF.set_override('command_stats_interval', 60)
+        with mock.patch('quantum.openstack.common.loopingcall.'
+                        'LoopingCall') as looping_call:
+            stats = command_stats.setup(cfg.CONF)
+        self.addCleanup(utils.unregister_execute_hook, stats.record)
+        looping_call.assert_called_once_with(stats.log_summary)
+        looping_call.return_value.start.assert_called_once_with(interval=60)
+
+        utils.execute(['echo', 'foo'])
+        self.assertRaises(RuntimeError, utils.execute, ['false'])
+        self.assertEqual(stats.verbs['echo'].count, 1)
+        self.assertEqual(stats.verbs['echo'].output_bytes, 4)
+        self.assertEqual(stats.verbs['false'].failures, 1)
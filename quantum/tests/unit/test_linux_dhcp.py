@@ -23,6 +23,7 @@ import mock
 
 from quantum.agent.common import config
 from quantum.agent.linux import dhcp
+from quantum.agent.linux import utils
 from quantum.openstack.common import cfg
 from quantum.openstack.common import jsonutils
 
@@ -210,10 +211,14 @@ class TestBase(unittest.TestCase):
 
         self.replace_p = mock.patch('quantum.agent.linux.dhcp.replace_file')
         self.execute_p = mock.patch('quantum.agent.linux.utils.execute')
+        self.run_p = mock.patch('quantum.agent.linux.utils.run')
         self.safe = self.replace_p.start()
         self.execute = self.execute_p.start()
+        self.run = self.run_p.start()
+        self.run.return_value = utils.CommandResult([], 0, '', '')
 
     def tearDown(self):
+        self.run_p.stop()
         self.execute_p.stop()
         self.replace_p.stop()
 
@@ -519,10 +524,10 @@ tag:tag0,option:router,192.168.0.1""".lstrip()
     def test_reload_allocations(self):
         exp_host_name = '/dhcp/cccccccc-cccc-cccc-cccc-cccccccccccc/host'
         exp_host_data = """
-00:00:80:aa:bb:cc,192-168-0-2.openstacklocal,192.168.0.2
-00:00:f3:aa:bb:cc,fdca-3ba5-a17a-4ba3--2.openstacklocal,fdca:3ba5:a17a:4ba3::2
 00:00:0f:aa:bb:cc,192-168-0-3.openstacklocal,192.168.0.3
 00:00:0f:aa:bb:cc,fdca-3ba5-a17a-4ba3--3.openstacklocal,fdca:3ba5:a17a:4ba3::3
+00:00:80:aa:bb:cc,192-168-0-2.openstacklocal,192.168.0.2
+00:00:f3:aa:bb:cc,fdca-3ba5-a17a-4ba3--2.openstacklocal,fdca:3ba5:a17a:4ba3::2
 """.lstrip()
         exp_opt_name = '/dhcp/cccccccc-cccc-cccc-cccc-cccccccccccc/opts'
         exp_opt_data = "tag:tag0,option:router,192.168.0.1"
@@ -549,8 +554,89 @@ tag:tag1,option:classless-static-route,%s,%s""".lstrip() % (fake_v6,
 
         self.safe.assert_has_calls([mock.call(exp_host_name, exp_host_data),
                                     mock.call(exp_opt_name, exp_opt_data)])
-        self.execute.assert_called_once_with(exp_args, root_helper='sudo',
-                                             check_exit_code=True)
+        self.run.assert_called_once_with(exp_args, 'sudo', None, None, None)
+
+    def _reload_allocations(self, network):
+        with mock.patch('os.path.exists') as exists:
+            exists.return_value = True
+            with mock.patch.object(dhcp.Dnsmasq, 'pid') as pid:
+                pid.__get__ = mock.Mock(return_value=5)
+                dm = dhcp.Dnsmasq(self.conf, network, namespace='qdhcp-ns')
+                dm.reload_allocations()
+
+    def _cached(self, network):
+        # As cached by the agent
+        network.host_entries = {}
+        network.conf_digests = {}
+        return network
+
+    def test_reload_allocations_unchanged(self):
+        network = self._cached(FakeDualNetwork())
+        self._reload_allocations(network)
+        self.assertEqual(self.safe.call_count, 2)
+        self.assertEqual(self.run.call_count, 1)
+
+        self._reload_allocations(network)
+        self.assertEqual(self.safe.call_count, 2)
+        self.assertEqual(self.run.call_count, 1)
+
+    def test_reload_allocations_not_cached(self):
+        self._reload_allocations(FakeDualNetwork())
+        self._reload_allocations(FakeDualNetwork())
+        self.assertEqual(self.safe.call_count, 4)
+        self.assertEqual(self.run.call_count, 2)
+
+    def test_reload_allocations_hosts_changed(self):
+        network = self._cached(FakeDualNetwork())
+        self._reload_allocations(network)
+        network.ports = network.ports[:1]
+        self._reload_allocations(network)
+        # Only the hosts file is rewritten
+        self.assertEqual(self.safe.call_count, 3)
+        self.assertEqual(self.safe.call_args[0][0],
+                         '/dhcp/cccccccc-cccc-cccc-cccc-cccccccccccc/host')
+        self.assertEqual(self.run.call_count, 2)
+
+    def test_reload_allocations_port_order_ignored(self):
+        network = self._cached(FakeDualNetwork())
+        self._reload_allocations(network)
+        network.ports = list(reversed(network.ports))
+        self._reload_allocations(network)
+        self.assertEqual(self.safe.call_count, 2)
+        self.assertEqual(self.run.call_count, 1)
+
+    def test_hosts_entries_reused(self):
+        network = self._cached(FakeDualNetwork())
+        with mock.patch.object(dhcp.Dnsmasq, '_host_entry',
+                               return_value='') as host_entry:
+            self._reload_allocations(network)
+            self.assertEqual(host_entry.call_count, 3)
+            self.assertEqual(sorted(network.host_entries),
+                             sorted(port.id for port in network.ports))
+
+            # As when the agent caches a port update
+            del network.host_entries[FakePort2.id]
+            self._reload_allocations(network)
+        self.assertEqual(host_entry.call_count, 4)
+        self.assertEqual(host_entry.call_args[0][0].id, FakePort2.id)
+
+    def test_disable_forgets_conf_files(self):
+        network = self._cached(FakeDualNetwork())
+        self._reload_allocations(network)
+        with mock.patch.object(dhcp.DhcpLocalProcess, 'disable'):
+            dhcp.Dnsmasq(self.conf, network).disable()
+        self.assertEqual(network.conf_digests, {})
+        self._reload_allocations(network)
+        self.assertEqual(self.safe.call_count, 4)
+
+    def test_reload_allocations_signal_failure(self):
+        network = self._cached(FakeDualNetwork())
+        self.run.side_effect = RuntimeError
+        self.assertRaises(RuntimeError, self._reload_allocations, network)
+        self.run.side_effect = None
+        self._reload_allocations(network)
+        self.assertEqual(self.safe.call_count, 4)
+        self.assertEqual(self.run.call_count, 2)
 
     def _test_lease_relay_script_helper(self, action, lease_remaining,
                                         path_exists=True):
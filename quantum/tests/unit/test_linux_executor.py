@@ -0,0 +1,128 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2013 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+import mock
+import unittest2 as unittest
+
+from quantum.agent.linux import executor
+from quantum.agent.linux import utils
+
+
+class TestExecutor(unittest.TestCase):
+    def setUp(self):
+        super(TestExecutor, self).setUp()
+        self.executor = executor.Executor(pool_size=4)
+
+    def test_submit(self):
+        future = self.executor.submit(['echo', 'foo'])
+        result = future.result()
+        self.assertTrue(future.done())
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.stdout, 'foo\n')
+        self.assertEqual(result.cmd, ['echo', 'foo'])
+
+    def test_submit_process_input(self):
+        future = self.executor.submit(['cat'], process_input='foo')
+        self.assertEqual(future.result().stdout, 'foo')
+
+    def test_submit_check_exit_code(self):
+        self.assertRaises(RuntimeError,
+                          self.executor.submit(['false']).result)
+        result = self.executor.submit(['false'],
+                                      check_exit_code=False).result()
+        self.assertEqual(result.returncode, 1)
+
+    def test_submit_timeout(self):
+        future = self.executor.submit(['sleep', '10'], timeout=0.1)
+        self.assertRaises(utils.ExecuteTimeout, future.result)
+
+    def _run_in_order(self, pool, cmds, **kwargs):
+        order = []
+
+        def run(cmd, *args):
+            order.append(('start', cmd[-1]))
+            eventlet.sleep(0.01)
+            order.append(('end', cmd[-1]))
+            return utils.CommandResult(cmd, 0, '', '')
+
+        with mock.patch.object(utils, 'run', side_effect=run):
+            executor.wait_all(pool.map(cmds, **kwargs))
+        return order
+
+    def test_commands_run_concurrently(self):
+        order = self._run_in_order(self.executor, [['a'], ['b'], ['c']])
+        self.assertEqual([entry[0] for entry in order],
+                         ['start'] * 3 + ['end'] * 3)
+
+    def test_pool_size_bounds_concurrency(self):
+        pool = executor.Executor(pool_size=1)
+        order = self._run_in_order(pool, [['a'], ['b']])
+        self.assertEqual(order, [('start', 'a'), ('end', 'a'),
+                                 ('start', 'b'), ('end', 'b')])
+
+    def test_namespace_commands_serialized(self):
+        order = []
+
+        def run(cmd, *args):
+            order.append(('start', cmd[-1]))
+            eventlet.sleep(0.01)
+            order.append(('end', cmd[-1]))
+            return utils.CommandResult(cmd, 0, '', '')
+
+        with mock.patch.object(utils, 'run', side_effect=run):
+            futures = (self.executor.map([['a'], ['b']], namespace='ns1') +
+                       self.executor.map([['c']], namespace='ns2'))
+            executor.wait_all(futures)
+
+        self.assertEqual(futures[0].cmd, ['ip', 'netns', 'exec', 'ns1', 'a'])
+        ns1 = [entry for entry in order if entry[1] in ('a', 'b')]
+        self.assertEqual(ns1, [('start', 'a'), ('end', 'a'),
+                               ('start', 'b'), ('end', 'b')])
+        # ns2 ran alongside ns1
+        self.assertTrue(order.index(('start', 'c')) <
+                        order.index(('end', 'a')))
+        self.assertEqual(self.executor._namespace_queues, {})
+
+    def test_namespace_addl_env(self):
+        with mock.patch.object(utils, 'run') as run:
+            run.return_value = utils.CommandResult([], 0, '', '')
+            self.executor.submit(['dnsmasq'], namespace='ns',
+                                 addl_env={'FOO': 'bar'}).result()
+        run.assert_called_once_with(
+            ['FOO=bar', 'ip', 'netns', 'exec', 'ns', 'dnsmasq'],
+            None, None, None, None)
+
+    def test_wait_all_without_raise(self):
+        futures = self.executor.map([['true'], ['false']])
+        results = executor.wait_all(futures, raise_on_error=False)
+        self.assertEqual(results[0].returncode, 0)
+        self.assertIsInstance(results[1], RuntimeError)
+
+
+class TestGetExecutor(unittest.TestCase):
+    def setUp(self):
+        super(TestGetExecutor, self).setUp()
+        executors_p = mock.patch.dict(executor._executors, clear=True)
+        executors_p.start()
+        self.addCleanup(executors_p.stop)
+
+    def test_shared_by_root_helper(self):
+        sudo = executor.get_executor('sudo')
+        self.assertIs(executor.get_executor('sudo'), sudo)
+        self.assertEqual(sudo.root_helper, 'sudo')
+        self.assertIsNot(executor.get_executor(), sudo)
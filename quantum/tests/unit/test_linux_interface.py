@@ -99,9 +99,15 @@ class TestABCDriver(TestBase):
         bc.init_l3('tap0', ['192.168.1.2/24'], namespace=ns)
         self.ip_dev.assert_has_calls(
             [mock.call('tap0', 'sudo', namespace=ns),
-             mock.call().addr.list(scope='global', filters=['permanent']),
-             mock.call().addr.add(4, '192.168.1.2/24', '192.168.1.255'),
-             mock.call().addr.delete(4, '172.16.77.240/24')])
+             mock.call().addr.list(scope='global', filters=['permanent'])])
+        self.ip.assert_has_calls([mock.call('sudo', namespace=ns),
+                                  mock.call().batch()])
+        batch = self.ip.return_value.batch.return_value.__enter__()
+        batch.assert_has_calls(
+            [mock.call.device('tap0'),
+             mock.call.device().addr.add(4, '192.168.1.2/24',
+                                         '192.168.1.255'),
+             mock.call.device().addr.delete(4, '172.16.77.240/24')])
 
 
 class TestOVSInterfaceDriver(TestBase):
@@ -149,22 +155,25 @@ class TestOVSInterfaceDriver(TestBase):
                      namespace=namespace)
             execute.assert_called_once_with(vsctl_cmd, 'sudo')
 
-        expected = [mock.call('sudo'),
-                    mock.call().device('tap0'),
-                    mock.call().device().link.set_address('aa:bb:cc:dd:ee:ff')]
-        expected.extend(additional_expectation)
+        expected = [mock.call('sudo')]
         if namespace:
-            expected.extend(
-                [mock.call().ensure_namespace(namespace),
-                 mock.call().ensure_namespace().add_device_to_namespace(
-                     mock.ANY)])
-        expected.extend([mock.call().device().link.set_up()])
-
+            expected.append(mock.call().ensure_namespace(namespace))
+        expected.append(mock.call().batch())
         self.ip.assert_has_calls(expected)
 
+        batch = self.ip.return_value.batch.return_value.__enter__()
+        expected = [mock.call.device('tap0'),
+                    mock.call.device().link.set_address('aa:bb:cc:dd:ee:ff')]
+        expected.extend(additional_expectation)
+        expected.append(mock.call.device().link.set_up())
+        batch.assert_has_calls(expected)
+        if namespace:
+            self.ip().ensure_namespace().add_device_to_namespace.\
+                assert_called_once_with(batch.device())
+
     def test_plug_mtu(self):
         self.conf.set_override('network_device_mtu', 9000)
-        self._test_plug([mock.call().device().link.set_mtu(9000)])
+        self._test_plug([mock.call.device().link.set_mtu(9000)])
 
     def test_unplug(self, bridge=None):
         if not bridge:
@@ -205,12 +214,11 @@ class TestOVSInterfaceDriverWithVeth(TestOVSInterfaceDriver):
         self.device_exists.side_effect = device_exists
 
         root_dev = mock.Mock()
-        _ns_dev = mock.Mock()
         ns_dev = mock.Mock()
-        self.ip().add_veth = mock.Mock(return_value=(root_dev, _ns_dev))
-        self.ip().device = mock.Mock(return_value=(ns_dev))
-        expected = [mock.call('sudo'), mock.call().add_veth('tap0', devname),
-                    mock.call().device(devname)]
+        batch = self.ip().batch().__enter__()
+        batch.device.side_effect = lambda name: (
+            root_dev if name == 'tap0' else ns_dev)
+        expected = [mock.call('sudo'), mock.call().add_veth('tap0', devname)]
 
         vsctl_cmd = ['ovs-vsctl', '--', '--may-exist', 'add-port',
                      bridge, 'tap0', '--', 'set', 'Interface', 'tap0',
@@ -235,12 +243,13 @@ class TestOVSInterfaceDriverWithVeth(TestOVSInterfaceDriver):
             ns_dev.assert_has_calls([mock.call.link.set_mtu(mtu)])
             root_dev.assert_has_calls([mock.call.link.set_mtu(mtu)])
         if namespace:
-            expected.extend(
-                [mock.call().ensure_namespace(namespace),
-                 mock.call().ensure_namespace().add_device_to_namespace(
-                     mock.ANY)])
+            expected.append(mock.call().ensure_namespace(namespace))
+            self.ip().ensure_namespace().add_device_to_namespace.\
+                assert_called_once_with(ns_dev)
+        expected.append(mock.call().batch())
 
         self.ip.assert_has_calls(expected)
+        batch.device.assert_has_calls([mock.call(devname), mock.call('tap0')])
         root_dev.assert_has_calls([mock.call.link.set_up()])
         ns_dev.assert_has_calls([mock.call.link.set_up()])
 
@@ -279,7 +288,8 @@ class TestBridgeInterfaceDriver(TestBase):
         root_veth = mock.Mock()
         ns_veth = mock.Mock()
 
-        self.ip().add_veth = mock.Mock(return_value=(root_veth, ns_veth))
+        batch = self.ip().batch().__enter__()
+        batch.add_veth = mock.Mock(return_value=(root_veth, ns_veth))
 
         self.device_exists.side_effect = device_exists
         br = interface.BridgeInterfaceDriver(self.conf)
@@ -290,13 +300,15 @@ class TestBridgeInterfaceDriver(TestBase):
                 mac_address,
                 namespace=namespace)
 
-        ip_calls = [mock.call('sudo'), mock.call().add_veth('tap0', 'ns-0')]
+        ip_calls = [mock.call('sudo')]
+        batch.add_veth.assert_called_once_with('tap0', 'ns-0')
         ns_veth.assert_has_calls([mock.call.link.set_address(mac_address)])
         if namespace:
-            ip_calls.extend([
-                mock.call().ensure_namespace('01234567-1234-1234-99'),
-                mock.call().ensure_namespace().add_device_to_namespace(
-                    ns_veth)])
+            ip_calls.append(
+                mock.call().ensure_namespace('01234567-1234-1234-99'))
+            self.ip().ensure_namespace().add_device_to_namespace.\
+                assert_called_once_with(ns_veth)
+        ip_calls.append(mock.call().batch())
         if mtu:
             ns_veth.assert_has_calls([mock.call.link.set_mtu(mtu)])
             root_veth.assert_has_calls([mock.call.link.set_mtu(mtu)])
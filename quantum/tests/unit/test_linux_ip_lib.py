@@ -175,6 +175,56 @@ class TestIpWrapper(unittest.TestCase):
         self.execute.assert_called_once_with('', 'netns', ('list',),
                                              root_helper='sudo')
 
+    def test_delete_devices(self):
+        with mock.patch('quantum.agent.linux.utils.execute') as execute:
+            execute.side_effect = [
+                RuntimeError('Stderr: \'Command failed -:2\\n\''),
+                RuntimeError('Stderr: \'Command failed -:1\\n\''),
+                '']
+            failed = ip_lib.IPWrapper('sudo').delete_devices(
+                ['tap1', 'eth0', 'eth1', 'tap2'])
+        self.assertEqual(failed, ['eth0', 'eth1'])
+        inputs = [c[1]['process_input'] for c in execute.call_args_list]
+        self.assertEqual(inputs, [
+            'link delete tap1\nlink delete eth0\nlink delete eth1\n'
+            'link delete tap2\n',
+            'link delete eth1\nlink delete tap2\n',
+            'link delete tap2\n'])
+
+    def test_delete_devices_not_run(self):
+        with mock.patch('quantum.agent.linux.utils.execute') as execute:
+            execute.side_effect = RuntimeError('Stderr: \'\'')
+            self.assertRaises(ip_lib.IpBatchError,
+                              ip_lib.IPWrapper('sudo').delete_devices,
+                              ['tap1'])
+
+    def test_get_devices_by_namespace(self):
+        output = ('\nnetns: qdhcp-1\n'
+                  '1: lo: <LOOPBACK,UP,LOWER_UP> mtu 16436 qdisc noqueue\n'
+                  '2: tap1: <BROADCAST,MULTICAST> mtu 1500 qdisc noop\n'
+                  '\nnetns: qrouter-2\n'
+                  '1: lo: <LOOPBACK,UP,LOWER_UP> mtu 16436 qdisc noqueue\n'
+                  '\nnetns: qrouter-3\n'
+                  '1: lo: <LOOPBACK,UP,LOWER_UP> mtu 16436 qdisc noqueue\n'
+                  '3: qr-1@if4: <BROADCAST,MULTICAST> mtu 1500 qdisc noop\n'
+                  '4: qg-1: <BROADCAST,MULTICAST> mtu 1500 qdisc noop\n')
+        with mock.patch('quantum.agent.linux.utils.execute') as execute:
+            execute.return_value = output
+            retval = ip_lib.IPWrapper.get_devices_by_namespace(
+                'sudo', exclude_loopback=True)
+        self.assertEqual(retval, {'qdhcp-1': ['tap1'],
+                                  'qrouter-2': [],
+                                  'qrouter-3': ['qr-1', 'qg-1']})
+        execute.assert_called_once_with(
+            ['ip', '-all', 'netns', 'exec', 'ip', '-o', 'link', 'list'],
+            root_helper='sudo', check_exit_code=False)
+
+    def test_get_devices_by_namespace_unsupported(self):
+        with mock.patch('quantum.agent.linux.utils.execute') as execute:
+            execute.return_value = ''
+            self.assertEqual(
+                ip_lib.IPWrapper.get_devices_by_namespace('sudo'), {})
+
     def test_add_tuntap(self):
         ip_lib.IPWrapper('sudo').add_tuntap('tap0')
         self.execute.assert_called_once_with('', 'tuntap',
@@ -628,6 +678,87 @@ class TestIpNetnsCommand(TestIPCmdBase):
                 root_helper='sudo', check_exit_code=True)
 
 
+class TestIPBatch(unittest.TestCase):
+    def setUp(self):
+        self.execute_p = mock.patch('quantum.agent.linux.utils.execute')
+        self.execute = self.execute_p.start()
+        self.addCleanup(self.execute_p.stop)
+
+    def test_batch_runs_single_command(self):
+        with ip_lib.IPWrapper('sudo').batch() as batch:
+            root_dev, ns_dev = batch.add_veth('tap0', 'ns-0')
+            ns_dev.link.set_address('aa:bb:cc:dd:ee:ff')
+            ns_dev.addr.add(4, '10.0.0.2/24', '10.0.0.255')
+            root_dev.link.set_up()
+            self.assertFalse(self.execute.called)
+
+        self.execute.assert_called_once_with(
+            ['ip', '-batch', '-'], root_helper='sudo',
+            process_input='link add tap0 type veth peer name ns-0\n'
+                          'link set ns-0 address aa:bb:cc:dd:ee:ff\n'
+                          'addr add 10.0.0.2/24 brd 10.0.0.255 scope global '
+                          'dev ns-0\n'
+                          'link set tap0 up\n')
+
+    def test_batch_namespace(self):
+        with ip_lib.IPWrapper('sudo', 'ns').batch() as batch:
+            batch.device('eth0').route.add_gateway('10.0.0.1')
+        self.execute.assert_called_once_with(
+            ['ip', 'netns', 'exec', 'ns', 'ip', '-batch', '-'],
+            root_helper='sudo',
+            process_input='route add default via 10.0.0.1 dev eth0\n')
+
+    def test_batch_queries_run_immediately(self):
+        self.execute.return_value = LINK_SAMPLE[1]
+        with ip_lib.IPWrapper('sudo').batch() as batch:
+            self.assertEqual(batch.device('eth0').link.address,
+                             'cc:dd:ee:ff:ab:cd')
+        self.execute.assert_called_once_with(
+            ['ip', '-o', 'link', 'show', 'eth0'], root_helper=None)
+
+    def test_batch_empty(self):
+        with ip_lib.IPWrapper('sudo').batch():
+            pass
+        self.assertFalse(self.execute.called)
+
+    def test_batch_not_run_on_exception(self):
+        try:
+            with ip_lib.IPWrapper('sudo').batch() as batch:
+                batch.device('eth0').link.set_up()
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertFalse(self.execute.called)
+
+    def test_device_runs_immediately_after_batch(self):
+        with ip_lib.IPWrapper('sudo').batch() as batch:
+            dev = batch.device('ns-0')
+            dev.link.set_netns('ns')
+        dev.link.set_up()
+        self.execute.assert_has_calls(
+            [mock.call(['ip', '-batch', '-'], root_helper='sudo',
+                       process_input='link set ns-0 netns ns\n'),
+             mock.call(['ip', 'netns', 'exec', 'ns', 'ip', 'link', 'set',
+                        'ns-0', 'up'], root_helper='sudo')])
+
+    def test_batch_error_reports_line(self):
+        self.execute.side_effect = RuntimeError(
+            "Stderr: 'RTNETLINK answers: File exists\\n"
+            "Command failed -:2\\n'")
+        batch = ip_lib.IPWrapper('sudo').batch()
+        batch.device('eth0').link.set_up()
+        batch.device('eth1').link.set_up()
+        with self.assertRaises(ip_lib.IpBatchError) as ctx:
+            batch.execute()
+        self.assertEqual(ctx.exception.line, 2)
+        self.assertEqual(ctx.exception.failed_command, 'link set eth1 up')
+
+    def test_batch_requires_root_helper(self):
+        batch = ip_lib.IPWrapper().batch()
+        batch.device('eth0').link.set_up()
+        self.assertRaises(exceptions.SudoRequired, batch.execute)
+
+
 class TestDeviceExists(unittest.TestCase):
     def test_device_exists(self):
         with mock.patch.object(ip_lib.IPDevice, '_execute') as _execute:
@@ -14,12 +14,17 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
 import os
+import shutil
+import StringIO
+import tempfile
 
 import mock
 import unittest2 as unittest
 
 from quantum.common import utils
+from quantum.rootwrap import daemon
 from quantum.rootwrap import filters
 from quantum.rootwrap import wrapper
 
@@ -160,6 +165,56 @@ class RootwrapTestCase(unittest.TestCase):
         f = filters.IpNetnsExecFilter('/sbin/ip', 'root')
         self.assertFalse(f.match(['ip', 'link', 'list']))
 
+    def test_IpFilter_rejects_netns_exec_after_options(self):
+        f = filters.IpFilter('/sbin/ip', 'root')
+        self.assertFalse(f.match(['ip', '-all', 'netns', 'exec', 'rm']))
+        self.assertFalse(f.match(['ip', '-a', 'netns', 'exec', 'rm']))
+
+    def test_IpNetnsExecFilter_match_all(self):
+        f = filters.IpNetnsExecFilter('/sbin/ip', 'root')
+        args = ['ip', '-all', 'netns', 'exec', 'ip', '-o', 'link', 'list']
+        self.assertTrue(f.match(args))
+        self.assertEqual(f.exec_args(args), ['ip', '-o', 'link', 'list'])
+
+    def test_IpFilter_rejects_batch(self):
+        f = filters.IpFilter('/sbin/ip', 'root')
+        for option in ('-batch', '-b', '-ba', '--batch'):
+            self.assertFalse(f.match(['ip', option, '-']))
+        self.assertFalse(f.match(['ip', '-o', '-batch', '/tmp/cmds']))
+
+    def test_IpBatchFilter_match(self):
+        f = filters.IpBatchFilter('/sbin/ip', 'root')
+        self.assertTrue(f.match(['ip', '-batch', '-']))
+        self.assertFalse(f.match(['ip', '-batch', '/tmp/cmds']))
+        self.assertFalse(f.match(['ip', 'link', 'list']))
+
+    def test_IpBatchFilter_match_input(self):
+        f = filters.IpBatchFilter('/sbin/ip', 'root')
+        args = ['ip', '-batch', '-']
+        self.assertTrue(f.match_input(
+            args, 'link set tap0 up\n\naddr add 10.0.0.1/24 dev tap0\n'))
+        self.assertFalse(f.match_input(
+            args, 'link set tap0 up\nnetns exec foo rm -rf /\n'))
+        self.assertFalse(f.match_input(args, 'netn exec foo rm -rf /\n'))
+
+    def test_input_filter(self):
+        batch = filters.IpBatchFilter('/sbin/ip', 'root')
+        filter_list = [filters.IpNetnsExecFilter('/sbin/ip', 'root'),
+                       filters.IpFilter('/sbin/ip', 'root'), batch]
+        args = ['ip', '-batch', '-']
+        filtermatch = wrapper.match_filter(filter_list, args)
+        self.assertEqual(wrapper.input_filter(filter_list, filtermatch, args),
+                         (batch, args))
+        ns_args = ['ip', 'netns', 'exec', 'foo'] + args
+        filtermatch = wrapper.match_filter(filter_list, ns_args)
+        self.assertEqual(
+            wrapper.input_filter(filter_list, filtermatch, ns_args),
+            (batch, args))
+        link_args = ['ip', 'link', 'list']
+        filtermatch = wrapper.match_filter(filter_list, link_args)
+        self.assertIsNone(
+            wrapper.input_filter(filter_list, filtermatch, link_args))
+
     def test_match_filter_recurses_exec_command_filter(self):
         filter_list = [filters.IpNetnsExecFilter('/sbin/ip', 'root'),
                        filters.IpFilter('/sbin/ip', 'root')]
@@ -180,3 +235,177 @@ class RootwrapTestCase(unittest.TestCase):
         usercmd = ["cat", "/"]
         filtermatch = wrapper.match_filter(self.filters, usercmd)
         self.assertTrue(filtermatch is self.filters[-1])
+
+
+class FilterIndexTestCase(unittest.TestCase):
+
+    def test_index_key(self):
+        self.assertEqual(filters.CommandFilter('/bin/cat', 'root').index_key(),
+                         'cat')
+        self.assertEqual(
+            filters.RegExpFilter('/bin/ls', 'root', 'ls', '/').index_key(),
+            'ls')
+        self.assertIsNone(
+            filters.RegExpFilter('/bin/ls', 'root', 'l.', '/').index_key())
+        self.assertIsNone(
+            filters.DnsmasqFilter('/usr/sbin/dnsmasq', 'root').index_key())
+        self.assertEqual(filters.KillFilter('root', '/bin/sleep').index_key(),
+                         'kill')
+        self.assertEqual(filters.IpNetnsExecFilter('/sbin/ip',
+                                                   'root').index_key(), 'ip')
+
+    def test_index_key_unknown_subclass(self):
+        class CustomFilter(filters.CommandFilter):
+            def match(self, userargs):
+                return True
+
+        self.assertIsNone(CustomFilter('/bin/cat', 'root').index_key())
+
+    def test_candidates_keep_filter_order(self):
+        cat = filters.CommandFilter('/bin/cat', 'root')
+        any1 = filters.RegExpFilter('/bin/ls', 'root', '.*')
+        ls = filters.RegExpFilter('/bin/ls', 'root', 'ls', '/[a-z]+')
+        any2 = filters.DnsmasqFilter('/usr/sbin/dnsmasq', 'root')
+        cat2 = filters.CommandFilter('/usr/bin/cat', 'root')
+        index = wrapper.FilterIndex([cat, any1, ls, any2, cat2])
+        self.assertEqual(index.candidates(['cat']), [cat, any1, any2, cat2])
+        self.assertEqual(index.candidates(['ls', '/']), [any1, ls, any2])
+        self.assertEqual(index.candidates(['foo']), [any1, any2])
+
+    def test_RegExpFilter_bad_pattern(self):
+        f = filters.RegExpFilter('/bin/ls', 'root', 'ls', '[')
+        self.assertFalse(f.match(['ls', '[']))
+
+    def test_executable_checked_once(self):
+        f = filters.CommandFilter('/bin/cat', 'root')
+        index = wrapper.FilterIndex([f])
+        with mock.patch('os.access', return_value=True) as access:
+            for i in range(3):
+                self.assertIs(wrapper.match_filter(index, ['cat']), f)
+        access.assert_called_once_with('/bin/cat', os.X_OK)
+
+    def test_executable_lookup_expires(self):
+        index = wrapper.FilterIndex([])
+        with contextlib.nested(
+            mock.patch('os.access', return_value=False),
+            mock.patch('time.time', return_value=1000)
+        ) as (access, time):
+            self.assertFalse(index.is_executable('/bin/cat'))
+            access.return_value = True
+            time.return_value += wrapper.EXECUTABLE_CACHE_TTL
+            self.assertFalse(index.is_executable('/bin/cat'))
+            time.return_value += 1
+            self.assertTrue(index.is_executable('/bin/cat'))
+        self.assertEqual(access.call_count, 2)
+
+
+class FilterIndexCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        super(FilterIndexCacheTestCase, self).setUp()
+        self.tempdir = tempfile.mkdtemp()
+        self.filters_path = [os.path.join(self.tempdir, 'rootwrap.d')]
+        os.mkdir(self.filters_path[0])
+        self.cache_file = os.path.join(self.tempdir, 'rootwrap.cache')
+        self._write_filters('cat: CommandFilter, /bin/cat, root\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+        super(FilterIndexCacheTestCase, self).tearDown()
+
+    def _write_filters(self, content, mtime=1000):
+        path = os.path.join(self.filters_path[0], 'test.filters')
+        with open(path, 'w') as f:
+            f.write('[Filters]\n' + content)
+        os.utime(path, (mtime, mtime))
+
+    def test_without_cache(self):
+        index = wrapper.load_filter_index(self.filters_path)
+        self.assertIsNotNone(wrapper.match_filter(index, ['cat']))
+        self.assertFalse(os.path.exists(self.cache_file))
+
+    def test_cache_reused(self):
+        wrapper.load_filter_index(self.filters_path, self.cache_file)
+        self.assertTrue(os.path.exists(self.cache_file))
+        with mock.patch.object(wrapper, 'load_filters') as load:
+            index = wrapper.load_filter_index(self.filters_path,
+                                              self.cache_file)
+        self.assertFalse(load.called)
+        self.assertIsNotNone(wrapper.match_filter(index, ['cat']))
+
+    def test_cache_invalidated(self):
+        wrapper.load_filter_index(self.filters_path, self.cache_file)
+        self._write_filters('ls: CommandFilter, /bin/ls, root\n', 2000)
+        index = wrapper.load_filter_index(self.filters_path, self.cache_file)
+        self.assertIsNone(wrapper.match_filter(index, ['cat']))
+        self.assertIsNotNone(wrapper.match_filter(index, ['ls']))
+        index = wrapper.load_filter_index(self.filters_path, self.cache_file)
+        self.assertIsNotNone(wrapper.match_filter(index, ['ls']))
+
+    def test_cache_writable_by_others_ignored(self):
+        wrapper.load_filter_index(self.filters_path, self.cache_file)
+        os.chmod(self.cache_file, 0666)
+        with mock.patch.object(wrapper, 'load_filters',
+                               return_value=[]) as load:
+            wrapper.load_filter_index(self.filters_path, self.cache_file)
+        self.assertTrue(load.called)
+
+
+class RootwrapDaemonTestCase(unittest.TestCase):
+
+    def setUp(self):
+        super(RootwrapDaemonTestCase, self).setUp()
+        self.filters = [
+            filters.RegExpFilter("/bin/ls", "root", 'ls', '/[a-z]+'),
+            filters.CommandFilter("/bin/cat", "root")]
+
+    def test_run_command(self):
+        returncode, stdout, stderr = daemon.run_command(self.filters,
+                                                        ['ls', '/bin'])
+        self.assertEqual(returncode, 0)
+        self.assertIn('ls\n', stdout)
+
+    def test_run_command_process_input(self):
+        returncode, stdout, stderr = daemon.run_command(self.filters,
+                                                        ['cat'], 'foo\xff\n')
+        self.assertEqual(returncode, 0)
+        self.assertEqual(stdout, 'foo\xff\n')
+
+    def test_run_command_unauthorized(self):
+        returncode, stdout, stderr = daemon.run_command(self.filters,
+                                                        ['ls', 'root'])
+        self.assertEqual(returncode, daemon.RC_UNAUTHORIZED)
+        self.assertEqual(stdout, 'Unauthorized command: ls root\n')
+
+    def test_run_command_batch_netns_exec_rejected(self):
+        filter_list = [filters.IpNetnsExecFilter('/sbin/ip', 'root'),
+                       filters.IpFilter('/sbin/ip', 'root'),
+                       filters.IpBatchFilter('/sbin/ip', 'root')]
+        with mock.patch.object(utils, 'subprocess_popen') as popen:
+            for args in (['ip', '-batch', '-'],
+                         ['ip', 'netns', 'exec', 'foo', 'ip', '-batch', '-']):
+                returncode, stdout, stderr = daemon.run_command(
+                    filter_list, args,
+                    'link set tap0 up\nnetns exec foo rm -rf /\n')
+                self.assertEqual(returncode, daemon.RC_UNAUTHORIZED)
+        self.assertFalse(popen.called)
+
+    def _request(self, line):
+        handler = mock.Mock()
+        handler.server.filters = self.filters
+        handler.rfile = StringIO.StringIO(line)
+        handler.wfile = StringIO.StringIO()
+        daemon.RootwrapRequestHandler.handle.im_func(handler)
+        return daemon.decode_message(handler.wfile.getvalue())
+
+    def test_handle(self):
+        reply = self._request(daemon.encode_message(
+            {'cmd': ['cat'], 'process_input': 'foo\xff'}))
+        self.assertEqual(reply, {'returncode': 0,
+                                 'stdout': u'foo\xff',
+                                 'stderr': u''})
+
+    def test_handle_bad_request(self):
+        for line in ('garbage\n', '{}\n', '{"cmd": []}\n'):
+            reply = self._request(line)
+            self.assertEqual(reply['returncode'], daemon.RC_BADREQUEST)
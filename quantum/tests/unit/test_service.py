@@ -0,0 +1,123 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2013 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import signal
+
+import mock
+import unittest2 as unittest
+
+from quantum.openstack.common import cfg
+from quantum.openstack.common import service as common_service
+from quantum import service
+
+
+class TestServeRpc(unittest.TestCase):
+    def setUp(self):
+        super(TestServeRpc, self).setUp()
+        self.addCleanup(cfg.CONF.reset)
+        get_plugin_p = mock.patch('quantum.manager.QuantumManager.'
+                                  'get_plugin')
+        self.plugin = get_plugin_p.start().return_value
+        self.addCleanup(get_plugin_p.stop)
+        launcher_p = mock.patch.object(service.common_service,
+                                       'ProcessLauncher')
+        self.launcher_cls = launcher_p.start()
+        self.addCleanup(launcher_p.stop)
+
+    def test_consumed_from_api_process(self):
+        self.assertIsNone(service.serve_rpc())
+        self.assertFalse(self.launcher_cls.called)
+        self.assertFalse(self.plugin.start_rpc_listener.called)
+
+    def test_rpc_workers(self):
+        cfg.CONF.set_override('rpc_workers', 2)
+        launcher = service.serve_rpc()
+        self.assertEqual(launcher, self.launcher_cls.return_value)
+        args, kwargs = launcher.launch_service.call_args
+        self.assertIsInstance(args[0], service.RpcWorker)
+        self.assertEqual(kwargs, {'workers': 2})
+
+    def test_rpc_workers_share_launcher(self):
+        cfg.CONF.set_override('rpc_workers', 2)
+        launcher = mock.Mock()
+        self.assertEqual(service.serve_rpc(launcher), launcher)
+        self.assertTrue(launcher.launch_service.called)
+        self.assertFalse(self.launcher_cls.called)
+
+    def test_rpc_workers_not_supported(self):
+        cfg.CONF.set_override('rpc_workers', 2)
+        self.plugin.rpc_workers_supported.return_value = False
+        self.assertRaises(RuntimeError, service.serve_rpc)
+
+
+class TestRpcWorker(unittest.TestCase):
+    def test_start(self):
+        plugin = mock.Mock()
+        worker = service.RpcWorker(plugin)
+        with mock.patch.object(service.db_api, 'dispose') as dispose:
+            with mock.patch.object(service.rpc,
+                                   'reset_after_fork') as reset_after_fork:
+                worker.start()
+        dispose.assert_called_once_with()
+        reset_after_fork.assert_called_once_with()
+        plugin.start_rpc_listener.assert_called_once_with()
+
+    def test_stop(self):
+        worker = service.RpcWorker(mock.Mock())
+        worker.stop()
+        worker.stop()
+        worker.wait()
+
+
+class TestProcessLauncherRestart(unittest.TestCase):
+    def setUp(self):
+        super(TestProcessLauncherRestart, self).setUp()
+        with mock.patch.object(common_service.signal, 'signal'):
+            self.launcher = common_service.ProcessLauncher()
+        self.addCleanup(self.launcher.readpipe.close)
+        self.addCleanup(os.close, self.launcher.writepipe)
+        self.launcher.children = {1: mock.Mock(), 2: mock.Mock()}
+        kill_p = mock.patch.object(common_service.os, 'kill')
+        self.kill = kill_p.start()
+        self.addCleanup(kill_p.stop)
+
+    def test_children_restarted_one_at_a_time(self):
+        self.launcher._restart_children()
+        pid = self.launcher._restart_pid
+        self.kill.assert_called_once_with(pid, signal.SIGTERM)
+
+        # Once restarted by wait(), the next child is stopped
+        del self.launcher.children[pid]
+        self.launcher.children[3] = mock.Mock()
+        self.launcher._restart_next_child()
+        other = 3 - pid
+        self.assertEqual(self.launcher._restart_pid, other)
+        self.kill.assert_called_with(other, signal.SIGTERM)
+
+        del self.launcher.children[other]
+        self.launcher._restart_next_child()
+        self.assertIsNone(self.launcher._restart_pid)
+        self.assertEqual(self.kill.call_count, 2)
+
+    def test_exited_children_skipped(self):
+        self.launcher._restart_children()
+        pid = self.launcher._restart_pid
+        self.launcher.children = {}
+        self.launcher._restart_next_child()
+        self.assertIsNone(self.launcher._restart_pid)
+        self.kill.assert_called_once_with(pid, signal.SIGTERM)
@@ -0,0 +1,74 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2013 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import contextlib
+
+import mock
+
+from quantum import context
+from quantum.db import models_v2
+from quantum import manager
+from quantum.openstack.common.notifier import api as notifier_api
+from quantum.tests.unit import test_db_plugin
+from quantum import usage_audit
+
+
+class TestUsageAudit(test_db_plugin.QuantumDbPluginV2TestCase):
+    def setUp(self):
+        super(TestUsageAudit, self).setUp(
+            plugin=test_db_plugin.DB_PLUGIN_KLASS)
+        self.plugin = manager.QuantumManager.get_plugin()
+        self.context = context.get_admin_context()
+
+    def test_iter_chunks(self):
+        with contextlib.nested(self.network(), self.network(),
+                               self.network()) as networks:
+            getter = mock.Mock(wraps=self.plugin.get_networks)
+            chunks = list(usage_audit.iter_chunks(
+                self.context, getter, models_v2.Network, 2))
+        ids = sorted(network['network']['id'] for network in networks)
+        self.assertEqual([[network['id'] for network in chunk]
+                          for chunk in chunks], [ids[:2], ids[2:]])
+        getter.assert_has_calls([
+            mock.call(self.context, filters={'id': ids[:2]}),
+            mock.call(self.context, filters={'id': ids[2:]})])
+
+    def test_audit(self):
+        with self.port() as port:
+            with mock.patch.object(notifier_api, 'notify') as notify:
+                counts = usage_audit.audit(self.plugin, self.context, 1)
+        # The core plugin has no routers
+        self.assertEqual(counts, {'network': 1, 'subnet': 1, 'port': 1})
+        event_types = [call[0][2] for call in notify.call_args_list]
+        self.assertEqual(event_types, ['network.exists', 'subnet.exists',
+                                       'port.exists'])
+        self.assertEqual(notify.call_args_list[2][0][4]['port']['id'],
+                         port['port']['id'])
+
+    def test_main_flush_timeout(self):
+        with contextlib.nested(
+            mock.patch.object(usage_audit, 'cfg'),
+            mock.patch.object(usage_audit, 'eventlet'),
+            mock.patch.object(usage_audit.config, 'setup_logging'),
+            mock.patch.object(usage_audit, 'audit', return_value={}),
+            mock.patch.object(notifier_api, 'flush', return_value=False)
+        ) as (cfg, eventlet, setup_logging, audit, flush):
+            cfg.CONF.chunk_size = 10
+            cfg.CONF.concurrency = 2
+            cfg.CONF.notification_flush_timeout = 5
+            self.assertRaises(SystemExit, usage_audit.main)
+        flush.assert_called_once_with(5)
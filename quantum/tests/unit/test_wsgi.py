@@ -77,3 +77,61 @@ class TestWSGIServer(unittest.TestCase):
                             None,
                             mock_listen.return_value)
                     ])
+
+    def test_start_with_workers(self):
+        server = wsgi.Server("test_workers")
+        with mock.patch.object(wsgi.common_service,
+                               'ProcessLauncher') as launcher_cls:
+            server.start(None, 0, host="127.0.0.1", workers=2)
+            launcher = launcher_cls.return_value
+            args, kwargs = launcher.launch_service.call_args
+            self.assertIsInstance(args[0], wsgi.WorkerService)
+            self.assertEqual(kwargs, {'workers': 2})
+
+            server.stop()
+            server.wait()
+            launcher.stop.assert_called_once_with()
+            launcher.wait.assert_called_once_with()
+
+
+class TestWorkerService(unittest.TestCase):
+    """Tests of the service run by each API worker process."""
+
+    def test_start_resets_connections(self):
+        server = mock.Mock()
+        worker = wsgi.WorkerService(server, 'app')
+        with mock.patch.object(wsgi.api, 'dispose') as dispose:
+            with mock.patch.object(wsgi.rpc,
+                                   'reset_after_fork') as reset_after_fork:
+                worker.start()
+        dispose.assert_called_once_with()
+        reset_after_fork.assert_called_once_with()
+        server.pool.spawn.assert_called_once_with(server._run,
+                                                  worker._serve,
+                                                  server._socket)
+
+    def test_serve_counts_requests(self):
+        def application(environ, start_response):
+            self.assertEqual(worker._requests, 1)
+            return ['body']
+
+        worker = wsgi.WorkerService(mock.Mock(), application)
+        self.assertEqual(worker._serve({}, None), ['body'])
+        self.assertEqual(worker._requests, 0)
+
+    def test_stop_waits_for_requests(self):
+        worker = wsgi.WorkerService(mock.Mock(), 'app')
+        worker._thread = thread = mock.Mock()
+        worker._requests = 2
+
+        def sleep(seconds):
+            self.assertTrue(thread.kill.called)
+            worker._requests -= 1
+
+        with mock.patch.object(wsgi.eventlet, 'sleep',
+                               side_effect=sleep) as sleep_mock:
+            with mock.patch.object(wsgi.notifier_api, 'flush') as flush:
+                worker.stop()
+        self.assertEqual(sleep_mock.call_count, 2)
+        flush.assert_called_once_with(
+            wsgi.cfg.CONF.notification_flush_timeout)
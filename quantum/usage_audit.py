@@ -0,0 +1,148 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright (c) 2012 New Dream Network, LLC (DreamHost)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Cron script to generate usage notifications for networks, subnets,
+ports, routers and floating IPs.
+
+The resources are read in chunks ordered by id, so that memory use does
+not grow with their number, and the notifications of a chunk are sent in
+batches by a few green threads while the next chunk is read.
+"""
+
+import sys
+import time
+
+import eventlet
+
+from quantum.common import config
+from quantum import context
+from quantum.db import l3_db
+from quantum.db import models_v2
+from quantum import manager
+from quantum.openstack.common import cfg
+from quantum.openstack.common import log as logging
+from quantum.openstack.common.notifier import api as notifier_api
+
+
+LOG = logging.getLogger(__name__)
+PROGRESS_INTERVAL = 10
+
+audit_opts = [
+    cfg.IntOpt('chunk_size', default=500,
+               help=_('Number of resources read from the database at once.')),
+    cfg.IntOpt('concurrency', default=4,
+               help=_('Number of notification batches sent concurrently.')),
+]
+
+# Resource name, plugin getter and model of the audited resources
+RESOURCES = [
+    ('network', 'get_networks', models_v2.Network),
+    ('subnet', 'get_subnets', models_v2.Subnet),
+    ('port', 'get_ports', models_v2.Port),
+    ('router', 'get_routers', l3_db.Router),
+    ('floatingip', 'get_floatingips', l3_db.FloatingIP),
+]
+
+
+def iter_chunks(context, getter, model, chunk_size):
+    """Yield the resources of model in chunks of chunk_size, by id.
+
+    Each chunk starts after the last id of the previous one rather than
+    at an offset, and is read through the plugin getter filtered on its
+    ids so that the plugin specific attributes are included.
+    """
+    marker = None
+    while True:
+        query = context.session.query(model.id).order_by(model.id)
+        if marker:
+            query = query.filter(model.id > marker)
+        ids = [row.id for row in query.limit(chunk_size)]
+        if not ids:
+            return
+        resources = getter(context, filters={'id': ids})
+        yield sorted(resources, key=lambda resource: resource['id'])
+        marker = ids[-1]
+        # Do not keep the rows of the previous chunks around
+        context.session.expunge_all()
+
+
+def audit(plugin, context, chunk_size):
+    """Emit an exists notification for each resource of plugin.
+
+    Progress and throughput are logged every PROGRESS_INTERVAL seconds.
+    Returns the number of notifications emitted by resource name.
+    """
+    publisher_id = notifier_api.publisher_id('network')
+    counts = {}
+    for resource, getter, model in RESOURCES:
+        if not hasattr(plugin, getter):
+            continue
+        count = 0
+        start = last_report = time.time()
+        for chunk in iter_chunks(context, getattr(plugin, getter), model,
+                                 chunk_size):
+            for item in chunk:
+                notifier_api.notify(context, publisher_id,
+                                    '%s.exists' % resource,
+                                    notifier_api.INFO,
+                                    {resource: item})
+            count += len(chunk)
+            now = time.time()
+            if now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                LOG.info(_('Audited %(count)d %(resource)ss so far, '
+                           '%(rate).1f %(resource)ss/s'),
+                         {'count': count, 'resource': resource,
+                          'rate': count / max(now - start, 0.001)})
+        elapsed = time.time() - start
+        LOG.info(_('Audited %(count)d %(resource)ss in %(elapsed).1fs, '
+                   '%(rate).1f %(resource)ss/s'),
+                 {'count': count, 'resource': resource, 'elapsed': elapsed,
+                  'rate': count / max(elapsed, 0.001)})
+        counts[resource] = count
+    return counts
+
+
+def main():
+    eventlet.monkey_patch()
+    cfg.CONF.register_cli_opts(audit_opts)
+    cfg.CONF(project='quantum')
+    config.setup_logging(cfg.CONF)
+
+    chunk_size = max(cfg.CONF.chunk_size, 1)
+    # At most a chunk of notifications waits to be sent, concurrently with
+    # the reading of the next chunk
+    cfg.CONF.set_override('notification_queue_size', chunk_size)
+    cfg.CONF.set_override('notification_overflow_policy',
+                          notifier_api.BLOCK)
+    cfg.CONF.set_override('notification_publishers',
+                          max(cfg.CONF.concurrency, 1))
+
+    ctx = context.get_admin_context()
+    plugin = manager.QuantumManager.get_plugin()
+    start = time.time()
+    counts = audit(plugin, ctx, chunk_size)
+    if not notifier_api.flush(cfg.CONF.notification_flush_timeout):
+        LOG.error(_('Usage notifications still queued after %ds, exiting'),
+                  cfg.CONF.notification_flush_timeout)
+        sys.exit(1)
+    elapsed = time.time() - start
+    total = sum(counts.values())
+    LOG.info(_('Sent %(total)d usage notifications in %(elapsed).1fs, '
+               '%(rate).1f notifications/s'),
+             {'total': total, 'elapsed': elapsed,
+              'rate': total / max(elapsed, 0.001)})
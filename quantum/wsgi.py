@@ -31,8 +31,13 @@ import webob.exc
 
 from quantum.common import exceptions as exception
 from quantum import context
+from quantum.db import api
+from quantum.openstack.common import cfg
 from quantum.openstack.common import jsonutils
 from quantum.openstack.common import log as logging
+from quantum.openstack.common.notifier import api as notifier_api
+from quantum.openstack.common import rpc
+from quantum.openstack.common import service as common_service
 
 LOG = logging.getLogger(__name__)
 
@@ -43,15 +48,66 @@ def run_server(application, port):
     eventlet.wsgi.server(sock, application)
 
 
+class WorkerService(object):
+    """Serves the application of a Server from a forked worker process.
+
+    Once stopped, the worker accepts no more connections but waits up to
+    api_worker_stop_timeout seconds for the requests in flight.
+    """
+
+    def __init__(self, server, application):
+        self._server = server
+        self._application = application
+        self._thread = None
+        self._requests = 0
+
+    def _serve(self, environ, start_response):
+        self._requests += 1
+        try:
+            return self._application(environ, start_response)
+        finally:
+            self._requests -= 1
+
+    def start(self):
+        # The database and message bus connections inherited from the
+        # parent are not to be shared with it or with the other workers
+        api.dispose()
+        rpc.reset_after_fork()
+        self._thread = self._server.pool.spawn(self._server._run,
+                                               self._serve,
+                                               self._server._socket)
+
+    def wait(self):
+        self._thread.wait()
+
+    def stop(self):
+        if self._thread:
+            # Stop accepting connections, the requests being served run in
+            # other green threads of the pool. Idle keep-alive connections
+            # are not waited for.
+            self._thread.kill()
+            with eventlet.Timeout(cfg.CONF.api_worker_stop_timeout, False):
+                while self._requests:
+                    eventlet.sleep(0.1)
+        # Send what the requests served queued before the process exits
+        notifier_api.flush(cfg.CONF.notification_flush_timeout)
+
+
 class Server(object):
     """Server class to manage multiple WSGI sockets and applications."""
 
     def __init__(self, name, threads=1000):
         self.pool = eventlet.GreenPool(threads)
         self.name = name
+        self._launcher = None
+
+    def start(self, application, port, host='0.0.0.0', backlog=128,
+              workers=0):
+        """Run a WSGI server with the given application.
 
-    def start(self, application, port, host='0.0.0.0', backlog=128):
-        """Run a WSGI server with the given application."""
+        With workers set, that many processes forked once the socket is
+        bound serve the application, restarted when they die.
+        """
         self._host = host
         self._port = port
 
@@ -74,25 +130,43 @@ class Server(object):
                           {'host': host, 'port': port})
             sys.exit(1)
 
-        self._server = self.pool.spawn(self._run, application, self._socket)
+        if workers < 1:
+            self._server = self.pool.spawn(self._run, application,
+                                           self._socket)
+        else:
+            self._launcher = common_service.ProcessLauncher()
+            self._launcher.launch_service(WorkerService(self, application),
+                                          workers=workers)
 
     @property
     def host(self):
         return self._socket.getsockname()[0] if self._socket else self._host
 
+    @property
+    def launcher(self):
+        """The ProcessLauncher of the workers, if any."""
+        return self._launcher
+
     @property
     def port(self):
         return self._socket.getsockname()[1] if self._socket else self._port
 
     def stop(self):
-        self._server.kill()
+        if self._launcher:
+            self._launcher.stop()
+        else:
+            self._server.kill()
 
     def wait(self):
         """Wait until all servers have completed running."""
         try:
-            self.pool.waitall()
+            if self._launcher:
+                self._launcher.wait()
+            else:
+                self.pool.waitall()
         except KeyboardInterrupt:
             pass
+        notifier_api.flush(cfg.CONF.notification_flush_timeout)
 
     def _run(self, application, socket):
         """Start a WSGI server in a new green thread."""
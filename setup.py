@@ -128,7 +128,9 @@ else:
         'quantum-server = quantum.server:main',
         'quantum-debug = quantum.debug.shell:main',
         'quantum-ovs-cleanup = quantum.agent.ovs_cleanup_util:main',
+        'quantum-rootwrap-daemon = quantum.rootwrap.daemon:main',
         'quantum-db-manage = quantum.db.migration.cli:main',
+        'quantum-usage-audit = quantum.usage_audit:main',
     ]
 
     ProjectScripts = [
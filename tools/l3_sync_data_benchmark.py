@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare the L3 agent full sync payload built by get_sync_data with the
+one built through the plugin API.
+
+Usage: l3_sync_data_benchmark.py [--sql-connection URL] [ROUTERS ...]
+
+Each router gets a gateway port, an interface port on its own subnet and
+a floating IP. The default database is an in-memory SQLite one.
+"""
+
+import functools
+import gettext
+import optparse
+import time
+
+gettext.install('quantum', unicode=1)
+
+from quantum.common import config
+from quantum import context
+from quantum.db import api as db
+from quantum.db import db_base_plugin_v2
+from quantum.db import l3_db
+from quantum.db import l3_sync_reference
+from quantum.db import models_v2
+from quantum.openstack.common import cfg
+from quantum.openstack.common import uuidutils
+
+
+class BenchmarkPlugin(db_base_plugin_v2.QuantumDbPluginV2,
+                      l3_db.L3_NAT_db_mixin):
+    pass
+
+
+def _ip(base, i):
+    return '%d.%d.%d.%d' % (base, i >> 16 & 255, i >> 8 & 255, i & 255)
+
+
+def populate(session, count):
+    """Insert count routers, with their ports and floating IPs."""
+    tenant_id = 'benchmark'
+    ext_net_id = uuidutils.generate_uuid()
+    ext_subnet_id = uuidutils.generate_uuid()
+    int_net_id = uuidutils.generate_uuid()
+    rows = dict((model, []) for model in (
+        models_v2.Subnet, models_v2.Port, models_v2.IPAllocation,
+        l3_db.Router, l3_db.FloatingIP))
+
+    def add_port(port_id, device_id, device_owner, network_id, subnet_id,
+                 ip_address):
+        n = len(rows[models_v2.Port])
+        rows[models_v2.Port].append(
+            {'id': port_id, 'tenant_id': tenant_id, 'name': '',
+             'network_id': network_id,
+             'mac_address': 'fa:16:3e:%02x:%02x:%02x' % (
+                 n >> 16 & 255, n >> 8 & 255, n & 255),
+             'admin_state_up': True, 'status': 'ACTIVE',
+             'device_id': device_id, 'device_owner': device_owner})
+        rows[models_v2.IPAllocation].append(
+            {'port_id': port_id, 'ip_address': ip_address,
+             'subnet_id': subnet_id, 'network_id': network_id})
+
+    rows[models_v2.Subnet].append(
+        {'id': ext_subnet_id, 'tenant_id': tenant_id,
+         'network_id': ext_net_id, 'ip_version': 4, 'cidr': '10.0.0.0/8',
+         'gateway_ip': '10.0.0.1', 'enable_dhcp': False, 'shared': False})
+    for i in xrange(count):
+        router_id = uuidutils.generate_uuid()
+        gw_port_id = uuidutils.generate_uuid()
+        subnet_id = uuidutils.generate_uuid()
+        intf_port_id = uuidutils.generate_uuid()
+        fip_port_id = uuidutils.generate_uuid()
+        add_port(gw_port_id, router_id, l3_db.DEVICE_OWNER_ROUTER_GW,
+                 ext_net_id, ext_subnet_id, _ip(10, 2 * i + 2))
+        add_port(fip_port_id, uuidutils.generate_uuid(),
+                 l3_db.DEVICE_OWNER_FLOATINGIP, ext_net_id, ext_subnet_id,
+                 _ip(10, 2 * i + 3))
+        add_port(intf_port_id, router_id, l3_db.DEVICE_OWNER_ROUTER_INTF,
+                 int_net_id, subnet_id, _ip(11, 4 * i + 1))
+        rows[models_v2.Subnet].append(
+            {'id': subnet_id, 'tenant_id': tenant_id,
+             'network_id': int_net_id, 'ip_version': 4,
+             'cidr': '%s/30' % _ip(11, 4 * i),
+             'gateway_ip': _ip(11, 4 * i + 1), 'enable_dhcp': False,
+             'shared': False})
+        rows[l3_db.Router].append(
+            {'id': router_id, 'tenant_id': tenant_id, 'name': 'r%d' % i,
+             'status': 'ACTIVE', 'admin_state_up': True,
+             'gw_port_id': gw_port_id})
+        rows[l3_db.FloatingIP].append(
+            {'id': uuidutils.generate_uuid(), 'tenant_id': tenant_id,
+             'floating_ip_address': _ip(10, 2 * i + 3),
+             'floating_network_id': ext_net_id,
+             'floating_port_id': fip_port_id,
+             'fixed_ip_address': _ip(11, 4 * i + 2),
+             'router_id': router_id})
+
+    with session.begin():
+        for net_id in (ext_net_id, int_net_id):
+            session.add(models_v2.Network(id=net_id, tenant_id=tenant_id,
+                                          name=net_id, status='ACTIVE',
+                                          admin_state_up=True, shared=False))
+        session.flush()
+        for model in (models_v2.Subnet, models_v2.Port,
+                      models_v2.IPAllocation, l3_db.Router,
+                      l3_db.FloatingIP):
+            session.execute(model.__table__.insert(), rows[model])
+
+
+def measure(func, ctx):
+    start = time.time()
+    routers = func(ctx)
+    return time.time() - start, len(routers)
+
+
+def main():
+    parser = optparse.OptionParser(
+        usage='%prog [--sql-connection URL] [ROUTERS ...]')
+    parser.add_option('--sql-connection', default='sqlite://',
+                      help='Database to populate, emptied before each run')
+    options, args = parser.parse_args()
+    counts = [int(arg) for arg in args] or [100, 1000, 10000]
+
+    config.parse([])
+    cfg.CONF.set_override('sql_connection', options.sql_connection,
+                          'DATABASE')
+    print '%8s %14s %14s %8s' % ('routers', 'plugin API (s)',
+                                 'queries (s)', 'speedup')
+    for count in counts:
+        plugin = BenchmarkPlugin()
+        ctx = context.get_admin_context()
+        populate(ctx.session, count)
+        legacy, legacy_count = measure(
+            functools.partial(l3_sync_reference.get_sync_data_from_plugin,
+                              plugin), ctx)
+        ctx.session.expunge_all()
+        optimised, optimised_count = measure(plugin.get_sync_data, ctx)
+        assert legacy_count == optimised_count == count
+        print '%8d %14.3f %14.3f %7.1fx' % (
+            count, legacy, optimised, legacy / optimised)
+        db.clear_db()
+
+
+if __name__ == '__main__':
+    main()